@@ -0,0 +1,80 @@
+import re
+
+class Answers(dict):
+    '''User answers keyed by question attribute and set index (attribute_index). Keeps
+       an index section -> set -> question attribute -> set index -> answer, which is
+       updated whenever answers are added, changed or removed (by any dict method).'''
+
+    key_re = re.compile(r'^(.*Section_(\d+)/Set_(\d+)/.+)_(\d+)$')
+
+    def __init__(self, *args, **kwargs):
+        super().__init__()
+        self.sections = {}
+        self.questions = {}
+        self.update(*args, **kwargs)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        match = self.key_re.match(key)
+        if match:
+            attribute, section, set_, index = match.groups()
+            if attribute not in self.questions:
+                self.questions[attribute] = self.sections.setdefault(int(section), {}).setdefault(int(set_), {}).setdefault(attribute, {})
+            self.questions[attribute][int(index)] = value
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        match = self.key_re.match(key)
+        if match:
+            attribute, section, set_, index = match.groups()
+            del self.questions[attribute][int(index)]
+            if not self.questions[attribute]:
+                del self.questions[attribute]
+                del self.sections[int(section)][int(set_)][attribute]
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *default):
+        if key not in self:
+            return super().pop(key, *default)
+        value = self[key]
+        del self[key]
+        return value
+
+    def popitem(self):
+        if not self:
+            raise KeyError('popitem(): dictionary is empty')
+        key = next(reversed(self))
+        return key, self.pop(key)
+
+    def clear(self):
+        super().clear()
+        self.sections.clear()
+        self.questions.clear()
+
+    def __reduce__(self):
+        # Rebuild the index when copied or pickled
+        return (self.__class__, (dict(self),))
+
+    def question(self, attribute):
+        '''Answers of a question by set index'''
+        return self.questions.get(attribute, {})
+
+    def max_index(self, attribute):
+        '''Highest set index answered for a question (0 if none)'''
+        return max(self.question(attribute), default=0)
+
+    def set_length(self, section, set_):
+        '''Number of set indexes of a set (highest answered index + 1)'''
+        return max((max(indexes) + 1 for indexes in self.sections.get(section, {}).get(set_, {}).values()), default=0)
+
+    def keys_of(self, attribute):
+        '''Keys of all answers of a question'''
+        return [attribute+'_'+str(index) for index in self.question(attribute)]
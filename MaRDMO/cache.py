@@ -0,0 +1,138 @@
+import time
+
+from collections import OrderedDict
+from copy import deepcopy
+from hashlib import sha1
+from threading import Lock
+
+from .config import *
+
+class Cache:
+    '''Two-tier result cache: a size-bounded LRU with per-namespace TTL in the worker
+       process, optionally backed by a configured Django cache (Redis, memcached, ...)
+       shared by all workers.'''
+
+    def __init__(self, name, size, ttl, ttl_default, backend=None, local_ttl=None):
+        self.name = name
+        self.size = size
+        self.ttl = ttl
+        self.ttl_default = ttl_default
+        self.backend = backend
+        # Shorter TTL of the process tier, so entries deleted in the shared tier vanish from all workers
+        self.local_ttl = local_ttl
+        self.entries = OrderedDict()
+        self.lock = Lock()
+        self.counts = {'hits': 0, 'shared_hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def timeout(self, namespace):
+        '''Time to live of entries in namespace (0 disables caching)'''
+        return self.ttl.get(namespace, self.ttl_default)
+
+    def shared(self):
+        '''Django cache used as shared tier'''
+        if self.backend:
+            from django.core.cache import caches
+            return caches[self.backend]
+
+    def shared_key(self, shared, namespace, key):
+        '''Key in shared tier, includes the namespace version to allow invalidation'''
+        version = shared.get(self.version_key(namespace), 0)
+        return 'MaRDMO:{0}:{1}'.format(self.name, sha1('{0}\n{1}\n{2}'.format(namespace, version, key).encode()).hexdigest())
+
+    def version_key(self, namespace):
+        return 'MaRDMO:{0}:version:{1}'.format(self.name, sha1(namespace.encode()).hexdigest())
+
+    def get(self, namespace, key):
+        '''Return cached value or None'''
+        with self.lock:
+            entry = self.entries.get((namespace, key))
+            if entry:
+                if entry[0] > time.monotonic():
+                    self.entries.move_to_end((namespace, key))
+                    self.counts['hits'] += 1
+                    return deepcopy(entry[1])
+                del self.entries[(namespace, key)]
+
+        value = None
+        try:
+            shared = self.shared()
+            if shared:
+                value = shared.get(self.shared_key(shared, namespace, key))
+        except Exception:
+            # Shared tier unavailable, continue with process tier only
+            pass
+
+        with self.lock:
+            if value is None:
+                self.counts['misses'] += 1
+                return None
+            self.counts['shared_hits'] += 1
+        self.store(namespace, key, value)
+        return deepcopy(value)
+
+    def set(self, namespace, key, value):
+        '''Add value to both tiers'''
+        timeout = self.timeout(namespace)
+        if not timeout:
+            return
+        self.store(namespace, key, value)
+        try:
+            shared = self.shared()
+            if shared:
+                shared.set(self.shared_key(shared, namespace, key), value, timeout)
+        except Exception:
+            pass
+
+    def store(self, namespace, key, value):
+        '''Add value to process tier, evict least recently used entries'''
+        with self.lock:
+            timeout = self.timeout(namespace)
+            if self.local_ttl and self.backend:
+                timeout = min(timeout, self.local_ttl)
+            self.entries[(namespace, key)] = (time.monotonic() + timeout, deepcopy(value))
+            self.entries.move_to_end((namespace, key))
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def delete(self, namespace, key):
+        '''Drop entry of both tiers, returns True if it was cached in either tier'''
+        with self.lock:
+            deleted = self.entries.pop((namespace, key), None) is not None
+        try:
+            shared = self.shared()
+            if shared:
+                deleted = bool(shared.delete(self.shared_key(shared, namespace, key))) or deleted
+        except Exception:
+            pass
+        return deleted
+
+    def invalidate(self, namespace):
+        '''Drop all entries of namespace, in the shared tier by moving to a new version'''
+        with self.lock:
+            for entry in [entry for entry in self.entries if entry[0] == namespace]:
+                del self.entries[entry]
+            self.counts['invalidations'] += 1
+        try:
+            shared = self.shared()
+            if shared:
+                try:
+                    shared.incr(self.version_key(namespace))
+                except ValueError:
+                    shared.set(self.version_key(namespace), 1, None)
+        except Exception:
+            pass
+
+    def stats(self):
+        '''Hit / miss counters and number of entries in process tier'''
+        with self.lock:
+            return {**self.counts, 'size': len(self.entries)}
+
+def normalize(query):
+    '''Collapse whitespace of a query'''
+    return ' '.join(query.split())
+
+# Results of SPARQL queries, namespaced by endpoint
+sparql_cache = Cache('sparql', sparql_cache_size, sparql_cache_ttl, sparql_cache_ttl_default, cache_backend)
+
+# Items written to the MaRDI KG by label and description, shared by concurrent exports until the KG results have them
+item_cache = Cache('items', sparql_cache_size, sparql_cache_ttl, sparql_cache_ttl_default, cache_backend)
@@ -1,20 +1,93 @@
 from django.http import HttpResponse
-import requests
 import re
-from pylatexenc.latex2text import LatexNodes2Text
-import bibtexparser
-from langdetect import detect
 from .para import * 
+from .config import *
+from .parallel import submit, gather
+from .client import session
+from .cache import Cache
+
+# Names of ORCID IDs
+orcid_cache = Cache('orcid', orcid_cache_size, {}, orcid_cache_ttl, cache_backend)
+
+# Citations by DOI, unknown DOIs are kept for a shorter time
+citation_cache = Cache('citation', citation_cache_size, {'missing': citation_cache_ttl_missing}, citation_cache_ttl, cache_backend, citation_cache_local_ttl)
+
+orcid_api = 'https://pub.orcid.org/v3.0/'
 
 def BibtexFromDoi(doi):
     url =  "http://dx.doi.org/" + doi
     headers = {"accept": "application/x-bibtex"}
-    r = requests.get(url, headers=headers)
+    r = session.get(url, headers=headers)
     r.encoding = 'latex'
     return r.text
 
+def CslFromDoi(doi):
+    '''CSL-JSON of doi, None if not available'''
+    url =  "http://dx.doi.org/" + doi
+    headers = {"accept": "application/vnd.citationstyles.csl+json"}
+    r = session.get(url, headers=headers)
+    if r.status_code != 200:
+        return None
+    try:
+        return r.json()
+    except ValueError:
+        return None
+
+def GetOrcidJson(url):
+    return session.get(url, headers={'Accept': 'application/json'}).json()
+
+def OrcidSearch(doi):
+    '''ORCID IDs of authors of doi with their names (None if not provided) from one
+       expanded-search request, IDs only from the search request as fallback.'''
+    try:
+        results = GetOrcidJson(orcid_api+"expanded-search/?q=doi-self:"+doi)["expanded-result"] or []
+        authors = [[result["orcid-id"], result.get("given-names"), result.get("family-names")] for result in results]
+    except Exception:
+        results = GetOrcidJson(orcid_api+"search/?q=doi-self:"+doi)["result"] or []
+        authors = [[result["orcid-identifier"]["path"], None, None] for result in results]
+    return [[orcid_id, given+' '+family if given and family else None] for orcid_id, given, family in authors]
+
+def OrcidName(orcid_id):
+    '''Name of ORCID ID from personal-details'''
+    name = orcid_cache.get('name', orcid_id)
+    if name is None:
+        orcid_author = GetOrcidJson(orcid_api+orcid_id+"/personal-details")
+        name = orcid_author["name"]["given-names"]["value"]+' '+orcid_author["name"]["family-name"]["value"]
+        orcid_cache.set('name', orcid_id, name)
+    return name
+
+def NormalizeDoi(doi):
+    '''DOI as used for caching'''
+    doi = doi.strip().lower()
+    for prefix in ('https://doi.org/', 'http://doi.org/', 'https://dx.doi.org/', 'http://dx.doi.org/', 'doi:'):
+        if doi.startswith(prefix):
+            doi = doi[len(prefix):]
+    return doi
+
 def GetCitation(doi):
-    '''Function gets citation by DOI'''
+    '''Function gets citation by DOI, answered from cache if DOI was resolved before'''
+    key = NormalizeDoi(doi)
+    for namespace in ('citation', 'missing'):
+        cached = citation_cache.get(namespace, key)
+        if cached is not None:
+            return tuple(cached)
+
+    author_with_orcid, author_without_orcid, citation_dict = ResolveCitation(doi)
+
+    citation_cache.set('citation' if citation_dict else 'missing', key, [author_with_orcid, author_without_orcid, citation_dict])
+
+    return author_with_orcid, author_without_orcid, citation_dict
+
+def PurgeCitations(dois=None):
+    '''Drop cached citations of dois, of all DOIs if none are given. Returns the number
+       of dropped citations of dois (None for all DOIs, the shared tier can't count them).'''
+    if dois:
+        return sum(citation_cache.delete(namespace, NormalizeDoi(doi)) for doi in dois for namespace in ('citation', 'missing'))
+    for namespace in ('citation', 'missing'):
+        citation_cache.invalidate(namespace)
+
+def ResolveCitation(doi):
+    '''Function resolves citation by DOI'''
     
     #Assign Varibles
     citation_dict = {}
@@ -22,13 +95,52 @@ def GetCitation(doi):
     author_with_orcid_plain = []
     author_without_orcid = []
 
-    #Get Citation from DOI API as string
+    #Get Citation from DOI API as CSL-JSON if desired, as BibTeX otherwise or if not available
+    if citation_format == 'csl':
+        csl = CslFromDoi(doi)
+        if csl:
+            citation_dict = ParseCsl(csl)
+
+    if not citation_dict:
+        citation = str(BibtexFromDoi(doi))
+
+        if 'DOI is incorrect' in citation:
+            #Stop if Citation not found via DOI
+            return author_with_orcid, author_without_orcid, citation_dict
+
+        citation_dict = ParseBibtex(citation)
+
+    #Check valid DOI in ORCID (to get IDs of authors) while the Language is detected
+    orcid_search = submit(OrcidSearch, doi)
 
-    citation=str(BibtexFromDoi(doi))
-   
-    if 'DOI is incorrect' in citation:
-        #Stop if Citation not found via DOI
-        return author_with_orcid, author_without_orcid, citation_dict
+    from langdetect import detect
+    citation_dict['language']=detect(citation_dict['title'])
+
+    #Get IDs and names of authors from ORCID, request missing names concurrently
+    orcid_authors = orcid_search.result()
+
+    for orcid_id, name in orcid_authors:
+        if name:
+            orcid_cache.set('name', orcid_id, name)
+
+    missing = [orcid_id for orcid_id, name in orcid_authors if not name]
+    names = dict(zip(missing, gather([submit(OrcidName, orcid_id) for orcid_id in missing])))
+
+    for orcid_id, name in orcid_authors:
+        author_with_orcid.append([name or names[orcid_id], orcid_id])
+        author_with_orcid_plain.append(name or names[orcid_id])
+    
+    #Split authors in authors with and without ORCID
+    for name in citation_dict['author']:
+        if re.split(' ',name)[-1] not in '\t'.join(author_with_orcid_plain):
+            author_without_orcid.append(name)
+        
+    return author_with_orcid, author_without_orcid, citation_dict
+
+def ParseBibtex(citation):
+    '''Citation dict from BibTeX'''
+    import bibtexparser
+    from pylatexenc.latex2text import LatexNodes2Text
 
     #Citation as Dict
     citation_dict = bibtexparser.loads(citation).entries[0]
@@ -84,11 +196,11 @@ def GetCitation(doi):
         citation_dict['year']=''
 
     if citation_dict['year']:
-        #Convert three letter month to number
+        #Convert three letter month (or month name of expanded macros) to number
         months = {'jan': '01','feb': '02','mar': '03','apr': '04','may': '05','jun': '06',
                   'jul': '07','aug': '08','sep': '09','oct': '10','nov': '11','dec': '12'}
         try:
-            citation_dict['month']=months[citation_dict['month'].lower()]
+            citation_dict['month']=months[citation_dict['month'][:3].lower()]
         except:
             #If month already number establish two digit format
             if len(citation_dict['month']) == 1:
@@ -97,24 +209,39 @@ def GetCitation(doi):
     else:
         citation_dict['pub_date']=''
 
-    citation_dict['language']=detect(citation_dict['title'])
+    return citation_dict
 
-    #Check DOI in ORCID to get IDs of authors
-    orcid_paper = requests.get("https://pub.orcid.org/v3.0/search/?q=doi-self:"+doi, headers={'Accept': 'application/json'}).json()
+def ParseCsl(csl):
+    '''Citation dict from CSL-JSON, same keys as from BibTeX'''
 
-    if orcid_paper["result"]:
-        for entry in orcid_paper["result"]:
-            orcid_author = requests.get("https://pub.orcid.org/v3.0/"+entry["orcid-identifier"]["path"]+"/personal-details", headers={'Accept': 'application/json'}).json()
-            author_with_orcid.append([orcid_author["name"]["given-names"]["value"]+' '+orcid_author["name"]["family-name"]["value"],entry["orcid-identifier"]["path"]])
-            author_with_orcid_plain.append(orcid_author["name"]["given-names"]["value"]+' '+orcid_author["name"]["family-name"]["value"])
-    
-    #Split authors in authors with and without ORCID
-    for name in citation_dict['author']:
-        if re.split(' ',name)[-1] not in '\t'.join(author_with_orcid_plain):
-            author_without_orcid.append(name)
-        
-    return author_with_orcid, author_without_orcid, citation_dict
+    def text(value):
+        #CSL values might be lists and contain HTML markup
+        if isinstance(value, list):
+            value = value[0] if value else ''
+        return re.sub('<[^>]+>', '', str(value)) if value is not None else ''
 
+    citation_dict = {}
 
-    
+    citation_dict['author'] = [author['literal'] if 'literal' in author else ' '.join(filter(None, [author.get('given'), author.get('family')]))
+                               for author in csl.get('author', [])] or ''
+    citation_dict['title'] = text(csl.get('title'))
+    citation_dict['journal'] = text(csl.get('container-title'))
+    citation_dict['number'] = text(csl.get('issue'))
+    citation_dict['volume'] = text(csl.get('volume'))
+    citation_dict['pages'] = text(csl.get('page'))
+    citation_dict['doi'] = text(csl.get('DOI'))
+    #CSL type of journal articles (Crossref work type journal-article as fallback)
+    citation_dict['ENTRYTYPE'] = 'article' if csl.get('type') in ('article-journal', 'journal-article') else csl.get('type', '')
+
+    #Publication Date from (first) issued date, day is set to 01 as for BibTeX
+    date = (csl.get('issued', {}).get('date-parts') or [[]])[0]
+    if date and date[0]:
+        citation_dict['year'] = str(date[0])
+        citation_dict['month'] = '{0:02d}'.format(int(date[1])) if len(date) > 1 else '01'
+        citation_dict['pub_date'] = citation_dict['year']+'-'+citation_dict['month']+'-01'
+    else:
+        citation_dict['year'] = ''
+        citation_dict['month'] = '01'
+        citation_dict['pub_date'] = ''
 
+    return citation_dict
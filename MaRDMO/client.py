@@ -0,0 +1,75 @@
+import requests
+
+from urllib.parse import urlparse, urlunparse
+
+from requests.adapters import HTTPAdapter
+from urllib3.util import retry as urllib3_retry
+
+from .config import *
+from .parallel import limit
+from .ratelimit import limiter, retry_after
+from .timing import span
+
+class Retry(urllib3_retry.Retry):
+    '''Retry pausing all requests to a host which answered with Retry-After, not only the retried one'''
+
+    def increment(self, method=None, url=None, response=None, error=None, _pool=None, _stacktrace=None):
+        if response is not None and _pool is not None and response.status in self.RETRY_AFTER_STATUS_CODES:
+            seconds = retry_after(response)
+            if seconds:
+                limiter.pause(_pool.host, seconds)
+        return super().increment(method, url, response, error, _pool, _stacktrace)
+
+# Retries with exponential backoff for throttled (429) or failing (5xx) requests,
+# only idempotent requests (GET, HEAD, ...) are retried, edits are only repeated
+# if MediaWiki refused them because of database lag
+retry = Retry(total=http_retries, backoff_factor=http_backoff, status_forcelist=(429, 500, 502, 503, 504),
+              respect_retry_after_header=True, raise_on_status=False)
+
+# Keep-alive connection pools per host, shared by all sessions of the worker process
+adapter = HTTPAdapter(pool_connections=http_pool_hosts, pool_maxsize=http_pool_size, max_retries=retry)
+
+def redirect(url):
+    '''URL of url at the replacement of its host in http_hosts (mirrors, local stand-ins)'''
+    parts = urlparse(url)
+    if parts.hostname not in http_hosts:
+        return url
+    target = urlparse(http_hosts[parts.hostname])
+    return urlunparse(parts._replace(scheme=target.scheme, netloc=target.netloc, path=target.path.rstrip('/')+parts.path))
+
+class Session(requests.Session):
+    '''Session using the shared connection pools, MaRDMO User-Agent, default timeouts,
+       the limit of concurrent requests and the rate limit per host. Requests to hosts of
+       http_hosts are sent to their replacements, limits and timings keep the original host.'''
+
+    def __init__(self):
+        super().__init__()
+        self.headers.update({'User-Agent': user_agent})
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', http_timeout)
+        host = urlparse(url).hostname
+        original, url = url, redirect(url)
+
+        # MediaWiki write requests (with CSRF token) are refused while the database lags more than maxlag
+        write = method.upper() == 'POST' and isinstance(kwargs.get('data'), dict) and 'token' in kwargs['data']
+        if write and maxlag is not None:
+            kwargs['data'].setdefault('maxlag', maxlag)
+
+        for attempt in range(maxlag_retries + 1):
+            limiter.acquire(host)
+            with limit(original), span(original.split('?')[0], kind='request', host=host, method=method.upper()) as record:
+                response = super().request(method, url, **kwargs)
+                if record is not None:
+                    record.update(status=response.status_code, bytes=len(response.content) if not kwargs.get('stream') else 0)
+            lagged = write and 'X-Database-Lag' in response.headers
+            if response.status_code in (429, 503) or lagged:
+                # Hold back all requests to the host, not only this one
+                limiter.pause(host, retry_after(response) or (5 if lagged else 0))
+            if not lagged or attempt == maxlag_retries:
+                return response
+
+# Session for anonymous requests (SPARQL, search, DOI, ORCID)
+session = Session()
@@ -1,3 +1,17 @@
+try:
+    # Get MaRDMO settings of the RDMO instance if available
+    from config import settings as _settings
+except:
+    _settings=None
+
+#Login Credentials of MaRDI Portal Bot and Seconds after which the Login is renewed
+lgname=getattr(_settings,'lgname','')
+lgpassword=getattr(_settings,'lgpassword','')
+login_expiry=getattr(_settings,'MARDMO_LOGIN_EXPIRY',1800)
+
+#Dry Run: show planned MaRDI Portal Entries instead of writing them
+dry_run=getattr(_settings,'MARDMO_DRY_RUN',False)
+
 #Portal Wiki, Api and SPARQL Endpoint
 mardi_wiki="https://portal.mardi4nfdi.de/wiki/"
 mardi_api="https://portal.mardi4nfdi.de/w/api.php"
@@ -10,3 +24,82 @@ wikidata_api="https://www.wikidata.org/w/api.php"
 #SPARQL Prefixes
 wd = '<https://portal.mardi4nfdi.de/entity/>'
 wdt = '<https://portal.mardi4nfdi.de/prop/direct/>'
+
+#Number of Label / Description Checks per batched SPARQL Query (0 disables batching)
+sparql_batch_size=getattr(_settings,'MARDMO_SPARQL_BATCH_SIZE',20)
+
+#Worker Threads for concurrent Queries (Exports) and Searches of Option Set Providers, maximum concurrent Requests per Host
+max_workers=getattr(_settings,'MARDMO_MAX_WORKERS',8)
+search_workers=getattr(_settings,'MARDMO_SEARCH_WORKERS',4)
+max_concurrency=getattr(_settings,'MARDMO_MAX_CONCURRENCY',{})
+max_concurrency_default=getattr(_settings,'MARDMO_MAX_CONCURRENCY_DEFAULT',4)
+
+#HTTP Client: User-Agent, (connect, read) Timeouts in Seconds, Retries and Connection Pools
+user_agent='MaRDMO_0.1 (https://zib.de; reidelbach@zib.de)'
+http_timeout=getattr(_settings,'MARDMO_HTTP_TIMEOUT',(5,60))
+http_retries=getattr(_settings,'MARDMO_HTTP_RETRIES',3)
+http_backoff=getattr(_settings,'MARDMO_HTTP_BACKOFF',0.5)
+http_pool_hosts=getattr(_settings,'MARDMO_HTTP_POOL_HOSTS',10)
+http_pool_size=getattr(_settings,'MARDMO_HTTP_POOL_SIZE',10)
+
+#Replacements of Hosts of outbound Requests: Host Name -> Base URL (Mirrors, local Stand-ins as in benchmarks/export_suite.py)
+http_hosts=getattr(_settings,'MARDMO_HTTP_HOSTS',{})
+
+#Outbound Rate Limits per Host Name: (Requests per Second > 0, fractions for slower Rates, Burst >= 1) or None, shared by Worker Processes via the Django Cache, longest Pause (Retry-After) in Seconds
+rate_limits=getattr(_settings,'MARDMO_RATE_LIMITS',{'query.wikidata.org':(5,10),'pub.orcid.org':(12,24)})
+rate_limit_default=getattr(_settings,'MARDMO_RATE_LIMIT_DEFAULT',None)
+rate_limit_shared=getattr(_settings,'MARDMO_RATE_LIMIT_SHARED',False)
+rate_limit_max_pause=getattr(_settings,'MARDMO_RATE_LIMIT_MAX_PAUSE',60)
+
+#MediaWiki Write Requests: maxlag in Seconds (None to not send it) and Retries while the Server reports Lag
+maxlag=getattr(_settings,'MARDMO_MAXLAG',5)
+maxlag_retries=getattr(_settings,'MARDMO_MAXLAG_RETRIES',3)
+
+#Result Caches: Django Cache used as shared Tier (None for process Tier only), Size and TTL in Seconds per Endpoint
+cache_backend=getattr(_settings,'MARDMO_CACHE_BACKEND',None)
+sparql_cache_size=getattr(_settings,'MARDMO_SPARQL_CACHE_SIZE',1024)
+sparql_cache_ttl=getattr(_settings,'MARDMO_SPARQL_CACHE_TTL',{mardi_endpoint:300,wikidata_endpoint:3600})
+sparql_cache_ttl_default=getattr(_settings,'MARDMO_SPARQL_CACHE_TTL_DEFAULT',300)
+
+#Background Export Jobs: enable, Number of Worker Threads and Seconds Job Results are kept
+export_jobs=getattr(_settings,'MARDMO_EXPORT_JOBS',False)
+job_workers=getattr(_settings,'MARDMO_JOB_WORKERS',2)
+job_expiry=getattr(_settings,'MARDMO_JOB_EXPIRY',86400)
+
+#Seconds to wait for Search Results of each Source (Option Set Providers)
+search_deadline=getattr(_settings,'MARDMO_SEARCH_DEADLINE',{})
+search_deadline_default=getattr(_settings,'MARDMO_SEARCH_DEADLINE_DEFAULT',2)
+
+#Search Result Cache of Option Set Providers: Size and TTL in Seconds
+search_cache_size=getattr(_settings,'MARDMO_SEARCH_CACHE_SIZE',4096)
+search_cache_ttl=getattr(_settings,'MARDMO_SEARCH_CACHE_TTL',3600)
+
+#Local Index of MaRDI KG Entities: SQLite File (None disables the Index), answer Existence Checks (Hits and Misses) from the Index, Sync Page Size
+index_path=getattr(_settings,'MARDMO_INDEX_PATH',None)
+index_authoritative=getattr(_settings,'MARDMO_INDEX_AUTHORITATIVE',False)
+index_page_size=getattr(_settings,'MARDMO_INDEX_PAGE_SIZE',5000)
+
+#Cache of Author Names of ORCID IDs: Size and TTL in Seconds
+orcid_cache_size=getattr(_settings,'MARDMO_ORCID_CACHE_SIZE',4096)
+orcid_cache_ttl=getattr(_settings,'MARDMO_ORCID_CACHE_TTL',86400)
+
+#Cache of Citations by DOI: Size, TTL of Citations and of unknown DOIs, TTL within Worker Processes in Seconds
+citation_cache_size=getattr(_settings,'MARDMO_CITATION_CACHE_SIZE',1024)
+citation_cache_ttl=getattr(_settings,'MARDMO_CITATION_CACHE_TTL',2592000)
+citation_cache_ttl_missing=getattr(_settings,'MARDMO_CITATION_CACHE_TTL_MISSING',3600)
+citation_cache_local_ttl=getattr(_settings,'MARDMO_CITATION_CACHE_LOCAL_TTL',300)
+
+#Citation Format requested from doi.org: 'bibtex' or 'csl' (CSL-JSON, BibTeX as Fallback)
+citation_format=getattr(_settings,'MARDMO_CITATION_FORMAT','bibtex')
+
+#Markdown Conversion of Workflow Pages: 'builtin' (pandoc for unsupported Markdown) or 'pandoc'
+markdown_renderer=getattr(_settings,'MARDMO_MARKDOWN_RENDERER','builtin')
+
+#Workflow Search: Results per Page and Key Word Matching on the SPARQL Endpoint ('contains' String Filters, 'fulltext' uses the Blazegraph Full-Text Index if the Endpoint provides one)
+search_page_size=getattr(_settings,'MARDMO_SEARCH_PAGE_SIZE',10)
+search_text=getattr(_settings,'MARDMO_SEARCH_TEXT','contains')
+
+#Timing of Exports: Server-Timing Headers and one Log Record per Export (Logger MaRDMO.timing), Prometheus Metrics View for Staff Users or Scrapers sending the Token as Bearer Authorization
+export_timing=getattr(_settings,'MARDMO_TIMING',False)
+export_metrics=getattr(_settings,'MARDMO_METRICS',False)
+metrics_token=getattr(_settings,'MARDMO_METRICS_TOKEN',None)
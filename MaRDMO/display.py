@@ -38,7 +38,7 @@ done='''
     </body>
 </html>'''
 
-search_done="""
+search_head="""
 <!DOCTYPE html>
 <html>
     <head>
@@ -52,20 +52,88 @@ search_done="""
               <span style="font-family:'Arial';color:white;background-color:DarkSlateBlue;font-size:200px;"><b>RDMO</b></p></span>
            </p>
            <br><br><br>
-           <p style="color:blue;font-size:30px;">We found {0}  possibly matching Workflow(s) on the MaRDI Portal!</p>
+           <p style="color:blue;font-size:30px;">Possibly matching Workflow(s) on the MaRDI Portal, best Matches first (Page {0})</p>
            <p style="color:blue;font-size:30px;">Here are the Links to the Documentations:</p>
-           {1}
+"""
+
+search_foot="""
+           {0}
+           <p style="font-size:20px;">{1}</p>
         </div>
     </body>
 </html>"""
 
+search_none='<p style="color:blue;font-size:30px;">We found no (further) matching Workflows on the MaRDI Portal!</p>'
+
+search_nav='<a href="{0}" style="color:orange;">{1}</a>'
+
+
 export='''<p style="color:blue;font-size:30px;">You're Workflow has been added to the MaRDI Portal.</p>
 <p style="color:blue;font-size:30px;"><a href="{0}" style="color:orange;">Wiki Page</a>\t<a href="{1}" style="color:orange;">Knowledge Graph Entry</a></p>'''
 
+plan_done='''
+<!DOCTYPE html>
+<html>
+    <head>
+        <title>Planned Export</title>
+    </head>
+    <body>
+        <p>The following entries would be added to the MaRDI Portal (dry run, nothing has been written):</p>
+        <pre>{}</pre>
+    </body>
+</html>'''
+
+job_page='''
+<!DOCTYPE html>
+<html>
+    <head>
+        <title>Export running</title>
+    </head>
+    <body>
+            <br><br><br><br><br><br><br><br><br><br><br>
+        <div align='center' id='job'>
+           <p>
+              <span style="font-family:'Arial';color:DarkSlateBlue;font-size:200px;"><b>Ma</b></span>
+              <span style="font-family:'Arial';color:white;background-color:DarkSlateBlue;font-size:200px;"><b>RDMO</b></p></span>
+           </p>
+           <br><br><br>
+           <p style="color:blue;font-size:30px;">Your Workflow is being exported to the MaRDI Portal...</p>
+           <p style="color:blue;font-size:20px;" id='stage'></p>
+        </div>
+        <script>
+            function stop(message) {{
+                document.getElementById('stage').innerText = message;
+                document.getElementById('stage').style.color = 'red';
+            }}
+            function poll() {{
+                fetch('{0}').then(response => {{
+                    if (!response.ok) {{
+                        // 404 if another worker process runs the job and no shared cache is configured
+                        throw new Error('status ' + response.status);
+                    }}
+                    return response.json();
+                }}).then(job => {{
+                    if (job.status == 'done') {{
+                        document.open(); document.write(job.result.content); document.close();
+                    }} else if (job.status == 'failed') {{
+                        stop('Export failed: ' + job.error);
+                    }} else {{
+                        if (job.stages.length) {{
+                            document.getElementById('stage').innerText = job.stages[job.stages.length-1].name + '...';
+                        }}
+                        setTimeout(poll, 2000);
+                    }}
+                }}).catch(error => stop('Progress of the export is unavailable (' + error.message + ').'));
+            }}
+            poll();
+        </script>
+    </body>
+</html>'''
+
 err='''<p style="color:red;font-size:50px;">Ooops...</p>
 <p style="color:red;font-size:50px;">{}</p>'''
 
-link='<p style="color:blue;font-size:20px;">{0}  (<a href="{1}" style="color:orange;">Wiki Page</a>\t<a href="{2}" style="color:orange;">Knowledge Graph Entry</a>)</p><br>'
+search_link='<p style="color:blue;font-size:20px;">{0}  (<a href="{1}" style="color:orange;">Wiki Page</a>\t<a href="{2}" style="color:orange;">Knowledge Graph Entry</a>)  {3} of {4} Criteria matched</p><br>'
 
 err1  = err.format('The Questionnaire \'{}\' is not suitable for the MaRDI Export!')
 err2  = err.format('You haven\'t chosen an export type!')
@@ -93,6 +161,11 @@ err23 = err.format('A new software (set {}) requires name and description!')
 err24 = err.format('A new input data set (set {}) requires a name!')
 err25 = err.format('A new output data set (set {}) requires a name!')
 err26 = err.format('A new workflow needs to be related to mathematical fields!')
+err27 = err.format('The workflow page could not be published on the MaRDI Portal ({})!')
+err28 = err.format('An answer is the note on incomplete search results, please search again and choose an entity!')
+
+# Start of the option noting incomplete search results of the option set providers
+partial_text = 'Incomplete search results: '
 
 # HTML stuff to preview Documentation
 
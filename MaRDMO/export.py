@@ -1,17 +1,11 @@
-import pypandoc
 import re
-import requests
 
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
+from django.urls import reverse
+from django.utils.html import escape
 
 from rdmo.projects.exports import Export
 from rdmo.views.utils import ProjectWrapper
-from rdmo.views.templatetags import view_tags
-
-from wikibaseintegrator import wbi_login, WikibaseIntegrator
-from wikibaseintegrator.datatypes import ExternalID, Item, String, Time, MonolingualText
-from wikibaseintegrator.wbi_enums import ActionIfExists
-from wikibaseintegrator.wbi_config import config as wbi_config
 
 from .para import *
 from .config import *
@@ -19,16 +13,24 @@ from .citation import *
 from .id import *
 from .sparql import *
 from .display import *
-
-try:
-    # Get login credentials if available 
-    from config.settings import lgname, lgpassword
-except:
-    lgname=''
-    lgpassword=''
+from .parallel import submit, gather, flight
+from .client import session
+from .cache import sparql_cache, item_cache, normalize
+from .portal import portal_login, login_errors, publish_page, PageError
+from .plan import WritePlan
+from .jobs import submit_job
+from .index import entity_index
+from .markdown import convert
+from .answers import Answers
+from .timing import traced, span, mark
 
 class MaRDIExport(Export):
 
+    # Background job of the export (if any) and result of a successful Portal export
+    job = None
+    result = {}
+
+    @traced
     def render(self):
         '''Function that renders User answers to MaRDI template
            (adjusted from csv export)'''
@@ -39,422 +41,501 @@ class MaRDIExport(Export):
         
 ### Gather all User Answers in Dictionary (modified RDMO Code) ####################################################################################################################################
 
-        project_wrapper = ProjectWrapper(self.project, self.snapshot)
-        
-        data = {}
-        for question in project_wrapper.questions:
-            set_prefixes = view_tags.get_set_prefixes({}, question['attribute'], project=project_wrapper)
-            for set_prefix in set_prefixes:
-                set_indexes = view_tags.get_set_indexes({}, question['attribute'], set_prefix=set_prefix,
-                                                        project=project_wrapper)
-                for set_index in set_indexes:
-                    values = view_tags.get_values(
-                        {}, question['attribute'], set_prefix=set_prefix, set_index=set_index, project=project_wrapper)
-                
-                    labels = view_tags.get_labels(
-                        {}, question, set_prefix=set_prefix, set_index=set_index, project=project_wrapper)
-                
-                    result = view_tags.check_element(
-                        {}, question, set_prefix=set_prefix, set_index=set_index, project=project_wrapper)
+        self.stage('Gathering answers')
+        data = self.answers()
 
-                    if labels:
-                        data[question['attribute']+'_'+str(set_index)]=self.stringify_values(values)
-                    else:
-                        data[question['attribute']+'_0']=self.stringify_values(values)
+        # If Workflow Documentation wanted
+        if data[dec[0][0]] in (dec[0][1],dec[0][2]):
 
+            if export_jobs and data[dec[2][0]] == dec[2][2] and data[dec[3][0]] in (dec[3][1],dec[3][2]):
+                # Run Portal Export in background, return page polling its progress
+                job = submit_job(self.request.user, self.workflow_job, data)
+                return HttpResponse(job_page.format(reverse('mardmo_job', args=[job.id])))
 
-       ###################################################################################################################################################
-       ###################################################################################################################################################
-       ##                                                                                                                                               ##
-       ##                                                                                                                                               ##
-       ##    ░█──░█ ░█▀▀▀█ ░█▀▀█ ░█─▄▀ ░█▀▀▀ ░█─── ░█▀▀▀█ ░█──░█ 　 ░█▀▀▄ ░█▀▀▀█ ░█▀▀█ ░█─░█ ░█▀▄▀█ ░█▀▀▀ ░█▄─░█ ▀▀█▀▀ ─█▀▀█ ▀▀█▀▀ ▀█▀ ░█▀▀▀█ ░█▄─░█    ##
-       ##    ░█░█░█ ░█──░█ ░█▄▄▀ ░█▀▄─ ░█▀▀▀ ░█─── ░█──░█ ░█░█░█ 　 ░█─░█ ░█──░█ ░█─── ░█─░█ ░█░█░█ ░█▀▀▀ ░█░█░█ ─░█── ░█▄▄█ ─░█── ░█─ ░█──░█ ░█░█░█    ##
-       ##    ░█▄▀▄█ ░█▄▄▄█ ░█─░█ ░█─░█ ░█─── ░█▄▄█ ░█▄▄▄█ ░█▄▀▄█ 　 ░█▄▄▀ ░█▄▄▄█ ░█▄▄█ ─▀▄▄▀ ░█──░█ ░█▄▄▄ ░█──▀█ ─░█── ░█─░█ ─░█── ▄█▄ ░█▄▄▄█ ░█──▀█    ##
-       ##                                                                                                                                               ##
-       ##                                                                                                                                               ##
-       ###################################################################################################################################################
-       ###################################################################################################################################################
+            return self.workflow_documentation(data)
 
-        
-        # If Workflow Documentation wanted
-        if data[dec[0][0]] in (dec[0][1],dec[0][2]):
+        # If Workflow Search wanted
+        elif data[dec[0][0]] in (dec[0][3],dec[0][4]):
 
+            return self.workflow_search(data)
+
+        else:
+            # Stop if Workflow Documentation or Search not chosen
+            return HttpResponse(response_temp.format(err4))
+
+    ###################################################################################################################################################
+    ###################################################################################################################################################
+    ##                                                                                                                                               ##
+    ##                                                                                                                                               ##
+    ##    ░█──░█ ░█▀▀▀█ ░█▀▀█ ░█─▄▀ ░█▀▀▀ ░█─── ░█▀▀▀█ ░█──░█ 　 ░█▀▀▄ ░█▀▀▀█ ░█▀▀█ ░█─░█ ░█▀▄▀█ ░█▀▀▀ ░█▄─░█ ▀▀█▀▀ ─█▀▀█ ▀▀█▀▀ ▀█▀ ░█▀▀▀█ ░█▄─░█    ##
+    ##    ░█░█░█ ░█──░█ ░█▄▄▀ ░█▀▄─ ░█▀▀▀ ░█─── ░█──░█ ░█░█░█ 　 ░█─░█ ░█──░█ ░█─── ░█─░█ ░█░█░█ ░█▀▀▀ ░█░█░█ ─░█── ░█▄▄█ ─░█── ░█─ ░█──░█ ░█░█░█    ##
+    ##    ░█▄▀▄█ ░█▄▄▄█ ░█─░█ ░█─░█ ░█─── ░█▄▄█ ░█▄▄▄█ ░█▄▀▄█ 　 ░█▄▄▀ ░█▄▄▄█ ░█▄▄█ ─▀▄▄▀ ░█──░█ ░█▄▄▄ ░█──▀█ ─░█── ░█─░█ ─░█── ▄█▄ ░█▄▄▄█ ░█──▀█    ##
+    ##                                                                                                                                               ##
+    ##                                                                                                                                               ##
+    ###################################################################################################################################################
+    ###################################################################################################################################################
+
+    def workflow_documentation(self, data):
+        '''Function that checks User answers, integrates them into the MaRDI KG
+           and returns the documentation in the desired format.'''
+        # Imported on first export to keep the start of workers fast
+        from wikibaseintegrator.datatypes import ExternalID, Item, String, Time, MonolingualText
+
+        self.stage('Checking answers')
 
 ### Checks for Workflow Documentation #############################################################################################################################################################
 
-            # Login Credentials for MaRDI Portal Export
-            if data[dec[2][0]] == dec[2][2] and data[dec[3][0]] in (dec[3][1],dec[3][2]):
-                if not (lgname and lgpassword):
-                    #Stop if no Login Credentials are provided
-                    return HttpResponse(response_temp.format(err19))
-
-            # Research Objective Provided
-            res_obj=self.wikibase_answers(data,ws['obj'])[0] 
-            if not res_obj:
-                # Stop if no Research Objective is provided
-                return HttpResponse(response_temp.format(err20))
-            
-            # Workflow Type (THEO/EXP)
-            if data[dec[1][0]] not in (dec[1][1],dec[1][2],dec[1][3],dec[1][4]):
-                # Stop if no Workflow Type is chosen
-                return HttpResponse(response_temp.format(err5))
+        # Login Credentials for MaRDI Portal Export
+        if data[dec[2][0]] == dec[2][2] and data[dec[3][0]] in (dec[3][1],dec[3][2]):
+            if not (lgname and lgpassword):
+                #Stop if no Login Credentials are provided
+                return HttpResponse(response_temp.format(err19))
+
+        # Note on incomplete search results chosen instead of an entity
+        if any(isinstance(value,str) and partial_text in value for value in data.values()):
+            return HttpResponse(response_temp.format(err28))
+
+        # Research Objective Provided
+        res_obj=self.wikibase_answers(data,ws['obj'])[0] 
+        if not res_obj:
+            # Stop if no Research Objective is provided
+            return HttpResponse(response_temp.format(err20))
+        
+        # Workflow Type (THEO/EXP)
+        if data[dec[1][0]] not in (dec[1][1],dec[1][2],dec[1][3],dec[1][4]):
+            # Stop if no Workflow Type is chosen
+            return HttpResponse(response_temp.format(err5))
+        
+        # Identical Workflow on MaRDI Portal
+        if data[dec[2][0]] == dec[2][2] and data[dec[3][0]] in (dec[3][1],dec[3][2]):
+            if self.get_check_results(mardi_endpoint,{'workflow':(self.project.title.replace("'",r"\'"),res_obj.replace("'",r"\'"))})['workflow']['qid']['value']:
+                # Stop if Workflow with similar Label and Description on MaRDI Portal
+                return HttpResponse(response_temp.format(err18))
             
-            # Identical Workflow on MaRDI Portal
-            if data[dec[2][0]] == dec[2][2] and data[dec[3][0]] in (dec[3][1],dec[3][2]):
-                if self.get_results(mardi_endpoint,mini.format('?qid',mbody.format(self.project.title.replace("'",r"\'"),res_obj.replace("'",r"\'")),'1'))[0]:
-                    # Stop if Workflow with similar Label and Description on MaRDI Portal
-                    return HttpResponse(response_temp.format(err18))
-                
+### Plan new MaRDI KG Entries (written at once after all Checks) ###################################################################################################################################
+
+        self.plan = WritePlan()
+
 ### Get Paper Information provided by User ########################################################################################################################################################
 
-            paper=self.wikibase_answers(data,ws['doi'])[0]
+        paper=self.wikibase_answers(data,ws['doi'])[0]
 
 ### MaRDI KG and Wikidata Queries #################################################################################################################################################################
 
-            # Initialize dictionaries for MaRDI KG (mq) and Wikidata (wq) queries
-            wq = {}
-            mq = {}
+        # Initialize dictionaries for MaRDI KG (mq) and Wikidata (wq) queries
+        wq = {}
+        mq = {}
 
-            # If Portal integration wanted, get further publication information
-            if data[dec[2][0]] == dec[2][2] and data[dec[3][0]] in (dec[3][1],dec[3][2]):
-                # Extract Paper DOI
-                doi=re.split(':',paper)
+        # If Portal integration wanted, get further publication information
+        if data[dec[2][0]] == dec[2][2] and data[dec[3][0]] in (dec[3][1],dec[3][2]):
+            # Extract Paper DOI
+            doi=re.split(':',paper)
+            
+            if doi[0] == 'Yes':
                 
-                if doi[0] == 'Yes':
-                    
-                    if not doi[-1]:
-                        # Stop if no DOI provided
-                        return HttpResponse(response_temp.format(err6))
+                if not doi[-1]:
+                    # Stop if no DOI provided
+                    return HttpResponse(response_temp.format(err6))
+            
+                # Get Citation and Author Information
+                self.stage('Resolving citation')
+                orcid,string,cit=GetCitation(doi[-1])
                 
-                    # Get Citation and Author Information
-                    orcid,string,cit=GetCitation(doi[-1])
-                    
-                    if not cit:
-                        # Stop if no Information available via DOI
-                        return HttpResponse(response_temp.format(err6))
+                if not cit:
+                    # Stop if no Information available via DOI
+                    return HttpResponse(response_temp.format(err6))
 
-                    # Query Wikidata and MaRDI KG by all User Answers and Citation Information 
-                    wq, mq = self.sparql(data,ws,orcid,doi,cit)
+                # Query Wikidata and MaRDI KG by all User Answers and Citation Information 
+                self.stage('Querying Wikidata and MaRDI KG')
+                wq, mq = self.sparql(data,ws,orcid,doi,cit)
 
 ### Checkout Paper via DOI ########################################################################################################################################################################
 
-                    if mq['mqpub']["qid_doi"]["value"]:
-                        # If Paper with DOI on MaRDI Portal store QID
-                        paper_qid=mq['mqpub']["qid_doi"]["value"]
-
-                    else:
+                if mq['mqpub']["qid_doi"]["value"]:
+                    # If Paper with DOI on MaRDI Portal store QID
+                    paper_qid=mq['mqpub']["qid_doi"]["value"]
 
-                        # If no Paper with DOI on MaRDI Portal, check if Paper with DOI on Wikidata
-                        if wq['wqpub']["qid_doi"]["value"]:
+                else:
 
-                            # If on Wikidata check if Paper with same label and description is on MaRDI Portal
-                            if mq['mqpub']["qid_ch1"]["value"]:
-                                # If Paper exists on MaRDI Portal store QID.
-                                paper_qid=mq['mqpub']["qid_ch1"]["value"]
+                    # If no Paper with DOI on MaRDI Portal, check if Paper with DOI on Wikidata
+                    if wq['wqpub']["qid_doi"]["value"]:
 
-                            else:
-                                # If Paper only on Wikidata, generate Dummy Entry (i.e. Wikidata Label, Description, QID Mapping) and store QID. 
-                                paper_qid=self.entry(wq['wqpub']["label_doi"]["value"],wq['wqpub']["quote_doi"]["value"],[(ExternalID,wq['wqpub']["qid_doi"]["value"],P2)])
+                        # If on Wikidata check if Paper with same label and description is on MaRDI Portal
+                        if mq['mqpub']["qid_ch1"]["value"]:
+                            # If Paper exists on MaRDI Portal store QID.
+                            paper_qid=mq['mqpub']["qid_ch1"]["value"]
 
                         else:
+                            # If Paper only on Wikidata, generate Dummy Entry (i.e. Wikidata Label, Description, QID Mapping) and store QID. 
+                            paper_qid=self.entry(wq['wqpub']["label_doi"]["value"],wq['wqpub']["quote_doi"]["value"],[(ExternalID,wq['wqpub']["qid_doi"]["value"],P2)])
+
+                    else:
 
 ### Checkout Paper via Title ######################################################################################################################################################################
 
-                            # If Title in Citation
-                            if cit['title']:
+                        # If Title in Citation
+                        if cit['title']:
 
-                                if mq['mqpub']["qid_tit"]["value"]:
-                                    # If Paper with Title on MaRDI Portal store QID
-                                    paper_qid=mq['mqpub']["qid_tit"]["value"]
+                            if mq['mqpub']["qid_tit"]["value"]:
+                                # If Paper with Title on MaRDI Portal store QID
+                                paper_qid=mq['mqpub']["qid_tit"]["value"]
 
-                                else:
+                            else:
 
-                                    # If no Paper with Title on MaRDI Portal, check if Paper with Title on Wikidata
-                                    if wq['wqpub']["qid_tit"]["value"]:
-                                        # If Paper only on Wikidata, generate Dummy Entry (i.e. Wikidata Label, Description, QID Mapping) and store QID.
-                                        paper_qid=self.entry(wq['wqpub']["label_tit"]["value"],wq['wqpub']["quote_tit"]["value"],[(ExternalID,wq['wqpub']["qid_tit"]["value"],P2)])
+                                # If no Paper with Title on MaRDI Portal, check if Paper with Title on Wikidata
+                                if wq['wqpub']["qid_tit"]["value"]:
+                                    # If Paper only on Wikidata, generate Dummy Entry (i.e. Wikidata Label, Description, QID Mapping) and store QID.
+                                    paper_qid=self.entry(wq['wqpub']["label_tit"]["value"],wq['wqpub']["quote_tit"]["value"],[(ExternalID,wq['wqpub']["qid_tit"]["value"],P2)])
 
-                                    else:
+                                else:
 
 ### Create New Publication Entry ##################################################################################################################################################################
 
 ### Add Authors of Paper with ORCID ID to MaRDI Portal ############################################################################################################################################
 
-                                        author_qids=[]
-                                        for i,aut in enumerate(orcid):
-                                            # If authors not on MaRDI Portal, add them.
-                                            author_qids.append(self.paper_prop_entry(wq['wqaut'+str(i)],mq['mqaut'+str(i)],[aut[0],'researcher',
-                                                                                     [(Item,Q7,P4),(Item,Q8,P21),(ExternalID,aut[1],P22)]]))
-                                    
+                                    author_qids=[]
+                                    for i,aut in enumerate(orcid):
+                                        # If authors not on MaRDI Portal, add them.
+                                        author_qids.append(self.paper_prop_entry(wq['wqaut'+str(i)],mq['mqaut'+str(i)],[aut[0],'researcher',
+                                                                                 [(Item,Q7,P4),(Item,Q8,P21),(ExternalID,aut[1],P22)]]))
+                                
 ### Add Language of Paper to MaRDI Portal ######################################################################################################################################################### 
 
-                                        if cit['language']:
-                                            # If language not on MaRDI Portal, add it.
-                                            cit['language']=self.paper_prop_entry(wq['wqlan'],mq['mqlan'],[lang_dict[cit['language']],'language',
-                                                                                  [(Item,Q11,P4)]])
+                                    if cit['language']:
+                                        # If language not on MaRDI Portal, add it.
+                                        cit['language']=self.paper_prop_entry(wq['wqlan'],mq['mqlan'],[lang_dict[cit['language']],'language',
+                                                                              [(Item,Q11,P4)]])
 
 ### Add Journal of Paper to MaRDI Portal ##########################################################################################################################################################
 
-                                        if cit['journal']:
-                                            # If journal not in Portal, create journal entry for publication                                                     
-                                            cit['journal']=self.paper_prop_entry(wq['wqjou'],mq['mqjou'],[cit['journal'],'scientific journal',
-                                                                                 [(Item,Q9,P4)]])
+                                    if cit['journal']:
+                                        # If journal not in Portal, create journal entry for publication                                                     
+                                        cit['journal']=self.paper_prop_entry(wq['wqjou'],mq['mqjou'],[cit['journal'],'scientific journal',
+                                                                             [(Item,Q9,P4)]])
 
 ### Create Publication Entry on MaRDI Portal #####################################################################################################################################################
 
-                                        paper_qid=self.entry(cit['title'],'publication',[(Item,Q1 if cit['ENTRYTYPE'] == 'article' else Q10,P4)]+
-                                                             [(Item,aut,P8) for aut in author_qids]+[(String,aut,P9) for aut in string]+
-                                                             [(Item,cit['language'],P10),(Item,cit['journal'],P12),(MonolingualText,cit['title'],P7),
-                                                              (Time,cit['pub_date']+'T00:00:00Z',P11),(String,cit['volume'],P13),(String,cit['number'],P14),
-                                                              (String,cit['pages'],P15),(ExternalID,cit['doi'].upper(),P16)])  
-                else:
-                    # No DOI provided
-                    paper_qid=[]
+                                    paper_qid=self.entry(cit['title'],'publication',[(Item,Q1 if cit['ENTRYTYPE'] == 'article' else Q10,P4)]+
+                                                         [(Item,aut,P8) for aut in author_qids]+[(String,aut,P9) for aut in string]+
+                                                         [(Item,cit['language'],P10),(Item,cit['journal'],P12),(MonolingualText,cit['title'],P7),
+                                                          (Time,cit['pub_date']+'T00:00:00Z',P11),(String,cit['volume'],P13),(String,cit['number'],P14),
+                                                          (String,cit['pages'],P15),(ExternalID,cit['doi'].upper(),P16)])  
+            else:
+                # No DOI provided
+                paper_qid=[]
 
-            if not (wq and mq):
-                # Query Wikidata and MaRDI KG by all User Answers without Citation Information 
-                wq, mq = self.sparql(data,ws)
+        if not (wq and mq):
+            # Query Wikidata and MaRDI KG by all User Answers without Citation Information 
+            self.stage('Querying Wikidata and MaRDI KG')
+            wq, mq = self.sparql(data,ws)
 
 ### Integrate related Model in MaRDI KG ###########################################################################################################################################################
 
-            models, data, error = self.Entry_Generator('mod','moms',                # Entry of Model (mod) with Main Subject (moms) as Subproperty
-                                                       [True,True,False],           # Generation wanted, QID Generation wanted, String Generation not wanted
-                                                       [Q3,P17],                    # instance of mathematical model (Q3), main subject (P17)
-                                                       wq,mq,data)                  # data from wikidata (wq), MaRDI KG (mq) and user (data)
-            
-            if error[0] == 0:
-                # Stop if no Name and Description provided for new model entry
-                return HttpResponse(response_temp.format(err21.format(error[1])))
+        self.stage('Checking models, methods, software and data sets')
 
-            elif error[0] == 1:
-                #Stop if no main subject provided for new model entry
-                return HttpResponse(response_temp.format(err9.format(error[1])))
-            
+        models, data, error = self.Entry_Generator('mod','moms',                # Entry of Model (mod) with Main Subject (moms) as Subproperty
+                                                   [True,True,False],           # Generation wanted, QID Generation wanted, String Generation not wanted
+                                                   [Q3,P17],                    # instance of mathematical model (Q3), main subject (P17)
+                                                   wq,mq,data)                  # data from wikidata (wq), MaRDI KG (mq) and user (data)
+        
+        if error[0] == 0:
+            # Stop if no Name and Description provided for new model entry
+            return HttpResponse(response_temp.format(err21.format(error[1])))
+
+        elif error[0] == 1:
+            #Stop if no main subject provided for new model entry
+            return HttpResponse(response_temp.format(err9.format(error[1])))
+        
 ### Integrate related Methods in MaRDI KG #########################################################################################################################################################
 
-            methods, data, error = self.Entry_Generator('met','mems',               # Entry of Methods (met) with Main Subject (mems) as Subproperty
-                                                        [True,True,False],          # Generation wanted, QID Generation wanted, String Generation not wanted
-                                                        [Q4,P17],                   # instance of method (Q4), main subject (P17)
-                                                        wq,mq,data)                 # data from wikidata (wq), MaRDI KG (mq) and user (data)
+        methods, data, error = self.Entry_Generator('met','mems',               # Entry of Methods (met) with Main Subject (mems) as Subproperty
+                                                    [True,True,False],          # Generation wanted, QID Generation wanted, String Generation not wanted
+                                                    [Q4,P17],                   # instance of method (Q4), main subject (P17)
+                                                    wq,mq,data)                 # data from wikidata (wq), MaRDI KG (mq) and user (data)
 
-            if error[0] == 0:
-                # Stop if no Name and Description provided for new method entry
-                return HttpResponse(response_temp.format(err22.format(error[1])))
-            
-            elif error[0] == 1:
-                #Stop if no main subject provided for new method entry
-                return HttpResponse(response_temp.format(err17.format(error[1])))
+        if error[0] == 0:
+            # Stop if no Name and Description provided for new method entry
+            return HttpResponse(response_temp.format(err22.format(error[1])))
+        
+        elif error[0] == 1:
+            #Stop if no main subject provided for new method entry
+            return HttpResponse(response_temp.format(err17.format(error[1])))
 
 ### Integrate related Softwares in MaRDI KG #######################################################################################################################################################
 
-            softwares, data, error = self.Entry_Generator('sof','pl',               # Entry of Softwares (sof) with Programming Languages (pl) as Subproperty
-                                                          [True,True,True],         # Generation wanted, QID Generation wanted, String Generation wanted
-                                                          [Q5,P19],                 # instance of software (Q5), programmed in (P19)
-                                                          wq,mq,data)               # data from wikidata (wq), MaRDI KG (mq) and user (data)
+        softwares, data, error = self.Entry_Generator('sof','pl',               # Entry of Softwares (sof) with Programming Languages (pl) as Subproperty
+                                                      [True,True,True],         # Generation wanted, QID Generation wanted, String Generation wanted
+                                                      [Q5,P19],                 # instance of software (Q5), programmed in (P19)
+                                                      wq,mq,data)               # data from wikidata (wq), MaRDI KG (mq) and user (data)
 
-            if error[0] == 0:
-                # Stop if no Name and Description provided for new software entry
-                return HttpResponse(response_temp.format(err23.format(error[1])))
-            
-            elif error[0] == 1:
-                #Stop if no programming language provided for new software entry
-                return HttpResponse(response_temp.format(err16.format(error[1])))
-            
+        if error[0] == 0:
+            # Stop if no Name and Description provided for new software entry
+            return HttpResponse(response_temp.format(err23.format(error[1])))
+        
+        elif error[0] == 1:
+            #Stop if no programming language provided for new software entry
+            return HttpResponse(response_temp.format(err16.format(error[1])))
+        
 ### Integrate related Input Data Sets in MaRDI KG #################################################################################################################################################
-            
-            inputs, data, error = self.Entry_Generator('inp','',                    # Entry of Input Data Sets (inp) with no Subproperty
-                                                       [True,False,False],          # Generation wanted, QID Generation not wanted, String Generation not wanted
-                                                       [Q6,''],                     # instance of data set (Q6)
-                                                       wq,mq,data)                  # data from wikidata (wq), MaRDI KG (mq) and user (data)
+        
+        inputs, data, error = self.Entry_Generator('inp','',                    # Entry of Input Data Sets (inp) with no Subproperty
+                                                   [True,False,False],          # Generation wanted, QID Generation not wanted, String Generation not wanted
+                                                   [Q6,''],                     # instance of data set (Q6)
+                                                   wq,mq,data)                  # data from wikidata (wq), MaRDI KG (mq) and user (data)
 
-            if error[0] == 0:
-                # Stop if no Name and Description provided for new input data set
-                return HttpResponse(response_temp.format(err24.format(error[1])))
+        if error[0] == 0:
+            # Stop if no Name and Description provided for new input data set
+            return HttpResponse(response_temp.format(err24.format(error[1])))
 
 ### Integrate related Output Data Sets in MaRDI KG ################################################################################################################################################
 
-            outputs, data, error = self.Entry_Generator('out','',                   # Entry of Output Data Sets (out) with no Subproperty
-                                                        [True,False,False],         # Generation wanted, QID Generation not wanted, String Generation not wanted
-                                                        [Q6,''],                    # instance of data set (Q6)
-                                                        wq,mq,data)                 # data from wikidata (wq), MaRDI KG (mq) and user (data)
+        outputs, data, error = self.Entry_Generator('out','',                   # Entry of Output Data Sets (out) with no Subproperty
+                                                    [True,False,False],         # Generation wanted, QID Generation not wanted, String Generation not wanted
+                                                    [Q6,''],                    # instance of data set (Q6)
+                                                    wq,mq,data)                 # data from wikidata (wq), MaRDI KG (mq) and user (data)
 
-            if error[0] == 0:
-                # Stop if no Name and Description provided for new output data set
-                return HttpResponse(response_temp.format(err25.format(error[1])))
+        if error[0] == 0:
+            # Stop if no Name and Description provided for new output data set
+            return HttpResponse(response_temp.format(err25.format(error[1])))
 
 ### Integrate related non-mathematical Disciplines in MaRDI KG ####################################################################################################################################
 
-            disciplines, data, error = self.Entry_Generator('dis','',               # Entry of non-mathmatical Disciplines (dis) with no Subproperty
-                                                            [False,False,False],    # Generation not wanted, QID Generation not wanted, String Generation not wanted
-                                                            ['',''],                # nothing
-                                                            wq,mq,data)             # data from wikidata (wq), MaRDI KG (mq) and user (data)
+        disciplines, data, error = self.Entry_Generator('dis','',               # Entry of non-mathmatical Disciplines (dis) with no Subproperty
+                                                        [False,False,False],    # Generation not wanted, QID Generation not wanted, String Generation not wanted
+                                                        ['',''],                # nothing
+                                                        wq,mq,data)             # data from wikidata (wq), MaRDI KG (mq) and user (data)
 
-            if error[0] == 2:
-                # Stop if no Discipline provided by User
-                return HttpResponse(response_temp.format(err15.format(error[1])))
+        if error[0] == 2:
+            # Stop if no Discipline provided by User
+            return HttpResponse(response_temp.format(err15.format(error[1])))
 
 ### Integrate related mathematical Fields in MaRDI KG #############################################################################################################################################
 
-            fields, data, error = self.Entry_Generator('fie','',               # Entry of mathmatical fields (fie) with no Subproperty
-                                                       [False,False,False],    # Generation not wanted, QID Generation not wanted, String Generation not wanted
-                                                       ['',''],                # nothing
-                                                       wq,mq,data)             # data from wikidata (wq), MaRDI KG (mq) and user (data)
+        fields, data, error = self.Entry_Generator('fie','',               # Entry of mathmatical fields (fie) with no Subproperty
+                                                   [False,False,False],    # Generation not wanted, QID Generation not wanted, String Generation not wanted
+                                                   ['',''],                # nothing
+                                                   wq,mq,data)             # data from wikidata (wq), MaRDI KG (mq) and user (data)
 
-            if error[0] == 2:
-                # Stop if no Discipline provided by User
-                return HttpResponse(response_temp.format(err26.format(error[1])))
+        if error[0] == 2:
+            # Stop if no Discipline provided by User
+            return HttpResponse(response_temp.format(err26.format(error[1])))
 
 ### Integrate Workflow in MaRDI KG ################################################################################################################################################################
 
-            if data[dec[2][0]] == dec[2][2] and data[dec[3][0]] in (dec[3][1],dec[3][2]):
-                # If MaRDI KG integration is desired
-                workflow_qid=self.entry(self.project.title, res_obj,                                       # Name (self.project.title) and Description (res_obj) of Workflow
-                                        [(Item,Q2,P4),                                                     # instance of (P4) research workflow (Q2)
-                                         (Item,paper_qid,P3)]+                                             # cites work (P3) paper (paper_qid) provided by user
-                                        [(Item,discipline,P5) for discipline in disciplines]+              # field of work (P5) disciplines (discipline) provided by user
-                                        [(Item,field,P5) for field in fields]+                             # field of work (P5) mathematical fields (field) provided by user
-                                        [(Item,i,P6) for i in models+methods+softwares+inputs+outputs])    # uses (P6) models, methods, softwares, inputs, outputs
-            
-### Generate Workflow Page ########################################################################################################################################################################
+        if data[dec[2][0]] == dec[2][2] and data[dec[3][0]] in (dec[3][1],dec[3][2]):
+            # If MaRDI KG integration is desired
+            workflow_qid=self.entry(self.project.title, res_obj,                                       # Name (self.project.title) and Description (res_obj) of Workflow
+                                    [(Item,Q2,P4),                                                     # instance of (P4) research workflow (Q2)
+                                     (Item,paper_qid,P3)]+                                             # cites work (P3) paper (paper_qid) provided by user
+                                    [(Item,discipline,P5) for discipline in disciplines]+              # field of work (P5) disciplines (discipline) provided by user
+                                    [(Item,field,P5) for field in fields]+                             # field of work (P5) mathematical fields (field) provided by user
+                                    [(Item,i,P6) for i in models+methods+softwares+inputs+outputs])    # uses (P6) models, methods, softwares, inputs, outputs
 
-            # Create Template with Tables
-            temp=self.dyn_template(data)
-                      
-            # Fill out MaRDI Template
-            for entry in data.items():
-                temp=re.sub('"','',re.sub(";","<br/>",re.sub("Yes: |'","",re.sub(entry[0],repr(entry[1]),temp))))
-        
-            # Refine completed Template
-            for refine_str in refine_strs:
-                temp=re.sub(refine_str, "", temp)
+### Write planned Entries to MaRDI KG #############################################################################################################################################################
 
-### Publish Workflow Page #########################################################################################################################################################################
+            if dry_run:
+                # Show planned Entries instead of writing them
+                return HttpResponse(plan_done.format(escape(self.plan.describe())))
 
-            if data[dec[2][0]] == dec[2][1]: 
-                # Download as Markdown
-                response = HttpResponse(temp, content_type="application/md")
-                response['Content-Disposition'] = 'filename="workflow.md"'
-                return response
-            
-            elif data[dec[2][0]] == dec[2][2] and data[dec[3][0]] not in (dec[3][1],dec[3][2]):
-                # Preview Markdown as HTML
-                return HttpResponse(html.format(pypandoc.convert_text(temp,'html',format='md')))
-            
-            elif data[dec[2][0]] == dec[2][2] and data[dec[3][0]] in (dec[3][1],dec[3][2]):
-
-                # Convert to Mediawiki Format
-                page = re.sub('{\|','{| class="wikitable"',pypandoc.convert_text(temp,'mediawiki',format='md'))
-               
-               # Insert Links for MaRDI, wikidata, swmath and doi entities 
-                for linker in linkers:
-                    page = re.sub(r'{0}({1})'.format(linker[0],linker[1]), r'{0}[{1}\1 \1]'.format(linker[0],linker[2]), page)
-
-                # Export Page to MaRDI Portal
-                self.wikipage_export(self.project.title,page)
-               
-               # Successful Export to Portal
-                return HttpResponse(done.format(export.format(mardi_wiki+self.project.title.replace(' ','_'),mardi_wiki+'Item:'+workflow_qid)))
-            
-            else:
-                # Stop if no Export Type is chosen
-                return HttpResponse(response_temp.format(err2))
+            # Write independent Entries concurrently, dependent ones in later waves
+            self.stage('Writing entries to MaRDI KG')
+            self.plan.write(self.write_entry)
 
+            # Replace placeholder QIDs in Workflow QID and User answers
+            workflow_qid=self.plan.resolve(workflow_qid)
+            data=Answers((key,self.plan.resolve(value)) for key,value in data.items())
+        
+### Generate Workflow Page ########################################################################################################################################################################
 
-       ######################################################################################################
-       ######################################################################################################
-       ##                                                                                                  ##
-       ##                                                                                                  ##
-       ##    ▒█░░▒█ ▒█▀▀▀█ ▒█▀▀█ ▒█░▄▀ ▒█▀▀▀ ▒█░░░ ▒█▀▀▀█ ▒█░░▒█ 　 ▒█▀▀▀█ ▒█▀▀▀ ░█▀▀█ ▒█▀▀█ ▒█▀▀█ ▒█░▒█   ##
-       ##    ▒█▒█▒█ ▒█░░▒█ ▒█▄▄▀ ▒█▀▄░ ▒█▀▀▀ ▒█░░░ ▒█░░▒█ ▒█▒█▒█ 　 ░▀▀▀▄▄ ▒█▀▀▀ ▒█▄▄█ ▒█▄▄▀ ▒█░░░ ▒█▀▀█   ##
-       ##    ▒█▄▀▄█ ▒█▄▄▄█ ▒█░▒█ ▒█░▒█ ▒█░░░ ▒█▄▄█ ▒█▄▄▄█ ▒█▄▀▄█ 　 ▒█▄▄▄█ ▒█▄▄▄ ▒█░▒█ ▒█░▒█ ▒█▄▄█ ▒█░▒█   ##
-       ##                                                                                                  ##
-       ##                                                                                                  ##
-       ######################################################################################################
-       ######################################################################################################
+        # Create Template with Tables
+        self.stage('Generating workflow page')
+        with span('Filling template'):
+            temp=self.dyn_template(data)
+                  
+            # Fill out MaRDI Template
+            temp=self.fill_template(temp,data)
 
+### Publish Workflow Page #########################################################################################################################################################################
 
-        # If Workflow Search wanted
-        elif data[dec[0][0]] in (dec[0][3],dec[0][4]):
+        if data[dec[2][0]] == dec[2][1]: 
+            # Download as Markdown
+            response = HttpResponse(temp, content_type="application/md")
+            response['Content-Disposition'] = 'filename="workflow.md"'
+            return response
+        
+        elif data[dec[2][0]] == dec[2][2] and data[dec[3][0]] not in (dec[3][1],dec[3][2]):
+            # Preview Markdown as HTML
+            return HttpResponse(html.format(convert(temp,'html')))
+        
+        elif data[dec[2][0]] == dec[2][2] and data[dec[3][0]] in (dec[3][1],dec[3][2]):
+
+            # Convert to Mediawiki Format
+            page = re.sub('{\|(?! class="wikitable")','{| class="wikitable"',convert(temp,'mediawiki'))
+           
+           # Insert Links for MaRDI, wikidata, swmath and doi entities 
+            for linker in linkers:
+                page = re.sub(r'{0}({1})'.format(linker[0],linker[1]), r'{0}[{1}\1 \1]'.format(linker[0],linker[2]), page)
+
+            # Export Page to MaRDI Portal
+            self.stage('Publishing workflow page')
+            try:
+                edit = self.wikipage_export(self.project.title,page)
+            except PageError as error:
+                return HttpResponse(response_temp.format(err27.format(escape(str(error)))))
+           
+           # Successful Export to Portal
+            self.result = {'page': mardi_wiki+self.project.title.replace(' ','_'), 'qid': workflow_qid, 'edit': edit['result']}
+            return HttpResponse(done.format(export.format(self.result['page'],mardi_wiki+'Item:'+workflow_qid)))
+        
+        else:
+            # Stop if no Export Type is chosen
+            return HttpResponse(response_temp.format(err2))
+
+    @traced
+    def workflow_job(self, job, data):
+        '''Function that runs the workflow documentation as background job.'''
+        self.job = job
+        response = self.workflow_documentation(data)
+        return {'content': response.content.decode(), **self.result}
+
+    def stage(self, name):
+        '''Record the current stage of the workflow documentation.'''
+        mark(name)
+        if self.job:
+            self.job.stage(name)
+
+    ######################################################################################################
+    ######################################################################################################
+    ##                                                                                                  ##
+    ##                                                                                                  ##
+    ##    ▒█░░▒█ ▒█▀▀▀█ ▒█▀▀█ ▒█░▄▀ ▒█▀▀▀ ▒█░░░ ▒█▀▀▀█ ▒█░░▒█ 　 ▒█▀▀▀█ ▒█▀▀▀ ░█▀▀█ ▒█▀▀█ ▒█▀▀█ ▒█░▒█   ##
+    ##    ▒█▒█▒█ ▒█░░▒█ ▒█▄▄▀ ▒█▀▄░ ▒█▀▀▀ ▒█░░░ ▒█░░▒█ ▒█▒█▒█ 　 ░▀▀▀▄▄ ▒█▀▀▀ ▒█▄▄█ ▒█▄▄▀ ▒█░░░ ▒█▀▀█   ##
+    ##    ▒█▄▀▄█ ▒█▄▄▄█ ▒█░▒█ ▒█░▒█ ▒█░░░ ▒█▄▄█ ▒█▄▄▄█ ▒█▄▀▄█ 　 ▒█▄▄▄█ ▒█▄▄▄ ▒█░▒█ ▒█░▒█ ▒█▄▄█ ▒█░▒█   ##
+    ##                                                                                                  ##
+    ##                                                                                                  ##
+    ######################################################################################################
+    ######################################################################################################
+
+    def workflow_search(self, data):
+        '''Function that searches the MaRDI Portal for workflows matching the User answers.'''
+
+        # Key Word and Entities to filter Workflows
+        search_objs=self.wikibase_answers(data,ws['sea'])
+
+        # Criteria a Workflow might match, Workflows are ranked by the Number of matched Criteria
+        matches = []
+        criteria = 0
+
+### Matches via Research Objectives ###############################################################################################################################################################
+
+        # If search via research objective desired
+        if data[dec[4][0]] in (dec[4][1],dec[4][2]):
+            # Separate key words
+            res_objs=[res_obj.lower() for res_obj in search_objs[0].split('; ') if res_obj.strip()]
+            matches+=self.text_matches(res_objs)
+            criteria+=len(res_objs)
+
+### Matches via Research Disciplines ##############################################################################################################################################################
+
+        # If search via research discipline desired
+        if data[dec[5][0]] in (dec[5][1],dec[5][2]):
+            # Separate disciplines, get ID of each research discipline
+            for res_disc in filter(None,search_objs[1].split('; ')):
+                matches.append(statement_match.format(P5,res_disc.split('<|>')[0].split(':')[1].strip()))
+                criteria+=1
+        
+### Matches via Mathematical Models, Methods, Softwares, Input or Output Data Sets ################################################################################################################
 
-            # Key Word and Entities to filter Workflows
-            search_objs=self.wikibase_answers(data,ws['sea'])
+        # If search via Mathematical Models, Methods, Softwares, Input or Output Data Sets
+        if data[dec[6][0]] in (dec[6][1],dec[6][2]):
+            # Separate Mathematical Model, Methods, Software, Input or Output Data Sets, get ID of each
+            for mmsio in filter(None,search_objs[2].split('; ')):
+                matches.append(statement_match.format(P6,mmsio.split('<|>')[0].split(':')[1].strip()))
+                criteria+=1
 
-### SPARQL via Research Objectives ################################################################################################################################################################
-            
-            # SPARQL string definitions
-            quote_str = ''
-            res_obj_strs = ''
-
-            # If SPARQL query via research objective desired
-            if data[dec[4][0]] in (dec[4][1],dec[4][2]):
-                # Get description of workflow
-                quote_str = quote_sparql
-                # Separate key words for SPARQL query vie research objective
-                res_objs=search_objs[0].split('; ')
-                if res_objs:
-                    # Define Filters for SPARQL queries
-                    for res_obj in res_objs:
-                        res_obj_strs+=res_obj_sparql.format(res_obj.lower())
-
-### SPARQL via Research Disciplines ###############################################################################################################################################################
-
-            # SPARQL string definitions
-            res_disc_str = ''
-
-            # If SPARQL query via research discipline desired
-            if data[dec[5][0]] in (dec[5][1],dec[5][2]):
-                # Separate disciplines for SPARQL query via research discipline 
-                res_discs=search_objs[1].split('; ')
-                if res_discs:
-                    for res_disc in res_discs:
-                        # Get ID of research discipline
-                        res_disc_id = res_disc.split('<|>')[0].split(':')[1]
-                        # Define Filters for SPARQL queries
-                        res_disc_str += res_disc_sparql.format(P5,res_disc_id)
-            
-### SPARQL via Mathematical Models, Methods, Softwares, Input or Output Data Sets #################################################################################################################
-
-            # SPARQL string definitions
-            mmsios_str = ''
-
-            # If SPARQL query via Mathematical Models, Methods, Softwares, Input or Output Data Sets
-            if data[dec[6][0]] in (dec[6][1],dec[6][2]):
-                # Separate Mathematical Model, Methods, Software, Input or Output Data Sets
-                mmsios=search_objs[2].split('; ')
-                if mmsios:
-                    for mmsio in mmsios:
-                        # Get ID of mathematical model, method, software, input or output data set
-                        mmsio_id = mmsio.split('<|>')[0].split(':')[1]
-                        # Define Filters for SPARQL queries
-                        mmsios_str += mmsio_sparql.format(P6,mmsio_id)
-
-### Set up Query, query MaRDI Portal and return Results ###########################################################################################################################################
-
-            # Set up entire SPARQL query
-            query = query_base.format(P4,Q2,res_disc_str,mmsios_str,quote_str,res_obj_strs)
-            
-            # Query MaRDI Portal
-            results = self.get_results(mardi_endpoint, query)
+### Set up Query for the requested Page, query MaRDI Portal and stream Results ####################################################################################################################
 
-            # Number of Results
-            no_results = str(len(results))
-            
-            # Generate Links to Wikipage and Knowledge Graoh Entry of Results
-            links =''
-            for result in results:
-                links+=link.format(result["label"]["value"],mardi_wiki+result["label"]["value"].replace(' ','_'),mardi_wiki+'Item:'+result["qid"]["value"])
+        # Page from the request, either as page number or as offset
+        try:
+            offset=int(self.request.GET['offset']) if 'offset' in self.request.GET else (int(self.request.GET.get('page',1))-1)*search_page_size
+        except ValueError:
+            offset=0
+        offset=max(offset,0)
+
+        # One more Workflow than shown tells if there is a next page, no query if no criterion can match
+        query = search_query.format(P4,Q2,'\nUNION\n'.join(matches),search_page_size+1,offset) if matches or not criteria else None
+
+        return StreamingHttpResponse(self.search_pages(query,offset,criteria))
+
+    def text_matches(self, texts):
+        '''Criteria matching key words in the workflow description, via the local entity
+           index if it is authoritative, otherwise via the SPARQL endpoint'''
+        # Quotes and backslashes are escaped for SPARQL strings
+        literal=lambda text: text.replace('\\','\\\\').replace('"','\\"')
+        if entity_index and index_authoritative:
+            found=entity_index.match_descriptions(texts,Q2)
+            if found is not None:
+                return [index_match.format(literal(text),' '.join('wd:'+qid for qid in qids)) for text,qids in found.items() if qids]
+        return [(fulltext_match if search_text == 'fulltext' else contains_match).format(literal(text)) for text in texts]
+
+    def search_pages(self, query, offset, criteria):
+        '''Stream one page of search results, the page head is sent before the MaRDI Portal is queried'''
+        yield search_head.format(offset//search_page_size+1)
+
+        results = self.get_results(mardi_endpoint, query) if query else []
+
+        # Generate Links to Wikipage and Knowledge Graph Entry of Results
+        for result in results[:search_page_size]:
+            yield search_link.format(result["label"]["value"],mardi_wiki+result["label"]["value"].replace(' ','_'),mardi_wiki+'Item:'+result["qid"]["value"],
+                                     result["score"]["value"],criteria)
+
+        # Links to previous and next page
+        pages = []
+        if offset > 0:
+            pages.append(search_nav.format(self.search_url(max(offset-search_page_size,0)),'Previous Page'))
+        if len(results) > search_page_size:
+            pages.append(search_nav.format(self.search_url(offset+search_page_size),'Next Page'))
+
+        yield search_foot.format('' if results else search_none,'\t'.join(pages))
+
+    def search_url(self, offset):
+        '''URL of the search results starting at offset'''
+        query = self.request.GET.copy()
+        query.pop('page', None)
+        query['offset'] = offset
+        return '?' + escape(query.urlencode())
+
+    def answers(self):
+        '''Gather all User answers of the project (snapshot)'''
+        project_wrapper = ProjectWrapper(self.project, self.snapshot)
 
-            return HttpResponse(search_done.format(no_results,links))
- 
-        
-        else:
-            # Stop if Workflow Documentation or Search not chosen
-            return HttpResponse(response_temp.format(err4))
+        # Fetch all values of the project (snapshot) at once
+        values = self.project.values.filter(snapshot=self.snapshot).select_related('attribute', 'option')
+
+        return self.gather_answers(project_wrapper.questions, values)
+
+    def gather_answers(self, questions, values):
+        '''Group values by attribute, set prefix and set index and store the answers
+           of the questions as the RDMO view tags would (modified RDMO Code)'''
+        grouped = {}
+        for value in values:
+            if value.attribute:
+                grouped.setdefault(value.attribute.uri, {}).setdefault(value.set_prefix, {}).setdefault(value.set_index, []).append(value)
+
+        data = Answers()
+        for question in questions:
+            # Questions in sets have one answer per set index, all others only one
+            in_set = any(ancestor['is_collection'] for ancestor in question['ancestors'])
+            set_prefixes = grouped.get(question['attribute'], {})
+            for set_prefix in sorted(set_prefixes):
+                for set_index in sorted(set_prefixes[set_prefix]):
+                    data[question['attribute']+'_'+str(set_index if in_set else 0)]=self.stringify_values(set_prefixes[set_prefix][set_index])
+        return data
 
     def stringify_values(self, values):
         '''Original function from csv export'''
         if values is not None:
-            return '; '.join([self.stringify(value['value_and_unit']) for value in values])
+            return '; '.join([self.stringify(value.value_and_unit) for value in values])
         else:
             return ''
 
@@ -501,97 +582,48 @@ class MaRDIExport(Export):
             return temp
        
         # Set up involved discipines & fields
-        temp=re.sub('DISCIPLINES','; '.join([key for key in data.keys() if ws['dis'][0]+'_' in key]),temp)
-        temp=re.sub('FIELDS','; '.join([key for key in data.keys() if ws['fie'][0]+'_' in key]),temp)
+        temp=re.sub('DISCIPLINES','; '.join(data.keys_of(ws['dis'][0])),temp)
+        temp=re.sub('FIELDS','; '.join(data.keys_of(ws['fie'][0])),temp)
 
         # Set up tables through set numbers (n_max)
         for n,table in enumerate(tables):
-            n_max=max([int(x.split('_')[-1]) if y in x else 0 for x in data.keys() for y in ids[n]])+1
+            n_max=max(data.max_index(y) for y in ids[n])+1
             t=self.create_table(topics[n],ids[n],n_max+2)
             temp=re.sub(table,t,temp)
         return(temp)
        
-    def wikipage_export(self,title,content): 
-        '''Genereic Mediawiki Example'''
-
-        S = requests.Session()
-
-        URL = mardi_api
-
-        # Step 1: GET request to fetch login token
-        PARAMS_0 = {
-            "action": "query",
-            "meta": "tokens",
-            "type": "login",
-            "format": "json"
-        }
-
-        R = S.get(url=URL, params=PARAMS_0)
-        DATA = R.json()
-        
-        LOGIN_TOKEN = DATA['query']['tokens']['logintoken']
-
-        # Step 2: POST request to log in.
-        PARAMS_1 = {
-            "action": "login",
-            "lgname": lgname,
-            "lgpassword": lgpassword,
-            "lgtoken": LOGIN_TOKEN,
-            "format": "json"
-        }
-
-        R = S.post(URL, data=PARAMS_1)
-
-        # Step 3: GET request to fetch CSRF token
-        PARAMS_2 = {
-            "action": "query",
-            "meta": "tokens",
-            "format": "json"
-        }
-
-        R = S.get(url=URL, params=PARAMS_2)
-        DATA = R.json()
-
-        CSRF_TOKEN = DATA['query']['tokens']['csrftoken']
-
-        # Step 4: POST request to edit a page
-
+    def fill_template(self, temp, data):
+        '''Function that fills the placeholders of a template with the user answers
+           in one pass, placeholders without answer are dropped.'''
+        def refine(text):
+            return re.sub('"','',re.sub(";","<br/>",re.sub("Yes: |'","",text)))
+
+        # Escapes in answers are processed as in a re.sub replacement
+        escapes=re.match('','')
+
+        tokens=re.split('('+placeholder+')',temp)
+        filled=[refine(token) if n%2 == 0 else refine(escapes.expand(repr(data[token]))) if token in data else ''
+                for n,token in enumerate(tokens)]
+        return ''.join(filled)
+
+    def wikipage_export(self,title,content):
+        '''Publish page to the MaRDI Portal with the shared Portal login, returns the edit result'''
         post_content=re.sub('<math display="block">','<math>',content)
-
-        PARAMS_3 = {
-            "action": "edit",
-            "title": title,
-            "token": CSRF_TOKEN,
-            "format": "json",
-            "appendtext": post_content
-            }
-
-        R = S.post(URL , data=PARAMS_3, files=dict(foo='bar'))
-        return
+        return publish_page(title,post_content)
 
     def set_lengths(self, data):
         '''Get length of the User sets'''
-        length=[]
-        sts=['Section_3/Set_1','Section_4/Set_2','Section_4/Set_3','Section_4/Set_6','Section_4/Set_7']
-        for st in sts:
-            i=0
-            data_filter = dict(filter(lambda item: st in item[0], data.items()))
-            for key in data_filter.keys():
-                if int(key.split('_')[-1])>=i:
-                    i=int(key.split('_')[-1])+1
-            length.append(i)
-        return length
+        sts=[(3,1),(4,2),(4,3),(4,6),(4,7)]
+        return [data.set_length(section,set_) for section,set_ in sts]
 
     def wikibase_answers(self, data, wiki, length=-1):
         '''Takes data and extracts answers relevant for Wiki'''
         wiki_answers=[]
         if length >= 0:
             for question in wiki:
+                answers=data.question(question)
                 for idx in range(length):
-                    if question+'_'+str(idx) in data:
-                        wiki_answers.append(data[question+'_'+str(idx)])
-                    else:
-                        wiki_answers.append('')
+                    wiki_answers.append(answers.get(idx,''))
         else:
             for question in wiki:
                 if question in data:
@@ -600,21 +632,49 @@ class MaRDIExport(Export):
                     wiki_answers.append('')
         return wiki_answers
 
-    def wikibase_login(self):
-        '''Login stuff for wikibase'''
-        wbi_config['MEDIAWIKI_API_URL'] = mardi_api
-    
-        #login_instance = wbi_login.OAuth1(consumer_token, consumer_secret, access_token, access_secret)
-        login_instance = wbi_login.Login(user=lgname, password=lgpassword)
+    def wikibase_login(self,renew=False):
+        '''Login stuff for wikibase, the login is shared by all exports'''
+        return portal_login.get(renew)
 
-        wbi = WikibaseIntegrator(login=login_instance)
+    def entry(self,label,description,facts):
+        '''Takes arbitrary information and plans MaRDI portal entry, returns placeholder QID.'''
+        return self.plan.add(label,description,facts)
+
+    def write_entry(self,label,description,facts):
+        '''Takes arbitrary information and generates MaRDI portal entry. Exports running at
+           the same time share one entry per label and description instead of writing duplicates.'''
+        qid=item_cache.get(mardi_endpoint,repr((label,description)))
+        if qid is None:
+            qid=flight.do(('write',label,description),self.write_new_entry,label,description,facts)
+        return qid
 
-        return wbi
+    def write_new_entry(self,label,description,facts):
+        '''Write the entry unless an export wrote it meanwhile'''
+        qid=item_cache.get(mardi_endpoint,repr((label,description)))
+        if qid is not None:
+            return qid
 
-    def entry(self,label,description,facts):
-        '''Takes arbitrary information and generates MaRDI portal entry.'''
-        wbi = self.wikibase_login()
-        
+        from wikibaseintegrator.wbi_exceptions import MWApiError
+        try:
+            qid = self.entry_write(self.wikibase_login(),label,description,facts)
+        except MWApiError as error:
+            if error.code not in login_errors:
+                raise
+            # Login expired, log in again and retry
+            qid = self.entry_write(self.wikibase_login(renew=True),label,description,facts)
+        item_cache.set(mardi_endpoint,repr((label,description)),qid)
+        self.plan.created.append({'qid':qid,'label':label,'description':description})
+
+        # Cached MaRDI KG results might miss the new item
+        sparql_cache.invalidate(mardi_endpoint)
+        if entity_index:
+            entity_index.add_item(qid,label,description,facts)
+
+        return qid
+
+    def entry_write(self,wbi,label,description,facts):
+        '''Writes entry with label, description and facts to MaRDI portal.'''
+        from wikibaseintegrator.datatypes import MonolingualText, Time
         item = wbi.item.new()
         item.labels.set('en', label)
         item.descriptions.set('en', description)
@@ -635,14 +695,55 @@ class MaRDIExport(Export):
         return item.id
 
     def get_results(self,endpoint_url, query):
-        '''Perform SPARQL Queries via Get requests'''
-        req=requests.get(endpoint_url, params = {'format': 'json', 'query': query}, headers = {'User-Agent': 'MaRDMO_0.1 (https://zib.de; reidelbach@zib.de)'}).json()
-        return req["results"]["bindings"]
+        '''Perform SPARQL Queries via Get requests, identical queries are answered from cache
+           or share one request while in flight'''
+        results=sparql_cache.get(endpoint_url,normalize(query))
+        if results is None:
+            results=flight.do(('sparql',endpoint_url,normalize(query)),self.fetch_results,endpoint_url,query)
+        return results
+
+    def fetch_results(self,endpoint_url,query):
+        '''Request SPARQL results and cache them'''
+        results=session.get(endpoint_url, params = {'format': 'json', 'query': query}).json()["results"]["bindings"]
+        sparql_cache.set(endpoint_url,normalize(query),results)
+        return results
     
+    def get_check_results(self,endpoint_url,checks):
+        '''Check via Label and Description if entities exist in a KG. MaRDI KG checks are
+           answered by the local entity index if it is authoritative, other checks are sent
+           in chunks as batched VALUES queries and mapped back to their keys.'''
+        results={key:{'qid':{'value':''}} for key in checks}
+
+        # Hits and misses of an index which might be outdated (deleted or merged items) are checked remotely
+        if entity_index and index_authoritative and endpoint_url == mardi_endpoint:
+            found=entity_index.lookup({key:(label.replace(r"\'","'"),quote.replace(r"\'","'")) for key,(label,quote) in checks.items()})
+            if found is not None:
+                for key,qid in found.items():
+                    results[key]['qid']={'type':'literal','value':qid}
+                return results
+
+        if not sparql_batch_size:
+            # One query per entity
+            queries={key:submit(self.get_results,endpoint_url,mini.format('?qid',mbody.format(*checks[key]),'1')) for key in checks}
+            for key in checks:
+                results[key].update(queries[key].result()[0])
+            return results
+
+        keys=list(checks)
+        chunks=[submit(self.get_results,endpoint_url,mbatch.format(''.join([mbatch_row.format(key,*checks[key]) for key in keys[n:n+sparql_batch_size]])))
+                for n in range(0,len(keys),sparql_batch_size)]
+        for chunk in gather(chunks):
+            for result in chunk:
+                # Keep first hit per entity (as LIMIT 1 in single queries)
+                if not results[result['key']['value']]['qid']['value']:
+                    results[result['key']['value']]['qid']=result['qid']
+        return results
+
     def portal_wikidata_check(self,mquery,wquery,data):
         '''Function checks if an entry is on MaRDI portal and returns its QID
            or on Wikidata and copies the entry to the MaRDI portal and returns
            its QID.'''
+        from wikibaseintegrator.datatypes import ExternalID
         if wquery['qid'][0] == 'mardi':
             qid = wquery['qid'][-1]
             entry = [wquery['label'],wquery['quote']]
@@ -669,6 +770,7 @@ class MaRDIExport(Export):
         
     def paper_prop_entry(self,wquery,mquery,props):
         '''This function takes (a property of) a paper and creates the corresponding wikibase entries.'''
+        from wikibaseintegrator.datatypes import ExternalID
         if mquery["qid"]["value"]:
             #If on Portal store QID
             qid=mquery["qid"]["value"]
@@ -701,8 +803,13 @@ class MaRDIExport(Export):
         strings2 = ['moms','mems','pl']
 
         user_answers ={}
-        wq = {} ; qw = {}
-        mq = {} ; qm = {}
+        wq = {} ; mq = {}
+        mc = {}
+
+        ### Publication Queries do not depend on User Answers, run them alongside
+
+        if cit:
+            pub = submit(self.sparql_pub,orcid,doi,cit)
 
         ### Gather all User Answers relevant for MaRDI KG
 
@@ -727,8 +834,7 @@ class MaRDIExport(Export):
 
             # For existing software get programming languages from KGs (might be extended for further information)
             if ABBR in ('sof'):
-                for i in range(x[1]):
-                    res = self.get_pl(x[2][i][0])
+                for i,res in enumerate(gather([submit(self.get_pl,x[2][i][0]) for i in range(x[1])])):
                     if res:
                         x[0][3*x[1]+i] = res
             
@@ -758,57 +864,27 @@ class MaRDIExport(Export):
 
             wq.update({'wq'+s+str(i): {'qid':m[0].split(':'), 'label':m[1], 'quote':m[2], 'form':m[4], 'id':m[5]} for i,m in enumerate(user_answers[d][4])})
             
-            qm.update({'mq'+s+str(i) : mini.format('?qid',mbody.format(wq['wq'+s+str(i)]['label'].replace("'",r"\'"),
-                                                                       wq['wq'+s+str(i)]["quote"].replace("'",r"\'")),'1')
-                                                                       for i in range(user_answers[d][1])})
+            mc.update({'mq'+s+str(i) : (wq['wq'+s+str(i)]['label'].replace("'",r"\'"),
+                                         wq['wq'+s+str(i)]["quote"].replace("'",r"\'"))
+                                         for i in range(user_answers[d][1])})
 
             if s in strings[:3]:
 
                 wq.update({'wq'+s+'_sub'+str(i)+'_'+str(j): {'qid': f[0].split(':'), 'label':f[1], 'quote':f[2]} for i,ss in enumerate(user_answers[d][4]) for j,f in enumerate(ss[3])})
 
-                qm.update({'mq'+s+'_sub'+str(i)+'_'+str(j) : mini.format('?qid',mbody.format(wq['wq'+s+'_sub'+str(i)+'_'+str(j)]['label'].replace("'",r"\'"),
-                                                                                             wq['wq'+s+'_sub'+str(i)+'_'+str(j)]['quote'].replace("'",r"\'")),'1')
-                                                                                             for i,ss in enumerate(user_answers[d][4]) for j,_ in enumerate(ss[3])})
+                mc.update({'mq'+s+'_sub'+str(i)+'_'+str(j) : (wq['wq'+s+'_sub'+str(i)+'_'+str(j)]['label'].replace("'",r"\'"),
+                                                              wq['wq'+s+'_sub'+str(i)+'_'+str(j)]['quote'].replace("'",r"\'"))
+                                                              for i,ss in enumerate(user_answers[d][4]) for j,_ in enumerate(ss[3])})
         
         ### Request Data from MaRDI KG
 
-        for key in qm.keys():
-            mq.update({key:{**dict.fromkeys({'qid'},{'value':''}),**self.get_results(mardi_endpoint,qm[key])[0]}})
+        mq.update(self.get_check_results(mardi_endpoint,mc))
         
         ### Additional Queries if Publication is provided
 
         if cit:
-            
-            #Generate Keys for Publication queries
-
-            keys = dict(Keys)
-            key_dat=[orcid]
-            key_ind=['pub']
-
-            for inds in zip(key_dat,key_ind):
-                for i,_ in enumerate(inds[0]):
-                    if type(keys_flex['wq'+inds[1]]) == str:
-                        keys['wq'+inds[1]]+=keys_flex['wq'+inds[1]].format(i)
-                        keys['mq'+inds[1]]+=keys_flex['mq'+inds[1]].format(i)
-                    else:
-                        keys['wq'+inds[1]]+=keys_flex['wq'+inds[1]][0].format(i)
-                        keys['mq'+inds[1]]+=keys_flex['mq'+inds[1]][0].format(i)
 
-            #Set up SPRQL query and request data from wikidata
-
-            qw.update({'wqpub' : wini.format(keys['wqpub'],wbpub.format(doi[-1].upper(),cit['journal'].lower(),lang_dict[cit['language']],
-                                    cit['language'],cit['title'],''.join([''.join(wbaut.format(i,aut[1])) for i,aut in enumerate(orcid)])),'1')})
-            
-            wq.update({'wqpub':{**dict.fromkeys(keys['wqpub'].split(' ?'),{"value":''}),**self.get_results(wikidata_endpoint,qw['wqpub'])[0]}})
-
-            #Set up SPARQL query and request data from MaRDI KG
-            
-            qm.update({'mqpub' : mini.format(keys['mqpub'],mbpub.format(doi[-1].upper(),wq['wqpub']["label_doi"]["value"],wq['wqpub']["quote_doi"]["value"],cit['journal'].lower(),
-                                    wq['wqpub']["label_jou"]["value"],wq['wqpub']["quote_jou"]["value"],lang_dict[cit['language']],cit['language'],
-                                    wq['wqpub']["label_lan"]["value"],wq['wqpub']["quote_lan"]["value"],cit['title'],''.join([''.join(mbaut.format(i,aut[1],
-                                    wq['wqpub']['label_'+str(i)]['value'],wq['wqpub']['quote_'+str(i)]['value'],aut[0])) for i,aut in enumerate(orcid)])),'1')})
-            
-            mq.update({'mqpub':{**dict.fromkeys(keys['mqpub'].split(' ?'),{"value":''}),**self.get_results(mardi_endpoint,qm['mqpub'])[0]}})
+            wq['wqpub'], mq['mqpub'] = pub.result()
             
             #Separate author, language and journal data requested from Wikidata and MaRDI KG
             
@@ -827,8 +903,45 @@ class MaRDIExport(Export):
 
         return wq, mq
 
+    def sparql_pub(self,orcid,doi,cit):
+        '''This function queries Wikidata and afterwards MaRDI portal for the publication, its journal, language and authors.'''
+
+        #Generate Keys for Publication queries
+
+        keys = dict(Keys)
+        key_dat=[orcid]
+        key_ind=['pub']
+
+        for inds in zip(key_dat,key_ind):
+            for i,_ in enumerate(inds[0]):
+                if type(keys_flex['wq'+inds[1]]) == str:
+                    keys['wq'+inds[1]]+=keys_flex['wq'+inds[1]].format(i)
+                    keys['mq'+inds[1]]+=keys_flex['mq'+inds[1]].format(i)
+                else:
+                    keys['wq'+inds[1]]+=keys_flex['wq'+inds[1]][0].format(i)
+                    keys['mq'+inds[1]]+=keys_flex['mq'+inds[1]][0].format(i)
+
+        #Set up SPRQL query and request data from wikidata
+
+        qw = {'wqpub' : wini.format(keys['wqpub'],wbpub.format(doi[-1].upper(),cit['journal'].lower(),lang_dict[cit['language']],
+                                    cit['language'],cit['title'],''.join([''.join(wbaut.format(i,aut[1])) for i,aut in enumerate(orcid)])),'1')}
+
+        wq = {'wqpub':{**dict.fromkeys(keys['wqpub'].split(' ?'),{"value":''}),**self.get_results(wikidata_endpoint,qw['wqpub'])[0]}}
+
+        #Set up SPARQL query and request data from MaRDI KG
+
+        qm = {'mqpub' : mini.format(keys['mqpub'],mbpub.format(doi[-1].upper(),wq['wqpub']["label_doi"]["value"],wq['wqpub']["quote_doi"]["value"],cit['journal'].lower(),
+                                    wq['wqpub']["label_jou"]["value"],wq['wqpub']["quote_jou"]["value"],lang_dict[cit['language']],cit['language'],
+                                    wq['wqpub']["label_lan"]["value"],wq['wqpub']["quote_lan"]["value"],cit['title'],''.join([''.join(mbaut.format(i,aut[1],
+                                    wq['wqpub']['label_'+str(i)]['value'],wq['wqpub']['quote_'+str(i)]['value'],aut[0])) for i,aut in enumerate(orcid)])),'1')}
+
+        mq = {'mqpub':{**dict.fromkeys(keys['mqpub'].split(' ?'),{"value":''}),**self.get_results(mardi_endpoint,qm['mqpub'])[0]}}
+
+        return wq['wqpub'], mq['mqpub']
+
     def Entry_Generator(self,Type,Sub_Type,Generate,Relations,wq,mq,data):
         '''Function queries Wikidata/MaRDI KG, uses and generates entries in MaRDI Knowledge Graph.'''
+        from wikibaseintegrator.datatypes import ExternalID, Item, String
     
         try:
             del data[ws[Type][0]]
@@ -0,0 +1,227 @@
+import logging
+import sqlite3
+
+from threading import local
+
+from .config import *
+from .id import *
+from .sparql import index_query, index_mapped_query, index_redirect_query
+from .client import session
+
+logger = logging.getLogger(__name__)
+
+# Classes of MaRDI KG entities kept in the index (scholarly articles are left out)
+classes = [Q2, Q3, Q4, Q5, Q6, Q7, Q8, Q9, Q10, Q11]
+
+# Sync state key of the copies of Wikidata entities, which have a Wikidata QID but no class
+mapped = 'wikidata'
+
+# Sync state key of the deletion log, count keys of deleted and redirected (merged) entities
+deleted = 'deleted'
+redirected = 'redirected'
+
+epoch = '1970-01-01T00:00:00Z'
+
+schema = '''
+CREATE TABLE IF NOT EXISTS entities (qid TEXT PRIMARY KEY, label TEXT, description TEXT, class TEXT, wikidata TEXT, search TEXT);
+CREATE INDEX IF NOT EXISTS entities_label ON entities (label, description);
+CREATE INDEX IF NOT EXISTS entities_search ON entities (search);
+CREATE TABLE IF NOT EXISTS synced (class TEXT PRIMARY KEY, modified TEXT);
+'''
+
+# Trigram full-text index of the descriptions for substring matches, kept in sync by triggers
+descriptions = '''
+CREATE VIRTUAL TABLE descriptions USING fts5(description, content='entities', content_rowid='rowid', tokenize='trigram');
+CREATE TRIGGER descriptions_insert AFTER INSERT ON entities BEGIN
+  INSERT INTO descriptions (rowid, description) VALUES (new.rowid, new.description);
+END;
+CREATE TRIGGER descriptions_delete AFTER DELETE ON entities BEGIN
+  INSERT INTO descriptions (descriptions, rowid, description) VALUES ('delete', old.rowid, old.description);
+END;
+CREATE TRIGGER descriptions_update AFTER UPDATE ON entities BEGIN
+  INSERT INTO descriptions (descriptions, rowid, description) VALUES ('delete', old.rowid, old.description);
+  INSERT INTO descriptions (rowid, description) VALUES (new.rowid, new.description);
+END;
+INSERT INTO descriptions (descriptions) VALUES ('rebuild');
+'''
+
+insert = 'INSERT OR REPLACE INTO entities VALUES (?, ?, ?, ?, ?, ?)'
+
+match = 'SELECT entities.qid FROM descriptions JOIN entities ON entities.rowid = descriptions.rowid WHERE {0} AND entities.class = ? ORDER BY entities.qid'
+
+def description_match(text):
+    '''Condition and argument matching descriptions containing text: texts of at least one
+       trigram are looked up in the trigram index as phrase, shorter texts are scanned for'''
+    if len(text) >= 3:
+        return 'descriptions MATCH ?', '"' + text.replace('"', '""') + '"'
+    return "descriptions.description LIKE ? ESCAPE '\\'", '%' + text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+def entity_row(qid, label, description, cls, wikidata):
+    '''Row of the entities table, search holds the normalized label'''
+    return (qid, label, description, cls, wikidata, ' '.join(label.lower().split()))
+
+class EntityIndex:
+    '''Local SQLite index of MaRDI KG entities (QID, English label and description,
+       instance of, Wikidata QID) answering existence checks and searches. Holds the
+       entities of classes and the copies of Wikidata entities (empty class).'''
+
+    def __init__(self, path):
+        self.path = path
+        self.local = local()
+
+    def connection(self):
+        '''SQLite connection of the current thread'''
+        if not hasattr(self.local, 'connection'):
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute('PRAGMA journal_mode=WAL')
+            # Rows replaced by INSERT OR REPLACE fire the delete trigger as well
+            connection.execute('PRAGMA recursive_triggers=ON')
+            connection.executescript(schema)
+            if not connection.execute("SELECT 1 FROM sqlite_master WHERE name = 'descriptions'").fetchone():
+                # Created once per file, filled from the entities of older index files
+                with connection:
+                    connection.executescript(descriptions)
+            self.local.connection = connection
+        return self.local.connection
+
+    def lookup(self, checks):
+        '''Map keys of checks (key: (label, description)) to QIDs of indexed entities
+           with identical label and description. Returns None if the index fails.'''
+        try:
+            connection = self.connection()
+            found = {}
+            for key, (label, description) in checks.items():
+                row = connection.execute('SELECT qid FROM entities WHERE label = ? AND description = ? ORDER BY qid LIMIT 1',
+                                         (label, description)).fetchone()
+                if row:
+                    found[key] = row[0]
+            return found
+        except sqlite3.Error as error:
+            logger.warning('Entity index lookup failed: %s', error)
+
+    def search(self, search, limit):
+        '''Entities whose label starts with search, shaped like wbsearchentities results.
+           Returns None if the index fails.'''
+        search = ' '.join(search.lower().split())
+        try:
+            rows = self.connection().execute('SELECT qid, label, description FROM entities WHERE search >= ? AND search < ? ORDER BY length(label), qid LIMIT ?',
+                                             (search, search+'\uffff', limit)).fetchall()
+        except sqlite3.Error as error:
+            logger.warning('Entity index search failed: %s', error)
+            return None
+        return [{'id': qid, 'label': label, 'description': description,
+                 'display': {'label': {'value': label}, 'description': {'value': description or 'No Description Provided!'}}}
+                for qid, label, description in rows]
+
+    def match_descriptions(self, texts, cls):
+        '''Map texts to the QIDs of entities of a class whose description contains them
+           (case insensitive). Returns None if the index fails.'''
+        try:
+            connection = self.connection()
+            found = {}
+            for text in texts:
+                condition, argument = description_match(text)
+                found[text] = [row[0] for row in connection.execute(match.format(condition), (argument, cls))]
+            return found
+        except sqlite3.Error as error:
+            logger.warning('Entity index search failed: %s', error)
+            return None
+
+    def add(self, qid, label, description, cls, wikidata=''):
+        '''Add or update an entity'''
+        with self.connection() as connection:
+            connection.execute(insert, entity_row(qid, label, description, cls, wikidata))
+
+    def add_item(self, qid, label, description, facts):
+        '''Add an entity written to the MaRDI KG from its facts'''
+        cls = next((fact[1] for fact in facts if fact[2] == P4), '')
+        wikidata = next((fact[1] for fact in facts if fact[2] == P2), '')
+        if cls in classes or not cls and wikidata:
+            try:
+                self.add(qid, label, description, cls, wikidata)
+            except sqlite3.Error as error:
+                logger.warning('Entity index update failed: %s', error)
+
+    def sync(self, full=False):
+        '''Pull entities of all classes and copies of Wikidata entities modified since the
+           last sync from the MaRDI KG and drop entities deleted since the last sync or
+           redirected by merges, returns the number of updated (removed) entities per class.'''
+        connection = self.connection()
+        if full:
+            with connection:
+                connection.execute('DELETE FROM synced')
+        counts = {}
+        for cls in classes + [mapped]:
+            since = self.synced(cls)
+            latest = since
+            counts[cls] = 0
+            offset = 0
+            while True:
+                if cls == mapped:
+                    query = index_mapped_query.format(P2, P4, since, index_page_size, offset)
+                else:
+                    query = index_query.format(P4, cls, since, P2, index_page_size, offset)
+                results = session.get(mardi_endpoint, params = {'format': 'json', 'query': query}).json()['results']['bindings']
+                with connection:
+                    for result in results:
+                        connection.execute(insert, entity_row(result['qid']['value'], result.get('label', {}).get('value', ''),
+                                                              result.get('quote', {}).get('value', ''), '' if cls == mapped else cls,
+                                                              result.get('wikidata', {}).get('value', '')))
+                        latest = max(latest, result['modified']['value'])
+                counts[cls] += len(results)
+                if len(results) < index_page_size:
+                    break
+                offset += index_page_size
+            with connection:
+                connection.execute('INSERT OR REPLACE INTO synced VALUES (?, ?)', (cls, latest))
+        counts[deleted] = self.sync_deletions()
+        counts[redirected] = self.sync_redirects()
+        return counts
+
+    def synced(self, key):
+        '''Time of the latest change pulled for key'''
+        row = self.connection().execute('SELECT modified FROM synced WHERE class = ?', (key,)).fetchone()
+        return row[0] if row else epoch
+
+    def sync_deletions(self):
+        '''Drop items deleted since the last sync (deletion log of the MaRDI Portal), returns their number'''
+        connection = self.connection()
+        since = self.synced(deleted)
+        latest = since
+        count = 0
+        params = {'action': 'query', 'list': 'logevents', 'letype': 'delete', 'leaction': 'delete/delete', 'leprop': 'title|timestamp',
+                  'lestart': since, 'ledir': 'newer', 'lelimit': 'max', 'format': 'json', 'formatversion': 2}
+        while True:
+            response = session.get(mardi_api, params=params).json()
+            events = response['query']['logevents']
+            with connection:
+                for event in events:
+                    # Items are titled Item:QID
+                    qid = event['title'].split(':')[-1]
+                    count += connection.execute('DELETE FROM entities WHERE qid = ?', (qid,)).rowcount
+                    latest = max(latest, event['timestamp'])
+            if 'continue' not in response:
+                break
+            params.update(response['continue'])
+        with connection:
+            connection.execute('INSERT OR REPLACE INTO synced VALUES (?, ?)', (deleted, latest))
+        return count
+
+    def sync_redirects(self):
+        '''Drop items redirected to the item they were merged into, returns their number'''
+        connection = self.connection()
+        count = 0
+        offset = 0
+        while True:
+            query = index_redirect_query.format(index_page_size, offset)
+            results = session.get(mardi_endpoint, params = {'format': 'json', 'query': query}).json()['results']['bindings']
+            with connection:
+                for result in results:
+                    count += connection.execute('DELETE FROM entities WHERE qid = ?', (result['qid']['value'],)).rowcount
+            if len(results) < index_page_size:
+                break
+            offset += index_page_size
+        return count
+
+# Index shared by all exports and providers of the worker process (None if disabled)
+entity_index = EntityIndex(index_path) if index_path else None
@@ -0,0 +1,91 @@
+import time
+import uuid
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+
+from django.db import close_old_connections
+
+from .config import *
+
+# Bounded pool for export jobs, exports cannot occupy more than job_workers threads
+executor = ThreadPoolExecutor(max_workers=job_workers, thread_name_prefix='MaRDMO-job')
+
+# Jobs of the worker process
+jobs = {}
+jobs_lock = Lock()
+
+class Job:
+    '''Export running in the background, records its stages and final result.'''
+
+    def __init__(self, user):
+        self.id = uuid.uuid4().hex
+        self.user = user.id
+        self.status = 'queued'
+        self.stages = []
+        self.result = {}
+        self.error = ''
+        self.created = time.time()
+
+    def stage(self, name):
+        '''Record start of a new stage'''
+        self.stages.append({'name': name, 'start': time.time()})
+        self.save()
+
+    def finish(self, result):
+        self.status = 'done'
+        self.result = result
+        self.save()
+
+    def fail(self, error):
+        self.status = 'failed'
+        self.error = error
+        self.save()
+
+    def as_dict(self):
+        return {'id': self.id, 'user': self.user, 'status': self.status, 'stages': self.stages,
+                'result': self.result, 'error': self.error, 'created': self.created}
+
+    def save(self):
+        '''Share job state with other workers through the Django cache'''
+        if cache_backend:
+            try:
+                from django.core.cache import caches
+                caches[cache_backend].set('MaRDMO:job:' + self.id, self.as_dict(), job_expiry)
+            except Exception:
+                pass
+
+def run(job, function, *args):
+    '''Run function(job, *args) as job, the function returns the result dict of the job'''
+    job.status = 'running'
+    job.save()
+    try:
+        job.finish(function(job, *args))
+    except Exception as error:
+        job.fail('{0}: {1}'.format(type(error).__name__, error))
+    finally:
+        close_old_connections()
+
+def submit_job(user, function, *args):
+    '''Queue function for user and return the job'''
+    job = Job(user)
+    with jobs_lock:
+        # Forget expired jobs
+        for key in [key for key, value in jobs.items() if value.created < time.time() - job_expiry]:
+            del jobs[key]
+        jobs[job.id] = job
+    job.save()
+    executor.submit(run, job, function, *args)
+    return job
+
+def get_job(job_id):
+    '''Return state of job as dict or None'''
+    with jobs_lock:
+        if job_id in jobs:
+            return jobs[job_id].as_dict()
+    if cache_backend:
+        try:
+            from django.core.cache import caches
+            return caches[cache_backend].get('MaRDMO:job:' + job_id)
+        except Exception:
+            pass
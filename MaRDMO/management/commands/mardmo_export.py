@@ -0,0 +1,103 @@
+import json
+import re
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.utils.html import strip_tags
+
+from rdmo.projects.models import Project, Snapshot
+
+from MaRDMO.config import job_workers
+from MaRDMO.export import MaRDIExport
+from MaRDMO.para import dec
+
+class Stages:
+    '''Records the stages of an export like a background job does'''
+
+    def __init__(self):
+        self.stages = []
+
+    def stage(self, name):
+        '''Record start of a new stage'''
+        self.stages.append({'name': name, 'start': time.time()})
+
+class Command(BaseCommand):
+    help = 'Export the workflow documentations of several MaRDI projects to the MaRDI Portal.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('project', nargs='*', type=int, help='IDs of projects to export, all MaRDI projects if omitted.')
+        parser.add_argument('--snapshot', nargs='+', type=int, default=[], help='IDs of snapshots to export (instead of projects).')
+        parser.add_argument('--workers', type=int, default=job_workers, help='Projects exported at the same time, entities planned by several of them are written once.')
+        parser.add_argument('--report', help='File to write the JSON report to (default: standard output).')
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1:
+            raise CommandError('At least one worker is required.')
+
+        # Projects (snapshot None) or snapshots of projects using the MaRDI catalog
+        exports = [(snapshot.project, snapshot) for snapshot in Snapshot.objects.filter(id__in=options['snapshot'], project__catalog__uri__endswith='MaRDI').select_related('project__catalog')]
+        if options['project'] or not options['snapshot']:
+            projects = Project.objects.filter(catalog__uri__endswith='MaRDI').select_related('catalog')
+            if options['project']:
+                projects = projects.filter(id__in=options['project'])
+            exports += [(project, None) for project in projects]
+        if not exports:
+            raise CommandError('No MaRDI projects or snapshots selected.')
+
+        # Exports share the result caches, entity index and Portal login of the process
+        start = time.time()
+        with ThreadPoolExecutor(max_workers=options['workers'], thread_name_prefix='MaRDMO-export') as executor:
+            results = list(executor.map(lambda export: self.export(*export), exports))
+
+        report = {'started': start, 'seconds': round(time.time() - start, 3), 'workers': options['workers'],
+                  'done': sum(result['status'] == 'done' for result in results),
+                  'failed': sum(result['status'] == 'failed' for result in results),
+                  'skipped': sum(result['status'] == 'skipped' for result in results),
+                  'exports': results}
+
+        if options['report']:
+            with open(options['report'], 'w') as file:
+                json.dump(report, file, indent=2)
+            self.stdout.write('{done} exported, {failed} failed, {skipped} skipped in {seconds} s'.format(**report))
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
+
+    def export(self, project, snapshot):
+        '''Run the workflow documentation of a project (snapshot), returns its report entry'''
+        result = {'project': project.id, 'title': project.title, 'snapshot': snapshot.id if snapshot else None}
+        start = time.time()
+        stages = Stages()
+        export = None
+        try:
+            export = MaRDIExport('mde', 'MaRDI Export/Query', 'MaRDMO.export.MaRDIExport')
+            export.project, export.snapshot, export.job = project, snapshot, stages
+
+            data = export.answers()
+            if data.get(dec[0][0]) not in (dec[0][1], dec[0][2]) or data.get(dec[2][0]) != dec[2][2] or data.get(dec[3][0]) not in (dec[3][1], dec[3][2]):
+                result.update(status='skipped', error='No workflow documentation exported to the MaRDI Portal chosen')
+            else:
+                response = export.workflow_documentation(data)
+                if export.result:
+                    result.update(status='done', **export.result)
+                else:
+                    # Checks of the answers failed, report the message of the error page
+                    messages = re.findall(r'<p style="color:red;[^"]*">(.*?)</p>', response.content.decode(), re.S)
+                    result.update(status='failed', error=' '.join(strip_tags(messages[-1] if messages else response.content.decode()).split()))
+        except Exception as error:
+            result.update(status='failed', error='{0}: {1}'.format(type(error).__name__, error))
+        finally:
+            close_old_connections()
+
+        # Items written to the MaRDI KG by this export, also if it failed afterwards
+        plan = getattr(export, 'plan', None)
+        if plan is not None:
+            result['items'] = plan.created
+
+        end = time.time()
+        result['seconds'] = round(end - start, 3)
+        result['stages'] = [{'name': stage['name'], 'seconds': round(following - stage['start'], 3)}
+                            for stage, following in zip(stages.stages, [stage['start'] for stage in stages.stages[1:]] + [end])]
+        return result
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from MaRDMO.citation import PurgeCitations, citation_cache
+
+class Command(BaseCommand):
+    help = 'Drop cached citations of the given DOIs, or of all DOIs, from the shared cache (MARDMO_CACHE_BACKEND).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('doi', nargs='*', help='DOIs to purge, all if omitted.')
+
+    def handle(self, *args, **options):
+        if not citation_cache.backend:
+            # The process tier of the web workers can't be reached from this process
+            raise CommandError('No shared cache configured (MARDMO_CACHE_BACKEND), citations cached by the worker processes expire after MARDMO_CITATION_CACHE_TTL.')
+        removed = PurgeCitations(options['doi'])
+        if options['doi']:
+            self.stdout.write('Purged {0} cached citations of {1}'.format(removed, ', '.join(options['doi'])))
+        else:
+            self.stdout.write('Invalidated cached citations of all DOIs')
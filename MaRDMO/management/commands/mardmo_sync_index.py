@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from MaRDMO.index import entity_index, deleted, redirected
+
+class Command(BaseCommand):
+    help = 'Pull MaRDI KG entities changed since the last sync into the local entity index, drop deleted and merged items.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Pull all entities instead of changed ones.')
+
+    def handle(self, *args, **options):
+        if not entity_index:
+            raise CommandError('No entity index configured, set MARDMO_INDEX_PATH.')
+        counts = entity_index.sync(full=options['full'])
+        for cls, count in counts.items():
+            self.stdout.write('{0}: {1} entities {2}'.format(cls, count, 'removed' if cls in (deleted, redirected) else 'updated'))
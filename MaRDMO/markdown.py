@@ -0,0 +1,193 @@
+import re
+
+from .config import *
+from .timing import span
+
+# Markdown renderer for the subset used by the MaRDI templates: headings, paragraphs,
+# bullet lists, pipe tables, bold text, inline HTML and $ math. Output follows pandoc,
+# which is used for everything else (and for all input if markdown_renderer is 'pandoc').
+
+math_re = re.compile(r'\$\$(.+?)\$\$|\$(?![\s$])((?:[^$\\]|\\.)*?)(?<!\s)\$(?!\d)', re.S)
+tag_re = re.compile(r'</?(?:b|i|u|em|strong|sub|sup|span|br)(?:\s[^<>]*)?/?>', re.I)
+heading_re = re.compile(r'^(#{1,6})\s+(.*?)(?:\s+#+)?\s*$')
+item_re = re.compile(r'^\s{0,3}[*+-]\s+(.*)$')
+separator_re = re.compile(r'^\|?(\s*-+\s*\|)+\s*(-+\s*)?$')
+
+# Constructs outside the supported subset, checked with math removed
+unsupported = [re.compile(pattern, re.M) for pattern in (
+    r'\\',                                   # escapes and raw TeX
+    r'`', r'\]\(', r'\]\[', r'\[\^', r'<(?:https?|mailto):',   # code, links, footnotes
+    r'^(?: {4}|\t)',                         # indented code
+    r'^\s{0,3}(?:>|\d+[.)]\s|```|~~~)',      # quotes, ordered lists, fences
+    r'^\s{0,3}([-=*_])(?:\s*\1){2,}\s*$',    # rules and setext headings
+    r'&#?\w+;', r'<!--', '["\']', r'~', r'\^',
+    r'(?<![*\w])\*(?![\s*])[^*]*?(?<![\s*])\*(?![*\w])',   # *emphasis*
+    r'(?<![\w_])_(?=\S)[^_]*?\S_(?![\w_])',  # _emphasis_
+    r'^\|.*:-|^\|.*-:',                      # aligned table columns
+)]
+
+def convert(markdown, to):
+    '''Convert markdown to 'html' or 'mediawiki'.'''
+    if markdown_renderer == 'pandoc' or not supported(markdown):
+        import pypandoc
+        with span('Converting Markdown', renderer='pandoc'):
+            return pypandoc.convert_text(markdown, to, format='md', extra_args=['--mathjax', '--wrap=preserve'])
+    with span('Converting Markdown', renderer='builtin'):
+        return Renderer(to).render(markdown)
+
+def supported(markdown):
+    '''Check if markdown only uses the subset known to the built in renderer'''
+    text = math_re.sub(' ', markdown)
+    if any(pattern.search(text) for pattern in unsupported):
+        return False
+    # Only inline tags of the templates are passed through
+    return not re.search(r'<[/!?A-Za-z]', tag_re.sub('', text))
+
+class Renderer:
+    '''Built in renderer of one document'''
+
+    def __init__(self, to):
+        self.to = to
+        self.ids = set()
+
+    def render(self, markdown):
+        '''Render blocks separated by blank lines'''
+        output = []
+        for block in re.split(r'\n\s*\n', markdown.strip('\n')):
+            lines = block.split('\n')
+            while lines and lines[0].strip():
+                heading = heading_re.match(lines[0])
+                if heading:
+                    output.append(self.heading(len(heading.group(1)), heading.group(2)))
+                    lines = lines[1:]
+                elif lines[0].lstrip().startswith('|') and len(lines) > 1 and separator_re.match(lines[1].strip()):
+                    rows = []
+                    while lines and lines[0].lstrip().startswith('|'):
+                        rows.append(lines.pop(0))
+                    output.append(self.table(rows))
+                elif item_re.match(lines[0]):
+                    output.append(self.items(lines))
+                    lines = []
+                else:
+                    output.append(self.paragraph(lines))
+                    lines = []
+        return '\n'.join(output)+'\n' if self.to == 'html' else '\n\n'.join(output)+'\n'
+
+    def heading(self, level, text):
+        identifier = self.identifier(text)
+        if self.to == 'html':
+            return '<h{0} id="{1}">{2}</h{0}>'.format(level, identifier, self.inline(text))
+        return '<span id="{0}"></span>\n{1} {2} {1}'.format(identifier, '='*level, self.inline(text))
+
+    def identifier(self, text):
+        '''Unique identifier of a heading as generated by pandoc'''
+        text = re.sub(r'<[^>]*>', '', math_re.sub(lambda match: match.group(1) or match.group(2), text)).lower()
+        text = re.sub(r'[^\w\s.-]', '', text)
+        text = re.sub(r'^[^a-z]+', '', '-'.join(text.split())) or 'section'
+        identifier, count = text, 0
+        while identifier in self.ids:
+            count += 1
+            identifier = '{0}-{1}'.format(text, count)
+        self.ids.add(identifier)
+        return identifier
+
+    def items(self, lines):
+        items = []
+        for line in lines:
+            item = item_re.match(line)
+            if item:
+                items.append([item.group(1)])
+            else:
+                items[-1].append(line)
+        items = [self.inline(' '.join(part.strip() for part in item)) for item in items]
+        if self.to == 'html':
+            return '<ul>\n'+''.join('<li>{0}</li>\n'.format(item) for item in items)+'</ul>'
+        return '\n'.join('* '+item for item in items)
+
+    def paragraph(self, lines):
+        lines = [line.strip() + ('<br />' if line.endswith('  ') else '') for line in lines]
+        lines[-1] = lines[-1][:-len('<br />')] if lines[-1].endswith('<br />') else lines[-1]
+        text = '\n'.join(self.inline(line) for line in lines)
+        if self.to == 'html':
+            return '<p>{0}</p>'.format(text)
+        return text
+
+    def table(self, rows):
+        cells = [self.cells(row) for row in rows[:1] + rows[2:]]
+        columns = len(cells[0])
+        cells = [(row + ['']*columns)[:columns] for row in cells]
+        if self.to == 'html':
+            table = '<table>\n'
+            if any(self.length(row, columns) > 72 for row in rows):
+                # Long rows get relative column widths from the separator dashes
+                dashes = [len(cell.strip()) for cell in self.cells(rows[1])][:columns]
+                dashes += [1]*(columns-len(dashes))
+                widths = [dash/sum(dashes) for dash in dashes]
+                if sum(widths) != 1:
+                    table = '<table style="width:{0}%;">\n'.format(round(100*sum(widths)))
+                table += '<colgroup>\n'+''.join('<col style="width: {0}%" />\n'.format(int(100*width)) for width in widths)+'</colgroup>\n'
+            table += '<thead>\n<tr>\n'+''.join('<th>{0}</th>\n'.format(self.inline(cell)) for cell in cells[0])+'</tr>\n</thead>\n'
+            table += '<tbody>\n'+''.join('<tr>\n'+''.join('<td>{0}</td>\n'.format(self.inline(cell)) for cell in row)+'</tr>\n' for row in cells[1:])+'</tbody>\n'
+            return table+'</table>'
+        table = '{| class="wikitable"\n|-\n'+''.join('! {0}\n'.format(self.inline(cell)) for cell in cells[0])
+        for row in cells[1:]:
+            table += '|-\n'+''.join(('| {0}\n' if cell else '|\n').format(self.inline(cell)) for cell in row)
+        return table+'|}'
+
+    def pipes(self, row):
+        '''Positions of pipes separating cells, pipes within math do not separate cells'''
+        spans = [match.span() for match in math_re.finditer(row)]
+        return [position for position, character in enumerate(row) if character == '|' and not any(begin < position < end for begin, end in spans)]
+
+    def length(self, row, columns):
+        '''Length of a table row without cells exceeding the columns of the header'''
+        row = row.strip()
+        pipes = self.pipes(row)[1 if row.startswith('|') else 0:]
+        return pipes[columns-1]+1 if len(pipes) >= columns else len(row)
+
+    def cells(self, row):
+        '''Cells of a table row'''
+        row = row.strip()
+        cells, start = [], 0
+        for position in self.pipes(row):
+            cells.append(row[start:position])
+            start = position + 1
+        cells.append(row[start:])
+        if row.startswith('|'):
+            cells = cells[1:]
+        if row.endswith('|') and len(cells) > 1:
+            cells = cells[:-1]
+        return [cell.strip() for cell in cells]
+
+    def inline(self, text):
+        '''Inline formatting: math, inline HTML, bold, typography and escaping'''
+        output, start = '', 0
+        for match in math_re.finditer(text):
+            output += self.text(text[start:match.start()])
+            if match.group(1) is not None:
+                output += self.math(match.group(1), 'display')
+            else:
+                output += self.math(match.group(2), 'inline')
+            start = match.end()
+        return output + self.text(text[start:])
+
+    def math(self, tex, display):
+        if self.to == 'html':
+            tex = tex.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+            return '<span class="math {0}">{1}</span>'.format(display, '\\({0}\\)' if display == 'inline' else '\\[{0}\\]').format(tex)
+        return '<math display="{0}">{1}</math>'.format('inline' if display == 'inline' else 'block', tex)
+
+    def text(self, text):
+        output, start = '', 0
+        for match in tag_re.finditer(text):
+            output += self.plain(text[start:match.start()]) + match.group(0)
+            start = match.end()
+        return output + self.plain(text[start:])
+
+    def plain(self, text):
+        text = re.sub(r'[ \t]+', ' ', text)
+        text = text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+        text = text.replace('---', '—').replace('--', '–').replace('...', '…')
+        if self.to == 'html':
+            return re.sub(r'\*\*(?=\S)(.+?)(?<=\S)\*\*', r'<strong>\1</strong>', text)
+        return re.sub(r'\*\*(?=\S)(.+?)(?<=\S)\*\*', r"'''\1'''", text)
@@ -361,12 +361,9 @@ lang_dict={'af':'Afrikaans','ar':'Arabic','bg':'Bulgarian','bn':'Bengali',
            'th':'Thai','tl':'Tagalog','tr':'Turkish','uk':'Ukrainian','ur':'Urdu',
            'vi':'Vietnamese','zh-cn':'Putonghua','zh-tw':'Taiwanese Mandarin'}
 
-# Refine Stuff
+# Template Placeholders (Question URIs with Set Index)
 
-refine_strs=[BASE_URI+"Section_\d{1}/Set_\d{1}/Question_\d{2}_\d",
-             BASE_URI+"Section_\d{1}/Set_\d{1}/Question_\d{2}",
-             BASE_URI+"Section_\d{1}/Set_\d{1}/Wiki_\d{2}_\d",
-             BASE_URI+"Section_\d{1}/Set_\d{1}/Wiki_\d{2}"]
+placeholder=BASE_URI+r"Section_\d+/Set_\d+/(?:Question|Wiki)_\d{2}(?:_\d+)*"
 
 # Link Stuff
 
@@ -0,0 +1,80 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import copy_context
+from copy import deepcopy
+from threading import BoundedSemaphore, Lock
+from urllib.parse import urlparse
+
+from .config import *
+
+# Thread pool shared by all exports of the worker process
+executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='MaRDMO')
+
+# Thread pool of the interactive searches of the option set providers, running
+# exports occupying all threads of the shared pool can't hold up the autocomplete
+search_executor = ThreadPoolExecutor(max_workers=search_workers, thread_name_prefix='MaRDMO-search')
+
+# One semaphore per host bounding the number of simultaneous requests
+semaphores = {}
+semaphores_lock = Lock()
+
+def submit(function, *args, **kwargs):
+    '''Schedule a lookup in the shared thread pool and return its future.'''
+    if export_timing:
+        # Requests of the lookup are timed as part of the calling export
+        return executor.submit(copy_context().run, function, *args, **kwargs)
+    return executor.submit(function, *args, **kwargs)
+
+def submit_search(function, *args, **kwargs):
+    '''Schedule an interactive search in its own thread pool and return its future.'''
+    return search_executor.submit(function, *args, **kwargs)
+
+def gather(futures):
+    '''Wait for scheduled lookups and return their results in order.'''
+    return [future.result() for future in futures]
+
+@contextmanager
+def limit(url):
+    '''Bound the number of concurrent requests sent to the host of url.'''
+    host = urlparse(url).netloc
+    with semaphores_lock:
+        if host not in semaphores:
+            semaphores[host] = BoundedSemaphore(max_concurrency.get(host, max_concurrency_default))
+    with semaphores[host]:
+        yield
+
+class SingleFlight:
+    '''Coalesce identical concurrent calls: while a call for a key is in flight,
+       further callers with the same key wait for and share its result.'''
+
+    def __init__(self):
+        self.calls = {}
+        self.lock = Lock()
+        self.counts = {'calls': 0, 'shared': 0}
+
+    def do(self, key, function, *args, **kwargs):
+        '''Run function(*args, **kwargs) unless a call for key is already in flight.'''
+        with self.lock:
+            future = self.calls.get(key)
+            leader = future is None
+            if leader:
+                future = self.calls[key] = Future()
+                self.counts['calls'] += 1
+            else:
+                self.counts['shared'] += 1
+        if not leader:
+            # Waiters get their own copy, callers may modify results
+            return deepcopy(future.result())
+        try:
+            result = function(*args, **kwargs)
+            future.set_result(result)
+            return result
+        except BaseException as error:
+            future.set_exception(error)
+            raise
+        finally:
+            with self.lock:
+                del self.calls[key]
+
+# Coalesces identical outbound requests of the worker process
+flight = SingleFlight()
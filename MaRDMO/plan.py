@@ -0,0 +1,68 @@
+import re
+
+from .parallel import submit, gather
+
+class WritePlan:
+    '''Collects the items to be created on the MaRDI portal. Each planned item gets a
+       placeholder QID, which may be used in the facts of other items and in the user
+       answers. Writing the plan creates independent items concurrently in waves ordered
+       by their dependencies and resolves the placeholders afterwards.'''
+
+    placeholder = '<new-item-{0}>'
+    placeholder_re = re.compile(r'<new-item-\d+>')
+
+    def __init__(self):
+        self.items = []
+        self.planned = {}
+        self.qids = {}
+        # Items written by this plan (QID, label, description), also of waves that failed later on
+        self.created = []
+
+    def add(self, label, description, facts):
+        '''Plan a new item and return its placeholder QID, identical items are only planned once'''
+        key = (label, description, repr(facts))
+        if key not in self.planned:
+            placeholder = self.placeholder.format(len(self.items))
+            self.items.append({'placeholder': placeholder, 'label': label, 'description': description, 'facts': facts,
+                               'dependencies': {fact[1] for fact in facts if isinstance(fact[1], str) and self.placeholder_re.fullmatch(fact[1])}})
+            self.planned[key] = placeholder
+        return self.planned[key]
+
+    def waves(self):
+        '''Split the planned items into waves, items of a wave only depend on items of previous waves'''
+        waves = []
+        done = set()
+        pending = list(self.items)
+        while pending:
+            wave = [item for item in pending if item['dependencies'] <= done]
+            waves.append(wave)
+            done.update(item['placeholder'] for item in wave)
+            pending = [item for item in pending if item['placeholder'] not in done]
+        return waves
+
+    def write(self, write):
+        '''Write the planned items wave by wave via write(label, description, facts)'''
+        for wave in self.waves():
+            qids = gather([submit(write, item['label'], item['description'],
+                                  [(fact[0], self.resolve(fact[1]), fact[2]) for fact in item['facts']])
+                           for item in wave])
+            self.qids.update(zip([item['placeholder'] for item in wave], qids))
+        return self.qids
+
+    def resolve(self, value):
+        '''Replace placeholder QIDs in value by the QIDs of the written items'''
+        if isinstance(value, str):
+            return self.placeholder_re.sub(lambda match: self.qids.get(match.group(0), match.group(0)), value)
+        return value
+
+    def describe(self):
+        '''Human readable list of the planned items per wave'''
+        lines = []
+        for n, wave in enumerate(self.waves()):
+            lines.append('Wave {0}:'.format(n + 1))
+            for item in wave:
+                lines.append('  {0} {1} ({2})'.format(item['placeholder'], item['label'], item['description']))
+                for fact in item['facts']:
+                    if fact[1]:
+                        lines.append('    P{0}: {1} [{2}]'.format(fact[2], fact[1], fact[0].__name__))
+        return '\n'.join(lines)
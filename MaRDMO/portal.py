@@ -0,0 +1,98 @@
+import hashlib
+import time
+
+from threading import Lock
+
+from .config import *
+from .client import Session, redirect
+
+# Errors of the MediaWiki API indicating an expired login or edit token
+login_errors = ('badtoken', 'notoken', 'assertuserfailed', 'assertbotfailed')
+
+class PortalLogin:
+    '''Authenticated WikibaseIntegrator instance shared by all exports of the worker
+       process. The login is renewed after login_expiry seconds or on token failures.'''
+
+    def __init__(self):
+        self.wbi = None
+        self.created = 0
+        self.lock = Lock()
+
+    def get(self, renew=False):
+        '''Return logged in WikibaseIntegrator instance, log in if required'''
+        with self.lock:
+            if renew or not self.wbi or time.monotonic() - self.created > login_expiry:
+                # Imported on first login, wikibaseintegrator is slow to import
+                from wikibaseintegrator import wbi_login, WikibaseIntegrator
+                from wikibaseintegrator.wbi_config import config as wbi_config
+
+                wbi_config['MEDIAWIKI_API_URL'] = mardi_api
+                wbi_config['USER_AGENT'] = user_agent
+
+                #login_instance = wbi_login.OAuth1(consumer_token, consumer_secret, access_token, access_secret)
+                login_instance = wbi_login.Login(user=lgname, password=lgpassword, mediawiki_api_url=redirect(mardi_api))
+
+                # Continue logged in session with the shared HTTP client
+                session = Session()
+                session.headers.update(login_instance.session.headers)
+                session.cookies.update(login_instance.session.cookies)
+                login_instance.session = session
+                # The shared HTTP client sends requests to the replacement of the host itself
+                login_instance.mediawiki_api_url = mardi_api
+
+                self.wbi = WikibaseIntegrator(login=login_instance)
+                self.created = time.monotonic()
+            return self.wbi
+
+    def session(self, renew=False):
+        '''Return logged in MediaWiki session'''
+        return self.get(renew).login.get_session()
+
+    def edit_token(self, renew=False):
+        '''Return CSRF token of the logged in MediaWiki session'''
+        return self.get(renew).login.get_edit_token()
+
+# Login to the MaRDI Portal
+portal_login = PortalLogin()
+
+class PageError(Exception):
+    '''Error of the MediaWiki API when publishing a page'''
+
+    def __init__(self, code, info):
+        super().__init__('{0}: {1}'.format(code, info))
+        self.code = code
+
+def publish_page(title, text):
+    '''Replace the content of a MaRDI Portal wiki page by text. The edit is skipped if the
+       latest revision has the same content and fails with editconflict if the page changed
+       in between. Expired logins and tokens are renewed once. Returns the edit result, refused
+       edits raise PageError.'''
+    # MediaWiki stores text with normalized line endings and without trailing whitespace
+    text = text.replace('\r\n', '\n').replace('\r', '\n').rstrip()
+    sha1 = hashlib.sha1(text.encode()).hexdigest()
+
+    for renew in (False, True):
+        session = portal_login.session(renew)
+        page = session.get(mardi_api, params={'action': 'query', 'prop': 'revisions', 'rvprop': 'ids|sha1|timestamp', 'rvslots': 'main',
+                                              'titles': title, 'format': 'json', 'formatversion': 2}).json()['query']['pages'][0]
+
+        params = {'action': 'edit', 'title': title, 'text': text, 'token': portal_login.edit_token(), 'format': 'json', 'formatversion': 2}
+        if page.get('revisions'):
+            revision = page['revisions'][0]
+            if revision.get('slots', {}).get('main', {}).get('sha1', revision.get('sha1')) == sha1:
+                return {'result': 'Unchanged', 'title': page['title'], 'newrevid': revision['revid']}
+            # Edit conflict if the page was changed after the revision compared
+            params.update({'baserevid': revision['revid'], 'basetimestamp': revision['timestamp']})
+        else:
+            params['createonly'] = 1
+
+        response = session.post(mardi_api, data=params).json()
+        if 'error' not in response:
+            edit = response['edit']
+            # Edits refused by extensions (abuse filter, captcha, ...) are answered with result Failure
+            if edit.get('result') not in ('Success', 'Unchanged'):
+                code = edit.get('code') or ('captcha' if 'captcha' in edit else str(edit.get('result', 'unknown')).lower())
+                raise PageError(code, edit.get('info', edit.get('warning', '')))
+            return edit
+        if response['error']['code'] not in login_errors or renew:
+            raise PageError(response['error']['code'], response['error'].get('info', ''))
@@ -1,6 +1,99 @@
-import requests
+import logging
+import time
+
+from concurrent.futures import TimeoutError
 from rdmo.options.providers import Provider
 from .config import *
+from .client import session
+from .parallel import submit_search, flight
+from .cache import Cache
+from .index import entity_index
+from .display import partial_text
+
+logger = logging.getLogger(__name__)
+
+# Results of wbsearchentities requests, namespaced by API and language
+search_cache = Cache('search', search_cache_size, {}, search_cache_ttl, cache_backend)
+
+search_limit = 10
+
+def search_params(search, language='en'):
+    '''Parameters of wbsearchentities requests'''
+    return {'action': 'wbsearchentities', 'format': 'json', 'language': language, 'type': 'item', 'limit': search_limit, 'search': search}
+
+def normalize_search(search):
+    '''Search string as used for caching'''
+    return ' '.join(search.lower().split())
+
+def search_entities(api, search, language='en'):
+    '''Search entities via wbsearchentities of api and cache results, identical
+       concurrent searches share one request'''
+    return flight.do(('search', api, language, normalize_search(search)), fetch_entities, api, search, language)
+
+def fetch_entities(api, search, language):
+    '''Request wbsearchentities of api and cache results'''
+    results = session.get(api, params = search_params(search, language)).json()['search']
+    search_cache.set(api+'|'+language, normalize_search(search), results)
+    return results
+
+def cached_search(api, search, language='en'):
+    '''Search results from cache. If a shorter prefix of search returned less than
+       search_limit results, these contain all results of search and are filtered
+       locally. Returns None if search is not answered by the cache.'''
+    namespace = api+'|'+language
+    search = normalize_search(search)
+    results = search_cache.get(namespace, search)
+    if results is not None:
+        return results
+    for end in range(len(search)-1, 2, -1):
+        prefix_results = search_cache.get(namespace, search[:end])
+        if prefix_results is not None and len(prefix_results) < search_limit:
+            results = [result for result in prefix_results if matches(result, search)]
+            search_cache.set(namespace, search, results)
+            return results
+
+def matches(result, search):
+    '''Check if search is a prefix of the label, alias or matched text of a search result'''
+    texts = [result.get('match', {}).get('text', ''), result.get('label', '')] + result.get('aliases', [])
+    return any(normalize_search(text).startswith(search) for text in texts)
+
+def format_option(source, index, result):
+    '''Option of a search result: source:QID <|> label <|> description'''
+    try:
+        return {'id':source[0].upper()+str(index),'text':source+':'+result['id']+' <|> '+result['display']['label']['value']+' <|> '+result['display']['description']['value']}
+    except:
+        # MaRDI labels without description start with an additional character
+        label = result['display']['label']['value'][1:] if source == 'mardi' else result['display']['label']['value']
+        return {'id':source[0].upper()+str(index),'text':source+':'+result['id']+' <|> '+label+' <|> No Description Provided!'}
+
+def search_sources(apis, search):
+    '''Search all apis concurrently. Sources not answering within their deadline
+       (or failing) are skipped, their results are None. Returns the results per api
+       and the skipped apis (partial results if not empty).'''
+    start = time.monotonic()
+    results = {api: cached_search(api, search) for api in apis}
+    futures = {api: submit_search(search_entities, api, search) for api in apis if results[api] is None}
+    skipped = []
+    for api, future in futures.items():
+        deadline = search_deadline.get(api, search_deadline_default) - (time.monotonic() - start)
+        try:
+            results[api] = future.result(timeout=max(deadline, 0))
+        except TimeoutError:
+            logger.warning('Partial search results for "%s", %s did not answer in time', search, api)
+            results[api] = None
+            skipped.append(api)
+        except Exception as error:
+            logger.warning('Partial search results for "%s", %s failed: %s', search, api, error)
+            results[api] = None
+            skipped.append(api)
+    return results, skipped
+
+# Names of the search sources in the note on partial results
+source_names = {wikidata_api: 'Wikidata', mardi_api: 'MaRDI Portal'}
+
+def partial_option(skipped):
+    '''Option noting that the results of the skipped apis are missing'''
+    return {'id': 'partial', 'text': partial_text + ', '.join(source_names.get(api, api) for api in skipped) + ' did not answer, search again for all results'}
 
 class WikidataSearch(Provider):
     
@@ -11,27 +104,24 @@ class WikidataSearch(Provider):
         if not search or len(search)<3:
             return []
 
-        qwiki=requests.get(wikidata_api+'?action=wbsearchentities&format=json&language=en&type=item&limit=10&search={0}'.format(search),
-                           headers = {'User-Agent': 'MaRDMO_0.1 (https://zib.de; reidelbach@zib.de)'}).json()['search']
+        results,skipped=search_sources([wikidata_api, mardi_api], search)
+
+        qwiki=results[wikidata_api] or []
 
-        qmard=requests.get(mardi_api+'?action=wbsearchentities&format=json&language=en&type=item&limit=10&search={0}'.format(search),
-                           headers = {'User-Agent': 'MaRDMO_0.1 (https://zib.de; reidelbach@zib.de)'}).json()['search']
+        qmard=results[mardi_api] or []
         
         options=[]
 
         for index in range(10):
             
             if index < len(qwiki):
-                try:
-                    options.append({'id':'W'+str(index),'text':'wikidata:'+qwiki[index]['id']+' <|> '+qwiki[index]['display']['label']['value']+' <|> '+qwiki[index]['display']['description']['value']})
-                except:
-                    options.append({'id':'W'+str(index),'text':'wikidata:'+qwiki[index]['id']+' <|> '+qwiki[index]['display']['label']['value']+' <|> No Description Provided!'})
+                options.append(format_option('wikidata', index, qwiki[index]))
             
             if index < len(qmard):
-                try:
-                    options.append({'id':'M'+str(index),'text':'mardi:'+qmard[index]['id']+' <|> '+qmard[index]['display']['label']['value']+' <|> '+qmard[index]['display']['description']['value']})
-                except:
-                    options.append({'id':'M'+str(index),'text':'mardi:'+qmard[index]['id']+' <|> '+qmard[index]['display']['label']['value'][1:]+' <|> No Description Provided!'})
+                options.append(format_option('mardi', index, qmard[index]))
+
+        if skipped:
+            options.append(partial_option(skipped))
 
         return options
 
@@ -44,16 +134,22 @@ class ComponentSearch(Provider):
         if not search or len(search)<3:
             return []
 
-        qmard=requests.get(mardi_api+'?action=wbsearchentities&format=json&language=en&type=item&limit=10&search={0}'.format(search),
-                           headers = {'User-Agent': 'MaRDMO_0.1 (https://zib.de; reidelbach@zib.de)'}).json()['search']
+        # Local entity index first, MaRDI KG search as fallback
+        qmard=entity_index.search(search, search_limit) if entity_index else None
+
+        skipped=[]
+        if not qmard:
+            results,skipped=search_sources([mardi_api], search)
+            qmard=results[mardi_api] or []
 
         options=[]
 
         for index in range(20):
 
             if index < len(qmard):
-                try:
-                    options.append({'id':'M'+str(index),'text':'mardi:'+qmard[index]['id']+' <|> '+qmard[index]['display']['label']['value']+' <|> '+qmard[index]['display']['description']['value']})
-                except:
-                    options.append({'id':'M'+str(index),'text':'mardi:'+qmard[index]['id']+' <|> '+qmard[index]['display']['label']['value'][1:]+' <|> No Description Provided!'})
+                options.append(format_option('mardi', index, qmard[index]))
+
+        if skipped:
+            options.append(partial_option(skipped))
+
         return options
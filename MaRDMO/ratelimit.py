@@ -0,0 +1,131 @@
+import math
+import time
+
+from email.utils import parsedate_to_datetime
+from threading import Lock
+
+from django.core.exceptions import ImproperlyConfigured
+
+from .config import *
+
+def check_limit(name, limit):
+    '''Raise ImproperlyConfigured unless limit is None or (rate, burst) with a positive rate
+       (fractions for less than one request per second) and a burst of at least one request'''
+    if limit is None:
+        return
+    try:
+        rate, burst = limit
+        valid = rate > 0 and burst >= 1
+    except (TypeError, ValueError):
+        valid = False
+    if not valid:
+        raise ImproperlyConfigured('{0}: rate limit {1!r} is not (requests per second > 0, burst >= 1) or None'.format(name, limit))
+
+class TokenBucket:
+    '''Token bucket of one host: rate requests per second on average, bursts of up to burst requests'''
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = Lock()
+
+    def reserve(self):
+        '''Take a token, returns the seconds to wait until it is available'''
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # Tokens taken ahead of time delay later requests
+            self.tokens -= 1
+            return max(-self.tokens / self.rate, 0)
+
+class RateLimiter:
+    '''Per host rate limits of outbound requests shared by all threads of the worker process.
+       With rate_limit_shared the limits and pauses are shared by all worker processes through
+       the Django cache (per second request counts instead of token buckets).'''
+
+    def __init__(self):
+        self.buckets = {}
+        self.paused = {}
+        self.lock = Lock()
+
+    def acquire(self, host):
+        '''Wait until a request may be sent to host'''
+        pause = self.paused.get(host, 0) - time.time()
+        if rate_limit_shared and cache_backend:
+            pause = max(pause, self.shared_pause(host))
+        if pause > 0:
+            time.sleep(pause)
+
+        limit = rate_limits.get(host, rate_limit_default)
+        if not limit:
+            return
+        if rate_limit_shared and cache_backend and self.shared_acquire(host, limit[0]):
+            return
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(*limit)
+        time.sleep(self.buckets[host].reserve())
+
+    def pause(self, host, seconds):
+        '''Hold back requests to host for seconds (Retry-After, maxlag)'''
+        seconds = min(seconds, rate_limit_max_pause)
+        until = time.time() + seconds
+        with self.lock:
+            self.paused[host] = max(self.paused.get(host, 0), until)
+        if rate_limit_shared and cache_backend:
+            try:
+                from django.core.cache import caches
+                caches[cache_backend].set('MaRDMO:pause:' + host, until, math.ceil(seconds) + 1)
+            except Exception:
+                pass
+
+    def shared_pause(self, host):
+        '''Seconds requests to host are paused by any worker process'''
+        try:
+            from django.core.cache import caches
+            return caches[cache_backend].get('MaRDMO:pause:' + host, 0) - time.time()
+        except Exception:
+            return 0
+
+    def shared_acquire(self, host, rate):
+        '''Count the request in the current window of all worker processes (one second, longer
+           for rates below one request per second), wait for the next window while the rate is
+           exceeded. Returns False if the cache is unavailable.'''
+        window = max(1, 1 / rate)
+        allowed = max(1, math.floor(rate * window))
+        try:
+            from django.core.cache import caches
+            cache = caches[cache_backend]
+            while True:
+                now = time.time()
+                key = 'MaRDMO:rate:{0}:{1}:{2}'.format(host, window, math.floor(now / window))
+                cache.add(key, 0, math.ceil(window) + 1)
+                if cache.incr(key) <= allowed:
+                    return True
+                time.sleep((math.floor(now / window) + 1) * window - now)
+        except Exception:
+            return False
+
+def retry_after(response):
+    '''Seconds of the Retry-After header of a response (None if missing)'''
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(float(value), 0)
+    except ValueError:
+        pass
+    try:
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0)
+    except (TypeError, ValueError):
+        return None
+
+for host, limit in rate_limits.items():
+    check_limit('MARDMO_RATE_LIMITS[{0!r}]'.format(host), limit)
+check_limit('MARDMO_RATE_LIMIT_DEFAULT', rate_limit_default)
+
+# Rate limits of the worker process
+limiter = RateLimiter()
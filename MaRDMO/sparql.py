@@ -1,27 +1,28 @@
 from .config import *
 from .id import *
 
-#SPARQL Query Base and components for Workflow Search
+#SPARQL Query Base and components for Workflow Search (Workflows matching at least one Criterion, ranked by Number of Matches)
 
-query_base="""
+search_query="""
 PREFIX wdt: """+wdt+"""
 PREFIX wd: """+wd+"""
-SELECT DISTINCT ?label ?qid
+PREFIX bds: <http://www.bigdata.com/rdf/search#>
+SELECT ?label ?qid (COUNT(DISTINCT ?match) AS ?score)
 WHERE {{
 ?workflow wdt:P{0} wd:{1};
-          rdfs:label ?label;
-          {2}
-          {3}
-          {4}
-{5}
+          rdfs:label ?label.
+{2}
 BIND(STRAFTER(STR(?workflow),STR(wd:)) AS ?qid).
 }}
-LIMIT 10"""
+GROUP BY ?label ?qid
+ORDER BY DESC(?score) ?label ?qid
+LIMIT {3}
+OFFSET {4}"""
 
-quote_sparql = "schema:description ?quote;"
-res_obj_sparql = "FILTER(CONTAINS(lcase(str(?quote)), '{}'@en)).\n"
-res_disc_sparql = "wdt:P{0} wd:{1};\n"
-mmsio_sparql = "wdt:P{0} wd:{1};\n"
+statement_match = '{{ ?workflow wdt:P{0} wd:{1}. BIND("P{0} {1}" AS ?match) }}'
+fulltext_match = '{{ ?quote bds:search "{0}"; bds:matchAllTerms "true". ?workflow schema:description ?quote. BIND("text {0}" AS ?match) }}'
+contains_match = '{{ ?workflow schema:description ?quote. FILTER(CONTAINS(lcase(str(?quote)), "{0}")). BIND("text {0}" AS ?match) }}'
+index_match = '{{ VALUES ?workflow {{ {1} }} BIND("text {0}" AS ?match) }}'
 
 #SPARQL Keys for Queries related to Publication
 
@@ -81,6 +82,72 @@ LIMIT {2}'''
 mini='''
 PREFIX wdt:'''+wdt+''' PREFIX wd:'''+wd+wini
 
+#SPARQL Query for batched Label / Description Checks in MaRDI KG
+
+mbatch='''
+PREFIX wdt:'''+wdt+''' PREFIX wd:'''+wd+'''
+SELECT ?key ?qid
+WHERE
+{{
+VALUES (?key ?label ?quote) {{
+{0}
+}}
+?chk rdfs:label ?label;schema:description ?quote.BIND(STRAFTER(STR(?chk),STR(wd:)) AS ?qid).
+}}'''
+
+mbatch_row = "('{0}' '{1}'@en '{2}'@en)\n"
+
+#SPARQL Query for incremental Sync of local Entity Index (class, modified since, limit, offset)
+
+index_query='''
+PREFIX wdt:'''+wdt+''' PREFIX wd:'''+wd+'''
+SELECT ?qid ?label ?quote ?wikidata ?modified
+WHERE
+{{
+?item wdt:P{0} wd:{1};schema:dateModified ?modified.
+FILTER (?modified >= "{2}"^^xsd:dateTime)
+OPTIONAL{{?item rdfs:label ?label.FILTER (lang(?label) = 'en').}}
+OPTIONAL{{?item schema:description ?quote.FILTER (lang(?quote) = 'en').}}
+OPTIONAL{{?item wdt:P{3} ?wikidata.}}
+BIND(STRAFTER(STR(?item),STR(wd:)) AS ?qid).
+}}
+ORDER BY ?item
+LIMIT {4}
+OFFSET {5}'''
+
+#SPARQL Query for incremental Sync of Wikidata Copies without Class (Wikidata property, instance of, modified since, limit, offset)
+
+index_mapped_query='''
+PREFIX wdt:'''+wdt+''' PREFIX wd:'''+wd+'''
+SELECT ?qid ?label ?quote ?wikidata ?modified
+WHERE
+{{
+?item wdt:P{0} ?wikidata;schema:dateModified ?modified.
+FILTER NOT EXISTS {{?item wdt:P{1} ?class.}}
+FILTER (?modified >= "{2}"^^xsd:dateTime)
+OPTIONAL{{?item rdfs:label ?label.FILTER (lang(?label) = 'en').}}
+OPTIONAL{{?item schema:description ?quote.FILTER (lang(?quote) = 'en').}}
+BIND(STRAFTER(STR(?item),STR(wd:)) AS ?qid).
+}}
+ORDER BY ?item
+LIMIT {3}
+OFFSET {4}'''
+
+#SPARQL Query for Redirects of merged Items in the local Entity Index (limit, offset)
+
+index_redirect_query='''
+PREFIX wd:'''+wd+'''
+SELECT ?qid ?target
+WHERE
+{{
+?item owl:sameAs ?redirect.
+BIND(STRAFTER(STR(?item),STR(wd:)) AS ?qid).
+BIND(STRAFTER(STR(?redirect),STR(wd:)) AS ?target).
+}}
+ORDER BY ?item
+LIMIT {0}
+OFFSET {1}'''
+
 #SPARQL Query for additional programming language queries
 
 pl_vars = '?qid ?label ?quote'
@@ -0,0 +1,200 @@
+import functools
+import json
+import logging
+import re
+import time
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from threading import Lock
+
+from .config import *
+
+logger = logging.getLogger(__name__)
+
+# Trace of the export running in the current context (None outside of exports or if timing is disabled)
+current = ContextVar('mardmo_trace', default=None)
+
+class Trace:
+    '''Stages, spans and outbound requests of one export'''
+
+    def __init__(self, name):
+        self.name = name
+        self.start = time.perf_counter()
+        self.started = time.time()
+        self.spans = []
+        self.stage = None
+        self.lock = Lock()
+
+    def add(self, record):
+        with self.lock:
+            self.spans.append(record)
+
+    def mark(self, name):
+        '''End the current stage and begin the stage name (None ends the last stage)'''
+        now = time.perf_counter()
+        with self.lock:
+            if self.stage:
+                self.stage['duration'] = now - self.stage.pop('begin')
+                self.spans.append(self.stage)
+                observe('mardmo_stage_seconds', {'stage': self.stage['name']}, self.stage['duration'])
+            self.stage = {'kind': 'stage', 'name': name, 'begin': now} if name else None
+
+    def finish(self):
+        self.mark(None)
+        self.duration = time.perf_counter() - self.start
+        observe('mardmo_export_seconds', {'export': self.name}, self.duration)
+
+    def timings(self):
+        '''Durations in ms per stage, span and host of outbound requests with descriptions'''
+        timings = {}
+        for record in self.spans:
+            if record['kind'] == 'request':
+                key, description = 'request-' + record['host'], '{0} requests to ' + record['host']
+            else:
+                key, description = record['name'], record['name']
+            key = re.sub('[^a-z0-9_-]+', '-', key.lower()).strip('-')
+            entry = timings.setdefault(key, {'duration': 0, 'count': 0, 'description': description})
+            entry['duration'] += record['duration'] * 1000
+            entry['count'] += 1
+        return timings
+
+    def server_timing(self):
+        '''Value of the Server-Timing header'''
+        metrics = ['{0};dur={1:.1f};desc="{2}"'.format(key, entry['duration'], entry['description'].format(entry['count']))
+                   for key, entry in self.timings().items()]
+        return ', '.join(metrics + ['total;dur={0:.1f}'.format(self.duration * 1000)])
+
+    def record(self):
+        '''Structured log record of the export'''
+        return {'export': self.name, 'started': self.started, 'duration': round(self.duration, 4),
+                'spans': [{key: round(value, 4) if key == 'duration' else value for key, value in record.items()} for record in self.spans]}
+
+@contextmanager
+def span(name, kind='span', **attributes):
+    '''Time the enclosed block, yields the record of the span (None if timing is disabled)
+       whose attributes may be extended within the block'''
+    if not export_timing:
+        yield None
+        return
+    record = {'kind': kind, 'name': name, **attributes}
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record['duration'] = time.perf_counter() - start
+        trace = current.get()
+        if trace:
+            trace.add(record)
+        if kind == 'request':
+            labels = {'host': record['host'], 'status': str(record.get('status', 'error'))}
+            observe('mardmo_request_seconds', labels, record['duration'])
+            count('mardmo_request_bytes_total', {'host': record['host']}, record.get('bytes', 0))
+        else:
+            observe('mardmo_span_seconds', {'span': name}, record['duration'])
+
+def mark(name):
+    '''Begin the stage name of the current export'''
+    trace = current.get()
+    if trace:
+        trace.mark(name)
+
+def traced(function):
+    '''Trace the export method function: add a Server-Timing header to its response and
+       log one record with all stages, spans and outbound requests. Streaming responses
+       are traced until their content is consumed and get no header.'''
+    @functools.wraps(function)
+    def wrapper(self, *args, **kwargs):
+        if not export_timing:
+            return function(self, *args, **kwargs)
+        trace = Trace(function.__name__)
+        token = current.set(trace)
+        try:
+            response = function(self, *args, **kwargs)
+        except BaseException:
+            current.reset(token)
+            finish(trace)
+            raise
+        current.reset(token)
+        if getattr(response, 'streaming', False):
+            response.streaming_content = traced_stream(trace, response.streaming_content)
+            return response
+        finish(trace)
+        if hasattr(response, 'has_header'):
+            response['Server-Timing'] = trace.server_timing()
+        return response
+    return wrapper
+
+def traced_stream(trace, content):
+    '''Produce content in the context of trace, finish the trace when the stream is closed'''
+    iterator = iter(content)
+    try:
+        while True:
+            token = current.set(trace)
+            try:
+                chunk = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                current.reset(token)
+            yield chunk
+    finally:
+        if hasattr(iterator, 'close'):
+            iterator.close()
+        finish(trace)
+
+def finish(trace):
+    '''End trace and log its record'''
+    trace.finish()
+    logger.info(json.dumps(trace.record(), default=str))
+
+class Metrics:
+    '''Counters and histograms of the worker process in the Prometheus text format'''
+
+    buckets = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+    def __init__(self):
+        self.counters = {}
+        self.histograms = {}
+        self.lock = Lock()
+
+    def count(self, metric, labels, value=1):
+        key = (metric, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, metric, labels, value):
+        key = (metric, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.setdefault(key, [0] * len(self.buckets) + [0, 0])
+            for n, bucket in enumerate(self.buckets):
+                if value <= bucket:
+                    histogram[n] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def render(self):
+        '''Metrics in the Prometheus text exposition format'''
+        def labels(items, **extra):
+            items = list(items) + list(extra.items())
+            return '{' + ','.join('{0}="{1}"'.format(key, str(value).replace('\\', '\\\\').replace('"', '\\"')) for key, value in items) + '}' if items else ''
+
+        lines = []
+        with self.lock:
+            for metric in sorted({metric for metric, _ in self.counters}):
+                lines.append('# TYPE {0} counter'.format(metric))
+                lines += ['{0}{1} {2}'.format(metric, labels(items), value) for (name, items), value in sorted(self.counters.items()) if name == metric]
+            for metric in sorted({metric for metric, _ in self.histograms}):
+                lines.append('# TYPE {0} histogram'.format(metric))
+                for (name, items), histogram in sorted(self.histograms.items()):
+                    if name == metric:
+                        lines += ['{0}_bucket{1} {2}'.format(metric, labels(items, le=bucket), histogram[n]) for n, bucket in enumerate(self.buckets)]
+                        lines += ['{0}_bucket{1} {2}'.format(metric, labels(items, le='+Inf'), histogram[-1]),
+                                  '{0}_sum{1} {2}'.format(metric, labels(items), histogram[-2]),
+                                  '{0}_count{1} {2}'.format(metric, labels(items), histogram[-1])]
+        return '\n'.join(lines) + '\n'
+
+# Metrics of the worker process
+metrics = Metrics()
+count = metrics.count
+observe = metrics.observe
@@ -0,0 +1,8 @@
+from django.urls import path
+
+from .views import job_status, metrics
+
+urlpatterns = [
+    path('jobs/<str:job_id>/', job_status, name='mardmo_job'),
+    path('metrics/', metrics, name='mardmo_metrics'),
+]
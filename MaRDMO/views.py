@@ -0,0 +1,27 @@
+from hmac import compare_digest
+
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, HttpResponse, JsonResponse
+
+from .config import export_metrics, metrics_token
+from .jobs import get_job
+from . import timing
+
+@login_required
+def job_status(request, job_id):
+    '''Progress and result of a background export job of the user'''
+    job = get_job(job_id)
+    if not job or job['user'] != request.user.id:
+        raise Http404
+    return JsonResponse(job)
+
+def metrics(request):
+    '''Prometheus metrics of the exports of the worker process (if enabled), for staff users
+       or requests with the metrics token as bearer authorization'''
+    if not export_metrics:
+        raise Http404
+    authorization = request.headers.get('Authorization', '')
+    if not request.user.is_staff and not (metrics_token and compare_digest(authorization, 'Bearer ' + metrics_token)):
+        raise PermissionDenied
+    return HttpResponse(timing.metrics.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
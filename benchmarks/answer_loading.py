@@ -0,0 +1,99 @@
+'''Compare the bulk answer loading of MaRDIExport with the previous per-question view_tags loop.
+
+Usage (within the RDMO instance, e.g. next to manage.py):
+    DJANGO_SETTINGS_MODULE=config.settings python benchmarks/answer_loading.py [--sets N] [--seed S]
+
+Builds a synthetic project in memory (no database required) with questions
+laid out like the MaRDI catalog (sections, sets, questions), N set indexes
+for the set based sections and up to three values per answer. Prints the
+time to gather the answers with both implementations and checks that they
+agree. The previous implementation grows quadratically, keep N moderate.'''
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import django
+django.setup()
+
+from rdmo.domain.models import Attribute
+from rdmo.projects.models import Value
+from rdmo.views.templatetags import view_tags
+from rdmo.views.utils import ProjectWrapper
+
+from MaRDMO.export import MaRDIExport
+from MaRDMO.para import BASE_URI
+
+class Project:
+    '''Stand in for the project model, only the catalog is read by ProjectWrapper'''
+    catalog = None
+
+def synthetic(sets):
+    '''Questions (as in ProjectWrapper.questions) and values of a synthetic project'''
+    questions, values = [], []
+    for section in range(1, 6):
+        for set_ in range(1, 8):
+            # Section 1 and 2 hold single answers, all others sets
+            collection = section > 2
+            for number in range(1, 8):
+                attribute = Attribute(uri='{0}Section_{1}/Set_{2}/Question_{3:02d}'.format(BASE_URI, section, set_, number))
+                questions.append({'attribute': attribute.uri, 'ancestors': [{'is_collection': collection, 'attribute': None,
+                                                                             'verbose_name': 'set', 'conditions': []}]})
+                for set_index in range(sets if collection else 1):
+                    if random.random() < 0.8:
+                        for collection_index in range(random.randint(1, 3)):
+                            values.append(Value(attribute=attribute, set_index=set_index, collection_index=collection_index,
+                                                text='mardi:Q{0} <|> Answer {1} <|> Description'.format(random.randint(1, 10**5), set_index)))
+    # Values of the database are ordered by attribute, set index and collection index
+    values.sort(key=lambda value: (value.attribute.uri, value.set_index, value.collection_index))
+    return questions, values
+
+def view_tags_answers(export, questions, values):
+    '''Previous implementation: view_tags calls for every question, set prefix and set index'''
+    project_wrapper = ProjectWrapper(Project())
+    project_wrapper.__dict__.update(_values=values, _conditions=[])
+
+    data = {}
+    for question in questions:
+        set_prefixes = view_tags.get_set_prefixes({}, question['attribute'], project=project_wrapper)
+        for set_prefix in set_prefixes:
+            set_indexes = view_tags.get_set_indexes({}, question['attribute'], set_prefix=set_prefix, project=project_wrapper)
+            for set_index in set_indexes:
+                values = view_tags.get_values({}, question['attribute'], set_prefix=set_prefix, set_index=set_index, project=project_wrapper)
+                labels = view_tags.get_labels({}, question, set_prefix=set_prefix, set_index=set_index, project=project_wrapper)
+                view_tags.check_element({}, question, set_prefix=set_prefix, set_index=set_index, project=project_wrapper)
+                answer = '; '.join([export.stringify(value['value_and_unit']) for value in values])
+                if labels:
+                    data[question['attribute']+'_'+str(set_index)] = answer
+                else:
+                    data[question['attribute']+'_0'] = answer
+    return data
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sets', type=int, default=25, help='Number of sets per set based section.')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    questions, values = synthetic(args.sets)
+    export = MaRDIExport('mardmo', 'MaRDMO', 'MaRDMO.export.MaRDIExport')
+    print('{0} questions, {1} values'.format(len(questions), len(values)))
+
+    start = time.perf_counter()
+    bulk = export.gather_answers(questions, values)
+    middle = time.perf_counter()
+    previous = view_tags_answers(export, questions, values)
+    end = time.perf_counter()
+
+    print('bulk loading: {0:.1f} ms, view_tags: {1:.1f} ms'.format((middle-start)*1000, (end-middle)*1000))
+    if list(bulk.items()) != list(previous.items()):
+        print('Answers differ')
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
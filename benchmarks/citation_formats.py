@@ -0,0 +1,61 @@
+'''Compare parsing of stored doi.org responses as BibTeX and as CSL-JSON.
+
+Usage: python benchmarks/citation_formats.py [--repeat N]
+
+Each DOI in data/citations/ has its BibTeX (.bib) and CSL-JSON (.json)
+response, both are turned into citation dicts by MaRDMO.citation without
+network access. Prints time per citation and differing fields.'''
+
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from MaRDMO.citation import ParseBibtex, ParseCsl
+
+corpus = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'citations')
+
+keys = ('author', 'title', 'journal', 'volume', 'number', 'pages', 'pub_date', 'ENTRYTYPE')
+
+def load():
+    '''Stored responses as (name, bibtex, csl)'''
+    names = sorted(name[:-4] for name in os.listdir(corpus) if name.endswith('.bib'))
+    responses = []
+    for name in names:
+        with open(os.path.join(corpus, name+'.bib'), encoding='utf-8') as bib, open(os.path.join(corpus, name+'.json'), encoding='utf-8') as csl:
+            responses.append((name, bib.read(), json.load(csl)))
+    return responses
+
+def measure(parse, documents, repeat):
+    '''Seconds per parsed document'''
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for document in documents:
+            parse(document)
+    return (time.perf_counter() - start) / (repeat * len(documents))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    responses = load()
+
+    bibtex = measure(ParseBibtex, [bib for _, bib, _ in responses], args.repeat)
+    csl = measure(ParseCsl, [csl for _, _, csl in responses], args.repeat)
+
+    print('{0} citations, {1} repetitions'.format(len(responses), args.repeat))
+    print('BibTeX:   {0:8.3f} ms per citation'.format(bibtex * 1000))
+    print('CSL-JSON: {0:8.3f} ms per citation ({1:.1f}x)'.format(csl * 1000, bibtex / csl))
+
+    for name, bib, data in responses:
+        from_bibtex, from_csl = ParseBibtex(bib), ParseCsl(data)
+        for key in keys:
+            if from_bibtex.get(key) != from_csl.get(key):
+                print('{0} {1}: {2!r} (BibTeX) / {3!r} (CSL-JSON)'.format(name, key, from_bibtex.get(key), from_csl.get(key)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,282 @@
+'''Run exports, citation lookups and searches against local stand-ins of all web services.
+
+Usage (within the RDMO instance, e.g. next to manage.py):
+    DJANGO_SETTINGS_MODULE=config.settings python benchmarks/export_suite.py [--sizes 1,5,20] [--latency MS] [--rate-limits]
+
+Starts local HTTP servers standing in for the SPARQL endpoints and MediaWiki APIs
+of the MaRDI Portal and Wikidata, doi.org and the ORCID API and sends all requests
+of MaRDMO to them (http_hosts). The servers answer after --latency ms:
+
+- SPARQL endpoints find nothing, as for a workflow using only new entities
+- MediaWiki APIs log in, create items and pages and return synthetic search results
+- doi.org replays the stored responses of data/citations/ (BibTeX or CSL-JSON)
+- ORCID returns synthetic authors, one of them without name in the search results
+
+Scenarios render synthetic workflow documentations with N models, methods,
+software, input and output data sets (--sizes) as preview, as dry run and as
+export to the Portal, resolve the stored DOIs and search entities. Prints wall
+time, outbound requests per service and peak memory (tracemalloc, separate run)
+of each scenario with cold caches after one warm up export (imports, Portal
+login). Rate limits are disabled unless --rate-limits. Exits with 1 if any
+scenario failed.'''
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, unquote, urlparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import django
+django.setup()
+
+from MaRDMO import client, export, portal, ratelimit
+from MaRDMO.answers import Answers
+from MaRDMO.cache import sparql_cache
+from MaRDMO.citation import GetCitation, citation_cache, orcid_cache
+from MaRDMO.export import MaRDIExport
+from MaRDMO.para import dec, ws
+from MaRDMO.providers import WikidataSearch, search_cache
+
+corpus = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'citations')
+
+class StandIn(BaseHTTPRequestHandler):
+    '''Answers requests after the latency of the server and counts them'''
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.handle_request(dict(parse_qsl(urlparse(self.path).query)))
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode()
+        self.handle_request({**dict(parse_qsl(urlparse(self.path).query)), **dict(parse_qsl(body))})
+
+    def handle_request(self, params):
+        with self.server.lock:
+            self.server.requests += 1
+        time.sleep(self.server.latency)
+        status, content_type, body = self.answer(urlparse(self.path).path, params)
+        body = body.encode() if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def answer(self, path, params):
+        '''Status, content type and body of the response'''
+        raise NotImplementedError
+
+    def json(self, data):
+        return 200, 'application/json', json.dumps(data)
+
+    def log_message(self, *args):
+        pass
+
+class Sparql(StandIn):
+    '''SPARQL endpoint without matching entities: batched checks (VALUES) have no
+       results, queries of OPTIONAL patterns one empty result'''
+
+    def answer(self, path, params):
+        bindings = [] if 'VALUES' in params.get('query', '') else [{}]
+        return self.json({'head': {'vars': []}, 'results': {'bindings': bindings}})
+
+class MediaWiki(StandIn):
+    '''MediaWiki API with Wikibase: login, items, pages and entity search'''
+
+    def answer(self, path, params):
+        action = params.get('action')
+        if action == 'query' and params.get('meta') == 'tokens':
+            return self.json({'query': {'tokens': {'logintoken': 'login+\\', 'csrftoken': 'csrf+\\'}}})
+        if action == 'login':
+            return self.json({'login': {'result': 'Success', 'lguserid': 1, 'lgusername': params.get('lgname')}})
+        if action == 'wbeditentity':
+            entity = json.loads(params.get('data', '{}'))
+            entity.update(type='item', id='Q{0}'.format(self.server.next_id()), lastrevid=self.server.next_id())
+            for key in ('labels', 'descriptions', 'aliases', 'claims', 'sitelinks'):
+                entity.setdefault(key, {})
+            claims = entity['claims'] if isinstance(entity['claims'], list) else [claim for claims in entity['claims'].values() for claim in claims]
+            entity['claims'] = {}
+            for n, claim in enumerate(claims):
+                entity['claims'].setdefault(claim['mainsnak']['property'], []).append({**claim, 'id': '{0}${1}'.format(entity['id'], n)})
+            return self.json({'success': 1, 'entity': entity})
+        if action == 'query' and params.get('prop') == 'revisions':
+            return self.json({'query': {'pages': [{'title': params.get('titles'), 'missing': True}]}})
+        if action == 'edit':
+            return self.json({'edit': {'result': 'Success', 'title': params.get('title'), 'newrevid': self.server.next_id()}})
+        if action == 'wbsearchentities':
+            search = params.get('search', '')
+            return self.json({'search': [{'id': 'Q{0}'.format(n+1), 'label': '{0} {1}'.format(search, n), 'match': {'type': 'label', 'text': '{0} {1}'.format(search, n)},
+                                          'display': {'label': {'value': '{0} {1}'.format(search, n)}, 'description': {'value': 'Result {0} for {1}'.format(n, search)}}}
+                                         for n in range(int(params.get('limit', 7)))]})
+        return self.json({'error': {'code': 'badvalue', 'info': 'Action not supported by the stand-in'}})
+
+class Doi(StandIn):
+    '''doi.org content negotiation replaying the stored responses'''
+
+    def answer(self, path, params):
+        name = os.path.join(corpus, unquote(path).strip('/ ').lower().replace('/', '_'))
+        extension, content_type = ('.bib', 'application/x-bibtex') if 'bibtex' in self.headers.get('Accept', '') else ('.json', 'application/vnd.citationstyles.csl+json')
+        for stored in os.listdir(corpus):
+            if stored.lower() == os.path.basename(name) + extension:
+                with open(os.path.join(corpus, stored), 'rb') as file:
+                    return 200, content_type + '; charset=utf-8', file.read()
+        return 404, 'text/plain', 'DOI Not Found'
+
+class Orcid(StandIn):
+    '''ORCID API with three authors per DOI'''
+
+    authors = [('0000-0001-0000-0001', 'Ada', 'Lovelace'), ('0000-0001-0000-0002', 'Carl', 'Gauss'), ('0000-0001-0000-0003', None, None)]
+
+    def answer(self, path, params):
+        if path.endswith('/expanded-search/'):
+            return self.json({'expanded-result': [{'orcid-id': orcid_id, 'given-names': given, 'family-names': family} for orcid_id, given, family in self.authors]})
+        if path.endswith('/search/'):
+            return self.json({'result': [{'orcid-identifier': {'path': orcid_id}} for orcid_id, _, _ in self.authors]})
+        if path.endswith('/personal-details'):
+            return self.json({'name': {'given-names': {'value': 'Emmy'}, 'family-name': {'value': 'Noether'}}})
+        return 404, 'text/plain', 'Not Found'
+
+def serve(handler, latency):
+    '''Start a stand-in server on a free local port'''
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.requests = 0
+    server.lock = threading.Lock()
+    ids = iter(range(1000, 10**9))
+    server.next_id = lambda: next(ids)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+class Project:
+    '''Stand in for the project model, only catalog and title are read'''
+    catalog = 'https://rdmo.mardi4nfdi.de/terms/questions/MaRDI'
+
+    def __init__(self, title):
+        self.title = title
+
+class Export(MaRDIExport):
+    '''Export of synthetic answers instead of the answers of a project'''
+
+    def answers(self):
+        return Answers(self.data)
+
+def entity(source, n, kind):
+    return '{0}:Q{1} <|> {2} {1} <|> {2} used by benchmark workflows'.format(source, n, kind)
+
+def synthetic(size, portal, doi):
+    '''Answers of a workflow documentation with size models, methods, software, input and
+       output data sets. Every third model, method and data set is an existing Wikidata item.'''
+    data = {dec[0][0]: dec[0][1], dec[1][0]: dec[1][1], dec[2][0]: dec[2][2], dec[3][0]: dec[3][1] if portal else 'Yes',
+            ws['obj'][0]: 'Benchmark the export of workflow documentations', ws['doi'][0]: 'Yes: ' + doi if doi else 'No',
+            ws['dis'][0]: '; '.join(entity('wikidata', 100+n, 'Discipline') for n in range(2)),
+            ws['fie'][0]: '; '.join(entity('wikidata', 200+n, 'Field') for n in range(2))}
+    for i in range(size):
+        existing = i % 3 == 2
+        subjects = '; '.join(entity('wikidata', 300+i*2+n, 'Subject') for n in range(2))
+        for kind, (qid, label, quote, subject, formula, external) in (('mod', ws['mod']), ('met', ws['met'])):
+            data.update({qid+'_'+str(i): entity('wikidata', 1000*len(kind)+i, kind) if existing else '', label+'_'+str(i): '{0} {1}'.format(kind, i),
+                         quote+'_'+str(i): 'Synthetic {0} {1}'.format(kind, i), subject+'_'+str(i): subjects,
+                         formula+'_'+str(i): '$a_{0} = b_{0}$; $c_{0} = d$'.format(i), external+'_'+str(i): 'doi:10.5281/zenodo.{0}'.format(i)})
+        qid, label, quote, language, external = ws['sof']
+        data.update({qid+'_'+str(i): '', label+'_'+str(i): 'software {0}'.format(i), quote+'_'+str(i): 'Synthetic software {0}'.format(i),
+                     language+'_'+str(i): entity('wikidata', 28865, 'Python'), external+'_'+str(i): 'swmath:{0}'.format(i)})
+        for kind in ('inp', 'out'):
+            qid, label, external = ws[kind]
+            data.update({qid+'_'+str(i): entity('wikidata', 5000+i, kind) if existing else '', label+'_'+str(i): '{0} {1}'.format(kind, i),
+                         external+'_'+str(i): 'doi:10.5281/zenodo.{0}'.format(100+i)})
+    return data
+
+def render(size, portal, write, doi):
+    '''Render the workflow documentation of a synthetic project, returns the error message if it failed'''
+    export.dry_run = not write
+    item = Export('mardmo', 'MaRDMO', 'MaRDMO.export.MaRDIExport')
+    item.project, item.snapshot, item.data = Project('Benchmark Workflow {0}'.format(size)), None, synthetic(size, portal, doi)
+    content = item.render().content.decode()
+    if 'color:red' in content:
+        return content.split('color:red')[-1].split('>', 1)[-1].split('</p>')[0].strip()
+
+def citations(dois):
+    for doi in dois:
+        if not GetCitation(doi)[2]:
+            return 'No citation for ' + doi
+
+def searches(terms):
+    provider = WikidataSearch('mardmo', 'MaRDMO', 'MaRDMO.providers.WikidataSearch')
+    for term in terms:
+        if not provider.get_options(None, term):
+            return 'No options for ' + term
+
+def reset(servers):
+    '''Cold caches and request counters'''
+    for cache in (sparql_cache, citation_cache, orcid_cache, search_cache):
+        with cache.lock:
+            cache.entries.clear()
+    for server in servers.values():
+        server.requests = 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='1,5,20', help='Models, methods, software and data sets per workflow.')
+    parser.add_argument('--latency', type=float, default=20, help='Milliseconds before the stand-ins answer.')
+    parser.add_argument('--rate-limits', action='store_true', help='Keep the configured rate limits.')
+    args = parser.parse_args()
+
+    latency = args.latency / 1000
+    servers = {'SPARQL MaRDI': serve(Sparql, latency), 'SPARQL Wikidata': serve(Sparql, latency), 'API MaRDI': serve(MediaWiki, latency),
+               'API Wikidata': serve(MediaWiki, latency), 'DOI': serve(Doi, latency), 'ORCID': serve(Orcid, latency)}
+    hosts = {'query.portal.mardi4nfdi.de': 'SPARQL MaRDI', 'query.wikidata.org': 'SPARQL Wikidata', 'portal.mardi4nfdi.de': 'API MaRDI',
+             'www.wikidata.org': 'API Wikidata', 'dx.doi.org': 'DOI', 'doi.org': 'DOI', 'pub.orcid.org': 'ORCID'}
+    client.http_hosts = {host: 'http://127.0.0.1:{0}'.format(servers[name].server_port) for host, name in hosts.items()}
+    if not args.rate_limits:
+        ratelimit.rate_limits, ratelimit.rate_limit_default = {}, None
+    export.lgname = portal.lgname = 'Benchmark@bot'
+    export.lgpassword = portal.lgpassword = 'benchmark'
+
+    dois = sorted(name[:-4].replace('_', '/', 1) for name in os.listdir(corpus) if name.endswith('.bib'))
+    terms = ['finite element {0}'.format(n) for n in range(10)]
+    scenarios = []
+    for size in [int(size) for size in args.sizes.split(',')]:
+        scenarios += [('preview', size, render, (size, False, False, None)),
+                      ('dry run', size, render, (size, True, False, dois[0])),
+                      ('export', size, render, (size, True, True, dois[0]))]
+    scenarios += [('citations', len(dois), citations, (dois,)), ('search', len(terms), searches, (terms,))]
+
+    # Warm up (lazy imports, Portal login) as in a running worker
+    render(1, True, True, dois[0])
+
+    failed = False
+    print('{0:<10} {1:>5} {2:>10} {3:>9} {4:>10}  {5}'.format('scenario', 'size', 'seconds', 'requests', 'peak MiB', 'requests per service'))
+    for name, size, function, arguments in scenarios:
+        reset(servers)
+        start = time.perf_counter()
+        error = function(*arguments)
+        seconds = time.perf_counter() - start
+        requests = {service: server.requests for service, server in servers.items() if server.requests}
+
+        # Peak memory in a separate run, tracing slows down the run
+        reset(servers)
+        tracemalloc.start()
+        function(*arguments)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        print('{0:<10} {1:>5} {2:>10.3f} {3:>9} {4:>10.1f}  {5}'.format(name, size, seconds, sum(requests.values()), peak / 2**20,
+                                                                      ', '.join('{0} {1}'.format(service, count) for service, count in requests.items())))
+        if error:
+            print('  failed: ' + error)
+            failed = True
+
+    if failed:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+'''Measure the import time of the MaRDMO modules loaded by every RDMO worker.
+
+Usage (within the RDMO instance, e.g. next to manage.py):
+    DJANGO_SETTINGS_MODULE=config.settings python benchmarks/import_time.py [--budget MS]
+
+Django and the RDMO modules MaRDMO builds on are imported first, then
+MaRDMO.export and MaRDMO.providers are imported with python -X importtime.
+Exits with status 1 if this exceeds the budget. That the dependencies only
+needed for exports are not imported is checked by tests/test_import_time.py.'''
+
+import argparse
+import os
+import subprocess
+import sys
+
+root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+
+marker = '--- MaRDMO ---'
+
+script = '''
+import sys
+import django
+django.setup()
+import rdmo.projects.exports, rdmo.options.providers, rdmo.views.utils, rdmo.views.templatetags.view_tags
+sys.stderr.write({0!r} + "\\n")
+import MaRDMO.export, MaRDMO.providers
+'''.format(marker)
+
+def importtime():
+    '''Imported modules with their cumulative import time in microseconds'''
+    environment = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [root, os.getcwd(), os.environ.get('PYTHONPATH')]))}
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', script], env=environment,
+                            capture_output=True, text=True, check=True).stderr
+    modules = []
+    for line in output.split(marker, 1)[1].splitlines():
+        if line.startswith('import time:') and '|' in line:
+            _, cumulative, name = line.split('|')
+            if cumulative.strip().isdigit():
+                modules.append((name.strip(), int(cumulative), len(name) - len(name.lstrip())))
+    return modules
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget', type=float, default=None, help='Maximum import time in ms.')
+    args = parser.parse_args()
+
+    modules = importtime()
+    # Top level imports carry the time of everything they imported
+    top = min(indent for _, _, indent in modules)
+    total = sum(cumulative for _, cumulative, indent in modules if indent == top) / 1000
+
+    print('MaRDMO import time: {0:.1f} ms'.format(total))
+    for name, cumulative, indent in sorted(modules, key=lambda module: -module[1])[:10]:
+        print('{0:10.1f} ms  {1}'.format(cumulative / 1000, name))
+
+    if args.budget is not None and total > args.budget:
+        print('Import time exceeds budget of {0:.1f} ms'.format(args.budget))
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
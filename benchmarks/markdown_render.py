@@ -0,0 +1,75 @@
+'''Compare the built in Markdown renderer with pandoc on filled workflow templates.
+
+Usage (within the RDMO instance, e.g. next to manage.py):
+    DJANGO_SETTINGS_MODULE=config.settings python benchmarks/markdown_render.py [--documents N] [--seed S]
+
+Fills the theoretical and experimental templates of MaRDMO.para with random
+answers (tables of varying size, math, inline HTML, typography) as the export
+does (MaRDIExport.fill_template, some placeholders left without answer), converts
+them to HTML and MediaWiki with both renderers. Prints time per document and
+documents with differing output (pandoc is called as by MaRDMO.markdown.convert).'''
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import django
+django.setup()
+
+import pypandoc
+
+from MaRDMO.export import MaRDIExport
+from MaRDMO.markdown import Renderer, supported
+from MaRDMO.para import math_temp, math_tables, exp_temp, exp_tables, placeholder
+
+answers = ['mardi:Q123 <|> Heat equation <|> PDE model', 'Yes', '', 'Intel Xeon, 64 GB',
+           'wikidata:Q11 <|> Analysis <|> branch<br/>mardi:Q2 <|> Numerics <|> No Description Provided!',
+           'Solve $\\frac{\\partial T}{\\partial t} = \\Delta T$ on $[0,1]$ -- fast', 'x '*50,
+           'doi:10.1000/xyz123', 'Temperature | in K', 'a & b < c', '**bold** statement...',
+           '$$E=mc^2$$', 'Time step $t_0 < t$']
+
+def table(rows, columns):
+    '''Markdown table with random answers'''
+    return ('| '+' | '.join('Topic {0}'.format(column) for column in range(columns))+' | \n'+'| -- '*columns+'| \n'+
+            ''.join('| '+' | '.join(random.choice(answers) for _ in range(columns))+' | \n' for _ in range(rows)))
+
+def document(export):
+    '''Randomly filled template'''
+    template, tables = random.choice([(math_temp, math_tables), (exp_temp, exp_tables)])
+    template = template.replace('DISCIPLINES', random.choice(answers)).replace('FIELDS', random.choice(answers))
+    for name in tables:
+        template = template.replace(name, table(random.randint(0, 5), random.randint(2, 6)))
+    data = {key: random.choice(answers) for key in sorted(set(re.findall(placeholder, template))) if random.random() < 0.8}
+    return export.fill_template(template, data)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--documents', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    export = MaRDIExport('mardmo', 'MaRDMO', 'MaRDMO.export.MaRDIExport')
+    documents = [document(export) for _ in range(args.documents)]
+    assert all(supported(markdown) for markdown in documents)
+
+    for to in ('html', 'mediawiki'):
+        start = time.perf_counter()
+        pandoc = [pypandoc.convert_text(markdown, to, format='md', extra_args=['--mathjax', '--wrap=preserve']) for markdown in documents]
+        middle = time.perf_counter()
+        builtin = [Renderer(to).render(markdown) for markdown in documents]
+        end = time.perf_counter()
+
+        print('{0}: pandoc {1:.1f} ms, built in {2:.2f} ms per document'.format(
+              to, (middle-start)*1000/len(documents), (end-middle)*1000/len(documents)))
+        differing = [n for n, (a, b) in enumerate(zip(pandoc, builtin)) if a != b]
+        if differing:
+            print('  differing output for documents ' + ', '.join(map(str, differing)))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,17 @@
+import django
+
+from django.conf import settings
+
+def pytest_configure():
+    '''Minimal RDMO settings, MaRDMO is imported without an RDMO instance and database access'''
+    from rdmo.core import settings as rdmo_settings
+    if settings.configured:
+        return
+    test_settings = {key: getattr(rdmo_settings, key) for key in dir(rdmo_settings) if key.isupper()}
+    test_settings.update(INSTALLED_APPS=['django.contrib.contenttypes', 'django.contrib.auth', 'django.contrib.sites', 'rdmo.core', 'rdmo.accounts',
+                                         'rdmo.domain', 'rdmo.conditions', 'rdmo.questions', 'rdmo.tasks', 'rdmo.views', 'rdmo.options',
+                                         'rdmo.projects', 'rdmo.management', 'rdmo.overlays'],
+                         DATABASES={'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}},
+                         SECRET_KEY='MaRDMO tests')
+    settings.configure(**test_settings)
+    django.setup()
@@ -0,0 +1,77 @@
+import copy
+import pickle
+
+from types import SimpleNamespace
+
+import pytest
+
+from MaRDMO.answers import Answers
+
+base = 'https://rdmo.mardi4nfdi.de/terms/domain/MaRDI/'
+model = base + 'Section_3/Set_2/Question_01'
+unit = base + 'Section_3/Set_2/Question_02'
+method = base + 'Section_4/Set_1/Question_01'
+
+@pytest.fixture
+def answers():
+    return Answers({model+'_0': 'heat', model+'_10': 'wave', unit+'_3': 'K', method+'_1': 'FEM', 'export': 'yes'})
+
+def test_index(answers):
+    assert answers.question(model) == {0: 'heat', 10: 'wave'}
+    assert answers.max_index(model) == 10 and answers.max_index(method) == 1 and answers.max_index(base+'Section_9/Set_9/Question_01') == 0
+    assert answers.set_length(3, 2) == 11 and answers.set_length(4, 1) == 2 and answers.set_length(5, 1) == 0
+    assert answers.keys_of(model) == [model+'_0', model+'_10'] and answers.keys_of(base+'none') == []
+
+def test_index_follows_changes(answers):
+    answers[model+'_10'] = 'waves'
+    del answers[model+'_0']
+    answers.update({method+'_4': 'FVM'})
+    assert answers.question(model) == {10: 'waves'} and answers.set_length(4, 1) == 5
+
+def check_index(answers):
+    '''The index holds exactly the indexed answers of the dict'''
+    assert Answers(dict(answers)).sections == answers.sections
+    assert Answers(dict(answers)).questions == answers.questions
+
+def test_dict_methods_keep_the_index(answers):
+    assert answers.pop(model+'_10') == 'wave' and answers.max_index(model) == 0
+    assert answers.pop(model+'_10', None) is None
+    with pytest.raises(KeyError):
+        answers.pop(model+'_10')
+    check_index(answers)
+
+    assert answers.setdefault(unit+'_5', 'm') == 'm' and answers.setdefault(unit+'_5', 's') == 'm'
+    assert answers.set_length(3, 2) == 6
+    check_index(answers)
+
+    assert answers.popitem() == (unit+'_5', 'm') and answers.set_length(3, 2) == 4
+    check_index(answers)
+
+    answers.clear()
+    assert answers.set_length(3, 2) == 0 and answers.keys_of(model) == []
+    with pytest.raises(KeyError):
+        answers.popitem()
+    answers[method+'_2'] = 'FEM'
+    assert answers.set_length(4, 1) == 3
+    check_index(answers)
+
+def test_copies_keep_the_index(answers):
+    for copied in (copy.copy(answers), copy.deepcopy(answers), pickle.loads(pickle.dumps(answers))):
+        assert isinstance(copied, Answers) and copied == answers
+        check_index(copied)
+
+def value(attribute, set_index, text, set_prefix=''):
+    return SimpleNamespace(attribute=attribute and SimpleNamespace(uri=attribute), set_prefix=set_prefix, set_index=set_index, value_and_unit=text)
+
+def question(attribute, in_set):
+    return {'attribute': attribute, 'ancestors': [{'is_collection': False}, {'is_collection': in_set}]}
+
+def test_gather_answers():
+    from MaRDMO.export import MaRDIExport
+    values = [value(model, 1, 'wave'), value(model, 0, 'heat\n equation'), value(unit, 0, 'K'), value(unit, 0, 'm'),
+              value(method, 0, 'FEM'), value(None, 0, 'orphan'), value(base+'Section_9/Set_9/Question_01', 0, 'unasked')]
+    data = MaRDIExport('mardmo', 'MaRDMO', 'MaRDMO.export.MaRDIExport').gather_answers(
+        [question(model, True), question(unit, True), question(method, False), question(base+'Section_5/Set_1/Question_01', True)], values)
+    # Questions outside of sets store their answer with index 0, values of one set index are joined
+    assert dict(data) == {model+'_0': 'heat equation', model+'_1': 'wave', unit+'_0': 'K; m', method+'_0': 'FEM'}
+    assert data.question(model) == {0: 'heat equation', 1: 'wave'}
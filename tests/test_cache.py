@@ -0,0 +1,82 @@
+import pytest
+
+from django.core.cache import caches
+
+from MaRDMO import cache, export
+from MaRDMO.cache import Cache, normalize
+from MaRDMO.config import mardi_endpoint
+
+class Clock:
+    def __init__(self, monkeypatch):
+        self.now = 100.0
+        monkeypatch.setattr(cache.time, 'monotonic', lambda: self.now)
+
+def test_lru_eviction():
+    results = Cache('test', 2, {}, 60)
+    results.set('a', 'q1', [1])
+    results.set('a', 'q2', [2])
+    assert results.get('a', 'q1') == [1]
+    results.set('a', 'q3', [3])
+    # q2 was used least recently
+    assert results.get('a', 'q2') is None and results.get('a', 'q1') == [1] and results.get('a', 'q3') == [3]
+
+def test_ttl_per_namespace(monkeypatch):
+    clock = Clock(monkeypatch)
+    results = Cache('test', 10, {'fast': 10, 'off': 0}, 60)
+    for namespace in ('fast', 'slow', 'off'):
+        results.set(namespace, 'q', [namespace])
+    assert results.get('off', 'q') is None
+    clock.now += 30
+    assert results.get('fast', 'q') is None and results.get('slow', 'q') == ['slow']
+    clock.now += 31
+    assert results.get('slow', 'q') is None
+
+def test_cached_results_are_copies():
+    results = Cache('test', 10, {}, 60)
+    value = [{'qid': {'value': 'Q1'}}]
+    results.set('a', 'q', value)
+    value[0]['qid']['value'] = 'Q2'
+    results.get('a', 'q')[0]['qid']['value'] = 'Q3'
+    assert results.get('a', 'q') == [{'qid': {'value': 'Q1'}}]
+
+def test_shared_tier_and_invalidation():
+    caches['default'].clear()
+    worker = Cache('test', 10, {}, 60, 'default')
+    other = Cache('test', 10, {}, 60, 'default')
+    worker.set('a', 'q', [1])
+    worker.set('b', 'q', [2])
+    assert other.get('a', 'q') == [1]
+    assert other.stats()['shared_hits'] == 1
+    # Invalidation moves the namespace to a new version in the shared tier
+    worker.invalidate('a')
+    assert Cache('test', 10, {}, 60, 'default').get('a', 'q') is None
+    assert Cache('test', 10, {}, 60, 'default').get('b', 'q') == [2]
+
+def test_get_results_are_cached_and_invalidated_by_writes(monkeypatch):
+    sparql_cache = Cache('sparql', 10, {}, 60)
+    monkeypatch.setattr(export, 'sparql_cache', sparql_cache)
+    monkeypatch.setattr(export, 'item_cache', Cache('items', 10, {}, 60))
+    monkeypatch.setattr(export, 'entity_index', None)
+    fetched = []
+    class Response:
+        def json(self):
+            return {'results': {'bindings': [{'qid': {'value': 'Q1'}}]}}
+    monkeypatch.setattr(export.session, 'get', lambda url, params: fetched.append(params['query']) or Response())
+    mardi_export = export.MaRDIExport('mardmo', 'MaRDMO', 'MaRDMO.export.MaRDIExport')
+    for query in ('SELECT ?qid  WHERE {}', 'SELECT ?qid\nWHERE {}'):
+        assert mardi_export.get_results(mardi_endpoint, query) == [{'qid': {'value': 'Q1'}}]
+    assert len(fetched) == 1 and sparql_cache.stats()['hits'] == 1
+
+    mardi_export.plan = export.WritePlan()
+    mardi_export.entry_write = lambda wbi, label, description, facts: 'Q2'
+    mardi_export.wikibase_login = lambda renew=False: None
+    mardi_export.write_entry('heat model', 'model of heat', [])
+    assert sparql_cache.get(mardi_endpoint, normalize('SELECT ?qid WHERE {}')) is None
+
+def test_delete_and_stats():
+    results = Cache('test', 10, {}, 60)
+    results.set('a', 'q', [1])
+    assert results.delete('a', 'q') is True
+    assert results.delete('a', 'q') is False
+    assert results.get('a', 'q') is None
+    assert results.stats() == {'hits': 0, 'shared_hits': 0, 'misses': 1, 'invalidations': 0, 'size': 0}
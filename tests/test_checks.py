@@ -0,0 +1,42 @@
+import re
+
+import pytest
+
+from MaRDMO import export
+from MaRDMO.config import mardi_endpoint
+from MaRDMO.export import MaRDIExport
+
+# Entities of the MaRDI KG by label and description
+kg = {('heat model', 'model of heat'): ['Q1', 'Q9'], ('wave model', 'model of waves'): ['Q2'], ("Euler's method", 'numerical method'): ['Q3']}
+
+@pytest.fixture
+def mardi_export(monkeypatch):
+    monkeypatch.setattr(export, 'entity_index', None)
+    mardi_export = MaRDIExport('mardmo', 'MaRDMO', 'MaRDMO.export.MaRDIExport')
+    mardi_export.queries = []
+    def get_results(endpoint, query):
+        '''Answer batched VALUES queries and single queries (batch size 0) from kg'''
+        mardi_export.queries.append(query)
+        rows = re.findall(r"\('(\w+)' '((?:[^'\\]|\\.)*)'@en '((?:[^'\\]|\\.)*)'@en\)", query)
+        if rows:
+            return [{'key': {'value': key}, 'qid': {'value': qid}}
+                    for key, label, quote in rows for qid in kg.get((label.replace("\\'", "'"), quote.replace("\\'", "'")), [])]
+        label, quote = re.search(r"rdfs:label '((?:[^'\\]|\\.)*)'@en;schema:description '((?:[^'\\]|\\.)*)'@en", query).groups()
+        # OPTIONAL pattern: one row, without qid if the entity is missing
+        return [{'qid': {'value': qid}} for qid in kg.get((label.replace("\\'", "'"), quote.replace("\\'", "'")), [])][:1] or [{}]
+    mardi_export.get_results = get_results
+    return mardi_export
+
+checks = {'mqmod0': ('heat model', 'model of heat'), 'mqmod1': ('wave model', 'model of waves'),
+          'mqmet0': ("Euler\\'s method", 'numerical method'), 'mqsof0': ('new software', 'not in the KG')}
+
+@pytest.mark.parametrize('batch_size, queries', [(20, 1), (2, 2), (1, 4), (0, 4)])
+def test_batched_checks_map_results_to_keys(mardi_export, monkeypatch, batch_size, queries):
+    monkeypatch.setattr(export, 'sparql_batch_size', batch_size)
+    results = mardi_export.get_check_results(mardi_endpoint, checks)
+    assert {key: result['qid']['value'] for key, result in results.items()} == {'mqmod0': 'Q1', 'mqmod1': 'Q2', 'mqmet0': 'Q3', 'mqsof0': ''}
+    assert len(mardi_export.queries) == queries
+
+def test_no_batches_without_checks(mardi_export):
+    assert mardi_export.get_check_results(mardi_endpoint, {}) == {}
+    assert mardi_export.queries == []
@@ -0,0 +1,111 @@
+import io
+import json
+import os
+
+import pytest
+
+from django.core.management.base import CommandError
+
+from MaRDMO import citation
+from MaRDMO.cache import Cache
+from MaRDMO.management.commands import mardmo_purge_citations
+
+def purge(*dois):
+    out = io.StringIO()
+    mardmo_purge_citations.Command(stdout=out).handle(doi=list(dois))
+    return out.getvalue()
+
+def use_cache(monkeypatch, cache):
+    monkeypatch.setattr(citation, 'citation_cache', cache)
+    monkeypatch.setattr(mardmo_purge_citations, 'citation_cache', cache)
+
+def test_purge_requires_shared_cache(monkeypatch):
+    use_cache(monkeypatch, Cache('citation', 16, {}, 60))
+    with pytest.raises(CommandError):
+        purge('10.1137/20M1344123')
+
+def test_purge_reports_removed_citations(monkeypatch):
+    use_cache(monkeypatch, Cache('citation', 16, {}, 60, 'default'))
+    monkeypatch.setattr(citation, 'ResolveCitation', lambda doi: ([], ['A. Author'], {'title': doi}))
+    citation.GetCitation('10.1137/20M1344123')
+    assert purge('10.1137/20M1344123', '10.1007/unknown') == 'Purged 1 cached citations of 10.1137/20M1344123, 10.1007/unknown\n'
+    assert purge('10.1137/20M1344123') == 'Purged 0 cached citations of 10.1137/20M1344123\n'
+    assert purge() == 'Invalidated cached citations of all DOIs\n'
+
+def test_csl_journal_articles():
+    assert citation.ParseCsl({'type': 'article-journal', 'title': 'Title'})['ENTRYTYPE'] == 'article'
+    assert citation.ParseCsl({'type': 'journal-article', 'title': 'Title'})['ENTRYTYPE'] == 'article'
+    assert citation.ParseCsl({'type': 'dataset', 'title': 'Title'})['ENTRYTYPE'] == 'dataset'
+
+def test_csl_and_bibtex_of_stored_articles_agree():
+    corpus = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'benchmarks', 'data', 'citations')
+    for name in ('10.1007_s00211-019-01046-6', '10.1137_20M1344123'):
+        with open(os.path.join(corpus, name+'.bib'), encoding='utf-8') as bib, open(os.path.join(corpus, name+'.json'), encoding='utf-8') as csl:
+            from_bibtex, from_csl = citation.ParseBibtex(bib.read()), citation.ParseCsl(json.load(csl))
+        assert from_csl['ENTRYTYPE'] == from_bibtex['ENTRYTYPE'] == 'article'
+        assert from_csl['journal'] == from_bibtex['journal']
+
+@pytest.mark.parametrize('month', ['jun', '{June}', '{jun}', '6', '{06}'])
+def test_bibtex_month(month):
+    bibtex = '@article{Key, title={Title}, journal={Journal}, year={2019}, month=' + month + '}'
+    assert citation.ParseBibtex(bibtex)['pub_date'] == '2019-06-01'
+
+def test_invalid_doi_is_not_searched_in_orcid(monkeypatch):
+    searched = []
+    monkeypatch.setattr(citation, 'citation_format', 'bibtex')
+    monkeypatch.setattr(citation, 'BibtexFromDoi', lambda doi: 'DOI is incorrect')
+    monkeypatch.setattr(citation, 'OrcidSearch', lambda doi: searched.append(doi) or [])
+    assert citation.ResolveCitation('10.1000/missing') == ([], [], {})
+    assert searched == []
+
+def orcid_api(responses, requested):
+    '''GetOrcidJson answering from responses by path below the ORCID API'''
+    def get(url):
+        path = url[len(citation.orcid_api):]
+        requested.append(path)
+        if isinstance(responses[path], Exception):
+            raise responses[path]
+        return responses[path]
+    return get
+
+def details(given, family):
+    return {'name': {'given-names': {'value': given}, 'family-name': {'value': family}}}
+
+def test_orcid_names_from_one_expanded_search(monkeypatch):
+    requested = []
+    monkeypatch.setattr(citation, 'GetOrcidJson', orcid_api({
+        'expanded-search/?q=doi-self:10.1/a': {'expanded-result': [{'orcid-id': '0000-0001', 'given-names': 'Ada', 'family-names': 'Lovelace'},
+                                                                   {'orcid-id': '0000-0002', 'given-names': 'Alan'}]}}, requested))
+    assert citation.OrcidSearch('10.1/a') == [['0000-0001', 'Ada Lovelace'], ['0000-0002', None]]
+    assert requested == ['expanded-search/?q=doi-self:10.1/a']
+
+def test_orcid_search_without_expanded_search(monkeypatch):
+    requested = []
+    monkeypatch.setattr(citation, 'GetOrcidJson', orcid_api({
+        'expanded-search/?q=doi-self:10.1/a': KeyError('expanded-result'),
+        'search/?q=doi-self:10.1/a': {'result': [{'orcid-identifier': {'path': '0000-0001'}}]}}, requested))
+    assert citation.OrcidSearch('10.1/a') == [['0000-0001', None]]
+    monkeypatch.setattr(citation, 'GetOrcidJson', orcid_api({'expanded-search/?q=doi-self:10.1/b': {'expanded-result': None}}, requested))
+    assert citation.OrcidSearch('10.1/b') == []
+
+def test_missing_orcid_names_from_personal_details(monkeypatch):
+    requested = []
+    monkeypatch.setattr(citation, 'orcid_cache', Cache('orcid', 16, {}, 60))
+    monkeypatch.setattr(citation, 'citation_format', 'bibtex')
+    monkeypatch.setattr(citation, 'BibtexFromDoi', lambda doi: '@article{Key}')
+    monkeypatch.setattr(citation, 'ParseBibtex', lambda bibtex: {'title': 'On computable numbers with an application to the decision problem',
+                                                                 'author': ['Ada Lovelace', 'Alan Turing', 'Emmy Noether']})
+    monkeypatch.setattr(citation, 'GetOrcidJson', orcid_api({
+        'expanded-search/?q=doi-self:10.1/a': {'expanded-result': [{'orcid-id': '0000-0001', 'given-names': 'Ada', 'family-names': 'Lovelace'},
+                                                                   {'orcid-id': '0000-0002'}]},
+        '0000-0002/personal-details': details('Alan', 'Turing')}, requested))
+
+    author_with_orcid, author_without_orcid, citation_dict = citation.ResolveCitation('10.1/a')
+    assert author_with_orcid == [['Ada Lovelace', '0000-0001'], ['Alan Turing', '0000-0002']]
+    assert author_without_orcid == ['Emmy Noether']
+    assert sorted(requested) == ['0000-0002/personal-details', 'expanded-search/?q=doi-self:10.1/a']
+
+    # Names are cached, also the ones from the expanded search
+    requested.clear()
+    assert citation.OrcidName('0000-0001') == 'Ada Lovelace' and citation.OrcidName('0000-0002') == 'Alan Turing'
+    assert requested == []
@@ -0,0 +1,62 @@
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+from MaRDMO import client
+from MaRDMO.config import http_timeout, user_agent
+
+class Handler(BaseHTTPRequestHandler):
+    '''Keep-alive server failing the first requests of a path with 503'''
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.requests.append((self.path, self.client_address[1], self.headers['User-Agent']))
+        failures = self.server.failures.get(self.path, 0)
+        self.server.failures[self.path] = failures - 1
+        status, body = (503, b'busy') if failures > 0 else (200, b'{"ok": true}')
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.requests, server.failures = [], {}
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+def url(server, path):
+    return 'http://127.0.0.1:{0}{1}'.format(server.server_address[1], path)
+
+def test_connections_are_reused(server):
+    session = client.Session()
+    assert [session.get(url(server, '/sparql')).json() for n in range(3)] == [{'ok': True}] * 3
+    # One connection of the shared pool, MaRDMO User-Agent
+    assert len({port for _, port, _ in server.requests}) == 1
+    assert {agent for _, _, agent in server.requests} == {user_agent}
+
+def test_failing_requests_are_retried(server):
+    server.failures['/search'] = 1
+    response = client.session.get(url(server, '/search'))
+    assert response.status_code == 200 and len(server.requests) == 2
+
+def test_default_timeout(monkeypatch):
+    sent = []
+    class Response:
+        status_code = 200
+        headers = {}
+        content = b''
+    monkeypatch.setattr(requests.Session, 'request', lambda self, method, url, **kwargs: sent.append(kwargs['timeout']) or Response())
+    client.Session().get('http://127.0.0.1:1/')
+    client.Session().get('http://127.0.0.1:1/', timeout=1)
+    assert sent == [http_timeout, 1]
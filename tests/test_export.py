@@ -0,0 +1,75 @@
+import threading
+import time
+
+import pytest
+
+from MaRDMO import export
+from MaRDMO.cache import Cache
+from MaRDMO.export import MaRDIExport
+from MaRDMO.management.commands import mardmo_export
+from MaRDMO.para import dec
+from MaRDMO.plan import WritePlan
+
+@pytest.fixture
+def item_cache(monkeypatch):
+    item_cache = Cache('items', 16, {}, 300)
+    monkeypatch.setattr(export, 'item_cache', item_cache)
+    monkeypatch.setattr(export, 'entity_index', None)
+    return item_cache
+
+def planned_export(written):
+    '''Export planning the same new model, its writes take a while'''
+    def entry_write(wbi, label, description, facts):
+        time.sleep(0.1)
+        written.append((label, description))
+        return 'Q{0}'.format(100+len(written))
+    item = MaRDIExport('mardmo', 'MaRDMO', 'MaRDMO.export.MaRDIExport')
+    item.plan = WritePlan()
+    item.entry_write = entry_write
+    item.wikibase_login = lambda renew=False: None
+    placeholder = item.entry('heat model', 'model of heat conduction', [])
+    return item, placeholder
+
+def test_concurrent_exports_write_one_item(item_cache):
+    written = []
+    exports = [planned_export(written) for n in range(3)]
+    threads = [threading.Thread(target=item.plan.write, args=(item.write_entry,)) for item, placeholder in exports]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert written == [('heat model', 'model of heat conduction')]
+    assert {item.plan.resolve(placeholder) for item, placeholder in exports} == {'Q101'}
+
+    # Later exports reuse the item as well
+    item, placeholder = planned_export(written)
+    item.plan.write(item.write_entry)
+    assert item.plan.resolve(placeholder) == 'Q101' and len(written) == 1
+
+def test_created_items_are_listed_once(item_cache):
+    written = []
+    exports = [planned_export(written) for n in range(3)]
+    threads = [threading.Thread(target=item.plan.write, args=(item.write_entry,)) for item, placeholder in exports]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # The export which wrote the item lists it, the others reused it
+    assert sum((item.plan.created for item, placeholder in exports), []) == [{'qid': 'Q101', 'label': 'heat model', 'description': 'model of heat conduction'}]
+
+def test_report_lists_items_of_failed_exports(item_cache, monkeypatch):
+    class Export(MaRDIExport):
+        def answers(self):
+            return {dec[0][0]: dec[0][1], dec[2][0]: dec[2][2], dec[3][0]: dec[3][1]}
+        def workflow_documentation(self, data):
+            self.plan = WritePlan()
+            self.plan.created.append({'qid': 'Q7', 'label': 'heat model', 'description': 'model of heat conduction'})
+            raise RuntimeError('page not published')
+    class Project:
+        id = 1
+        title = 'Heat'
+    monkeypatch.setattr(mardmo_export, 'MaRDIExport', Export)
+    monkeypatch.setattr(mardmo_export, 'close_old_connections', lambda: None)
+    result = mardmo_export.Command().export(Project(), None)
+    assert result['status'] == 'failed' and result['error'] == 'RuntimeError: page not published'
+    assert result['items'] == [{'qid': 'Q7', 'label': 'heat model', 'description': 'model of heat conduction'}]
@@ -0,0 +1,26 @@
+'''Dependencies only needed by exports are imported on first use, not when RDMO workers
+import the export plugin and the option set providers (benchmarks/import_time.py
+measures the import time).'''
+
+import os
+import subprocess
+import sys
+
+tests = os.path.dirname(os.path.abspath(__file__))
+
+lazy = ('wikibaseintegrator', 'bibtexparser', 'langdetect', 'pylatexenc', 'pypandoc')
+
+script = '''
+import sys
+sys.path[:0] = [{0!r}, {1!r}]
+import conftest
+conftest.pytest_configure()
+loaded = set(sys.modules)
+import MaRDMO.export, MaRDMO.providers
+print(' '.join(sorted(name for name in set(sys.modules) - loaded if name.split('.')[0] in {2!r})))
+'''.format(tests, os.path.dirname(tests), lazy)
+
+def test_export_dependencies_are_imported_lazily():
+    # A new interpreter, the tests import MaRDMO and its dependencies already
+    output = subprocess.run([sys.executable, '-c', script], capture_output=True, text=True, check=True).stdout
+    assert output.split() == []
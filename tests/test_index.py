@@ -0,0 +1,115 @@
+import sqlite3
+
+import pytest
+
+from MaRDMO import export, index
+from MaRDMO.config import mardi_api, mardi_endpoint
+from MaRDMO.export import MaRDIExport
+from MaRDMO.id import P2, P4, Q2, Q3
+from MaRDMO.para import dec
+from MaRDMO.plan import WritePlan
+
+# Answers of a workflow documentation exported to the MaRDI Portal
+portal_export = {dec[2][0]: dec[2][2], dec[3][0]: dec[3][1]}
+
+@pytest.fixture
+def entity_index(tmp_path, monkeypatch):
+    entity_index = index.EntityIndex(str(tmp_path / 'index.sqlite3'))
+    monkeypatch.setattr(export, 'entity_index', entity_index)
+    monkeypatch.setattr(export, 'index_authoritative', True)
+    return entity_index
+
+def check_discipline(written):
+    '''Check and plan the Wikidata discipline physics as an export does, returns its QID and the plan'''
+    item = MaRDIExport('mardmo', 'MaRDMO', 'MaRDMO.export.MaRDIExport')
+    item.plan = WritePlan()
+    item.entry_write = lambda wbi, label, description, facts: written.setdefault((label, description), 'Q{0}'.format(500+len(written)))
+    item.wikibase_login = lambda renew=False: None
+    mquery = item.get_check_results(mardi_endpoint, {'mqdis0': ('physics', 'natural science')})['mqdis0']
+    qid, _ = item.portal_wikidata_check(mquery, {'qid': ['wikidata', 'Q413'], 'label': 'physics', 'quote': 'natural science'}, portal_export)
+    item.plan.write(item.write_entry)
+    return item.plan.resolve(qid), item.plan
+
+def test_wikidata_copy_is_created_once(entity_index):
+    written = {}
+    first, plan = check_discipline(written)
+    assert len(plan.items) == 1 and first == 'Q500'
+
+    # The copy is found in the index by the next export instead of being written again
+    second, plan = check_discipline(written)
+    assert plan.items == [] and second == first
+    assert written == {('physics', 'natural science'): 'Q500'}
+
+def test_add_item_keeps_classes_and_wikidata_copies(entity_index):
+    entity_index.add_item('Q1', 'model', 'mathematical model', [('Item', Q3, P4)])
+    entity_index.add_item('Q2', 'physics', 'natural science', [('ExternalID', 'Q413', P2)])
+    entity_index.add_item('Q3', 'paper', 'publication', [('Item', 'Q1', P4)])
+    assert entity_index.lookup({'model': ('model', 'mathematical model'), 'physics': ('physics', 'natural science'),
+                                'paper': ('paper', 'publication')}) == {'model': 'Q1', 'physics': 'Q2'}
+
+class Response:
+    def __init__(self, data):
+        self.data = data
+    def json(self):
+        return self.data
+
+def fake_kg(monkeypatch, entities=(), copies=(), deletions=(), redirects=()):
+    '''Answer the SPARQL queries and the deletion log requests of a sync'''
+    def get(url, params):
+        if url == mardi_api:
+            return Response({'query': {'logevents': [{'title': 'Item:'+qid, 'timestamp': '2024-02-01T00:00:00Z'} for qid in deletions]}})
+        if 'owl:sameAs' in params['query']:
+            return Response({'results': {'bindings': [{'qid': {'value': qid}, 'target': {'value': target}} for qid, target in redirects]}})
+        return Response({'results': {'bindings': list(copies if 'FILTER NOT EXISTS' in params['query'] else entities if 'wd:'+Q3+';' in params['query'] else [])}})
+    monkeypatch.setattr(index.session, 'get', get)
+
+def binding(qid, label, description, wikidata=''):
+    return {'qid': {'value': qid}, 'label': {'value': label}, 'quote': {'value': description},
+            'wikidata': {'value': wikidata}, 'modified': {'value': '2024-01-01T00:00:00Z'}}
+
+def test_sync_pulls_wikidata_copies(entity_index, monkeypatch):
+    fake_kg(monkeypatch, copies=[binding('Q2', 'physics', 'natural science', 'Q413')])
+    counts = entity_index.sync()
+    assert counts[index.mapped] == 1
+    assert entity_index.lookup({'physics': ('physics', 'natural science')}) == {'physics': 'Q2'}
+
+def test_sync_drops_deleted_and_merged_items(entity_index, monkeypatch):
+    fake_kg(monkeypatch, entities=[binding('Q1', 'heat model', 'model of heat'), binding('Q5', 'heat model', 'model of heat conduction'),
+                                   binding('Q6', 'wave model', 'model of waves')])
+    entity_index.sync()
+    fake_kg(monkeypatch, deletions=['Q6', 'Q7'], redirects=[('Q1', 'Q5')])
+    counts = entity_index.sync()
+    assert counts[index.deleted] == 1 and counts[index.redirected] == 1
+    assert entity_index.lookup({'heat': ('heat model', 'model of heat'), 'conduction': ('heat model', 'model of heat conduction'),
+                                'wave': ('wave model', 'model of waves')}) == {'conduction': 'Q5'}
+    assert entity_index.synced(index.deleted) == '2024-02-01T00:00:00Z'
+
+def test_match_descriptions(entity_index):
+    entity_index.add('Q1', 'heat', 'Heat equation in 50% of_cases', Q2)
+    entity_index.add('Q2', 'wave', 'Wave equation', Q2)
+    entity_index.add('Q3', 'heat model', 'heat equation', Q3)
+    # Replaced descriptions are no longer matched
+    entity_index.add('Q2', 'wave', 'Wave propagation', Q2)
+    assert entity_index.match_descriptions(['heat EQ', 'equation', '%', 'f_', 'pro', '"heat'], Q2) == {
+        'heat EQ': ['Q1'], 'equation': ['Q1'], '%': ['Q1'], 'f_': ['Q1'], 'pro': ['Q2'], '"heat': []}
+
+def test_index_files_without_description_index_are_filled(tmp_path):
+    path = str(tmp_path / 'index.sqlite3')
+    with sqlite3.connect(path) as connection:
+        connection.executescript(index.schema)
+        connection.execute(index.insert, index.entity_row('Q1', 'heat', 'heat equation', Q2, ''))
+    connection.close()
+    assert index.EntityIndex(path).match_descriptions(['equation'], Q2) == {'equation': ['Q1']}
+
+def test_hits_are_verified_unless_authoritative(entity_index, monkeypatch):
+    monkeypatch.setattr(export, 'index_authoritative', False)
+    entity_index.add('Q1', 'heat model', 'model of heat', Q3)
+    item = MaRDIExport('mardmo', 'MaRDMO', 'MaRDMO.export.MaRDIExport')
+    queries = []
+    monkeypatch.setattr(item, 'get_results', lambda endpoint, query: queries.append(query) or [])
+    results = item.get_check_results(mardi_endpoint, {'model': ('heat model', 'model of heat')})
+    assert results['model']['qid']['value'] == '' and len(queries) == 1
+
+    monkeypatch.setattr(export, 'index_authoritative', True)
+    results = item.get_check_results(mardi_endpoint, {'model': ('heat model', 'model of heat')})
+    assert results['model']['qid']['value'] == 'Q1' and len(queries) == 1
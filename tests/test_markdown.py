@@ -0,0 +1,36 @@
+'''Golden files of the built in Markdown renderer and the pandoc fallback: tests/data/markdown/NAME.md with the
+output of pandoc 3.9 as NAME.html (pandoc -f markdown -t html --mathjax --wrap=preserve)
+and NAME.mediawiki (pandoc -f markdown -t mediawiki --wrap=preserve).'''
+
+import os
+
+import pytest
+
+from MaRDMO import markdown
+from MaRDMO.markdown import Renderer, supported
+
+golden = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'markdown')
+
+documents = sorted(name[:-3] for name in os.listdir(golden) if name.endswith('.md'))
+
+def read(name):
+    with open(os.path.join(golden, name), encoding='utf-8') as file:
+        return file.read()
+
+@pytest.mark.parametrize('document', documents)
+@pytest.mark.parametrize('to', ['html', 'mediawiki'])
+def test_renderer_matches_pandoc(document, to):
+    markdown = read(document+'.md')
+    assert supported(markdown)
+    assert Renderer(to).render(markdown) == read(document+'.'+to)
+
+def test_unsupported_markdown_is_left_to_pandoc():
+    assert not supported('See [the portal](https://portal.mardi4nfdi.de)')
+    assert not supported('1. first\n2. second')
+
+@pytest.mark.parametrize('document', documents)
+@pytest.mark.parametrize('to', ['html', 'mediawiki'])
+def test_pandoc_fallback_matches_golden_files(document, to, monkeypatch):
+    pytest.importorskip('pypandoc')
+    monkeypatch.setattr(markdown, 'markdown_renderer', 'pandoc')
+    assert markdown.convert(read(document+'.md'), to) == read(document+'.'+to)
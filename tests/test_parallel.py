@@ -0,0 +1,52 @@
+import threading
+
+import pytest
+
+from MaRDMO.parallel import SingleFlight, submit, gather
+
+def concurrent_calls(flight, key, function, callers=4):
+    '''Start callers calls of key while the first is still running'''
+    started = threading.Event()
+    release = threading.Event()
+    def call():
+        started.set()
+        release.wait(5)
+        return function()
+    leader = submit(flight.do, key, call)
+    started.wait(5)
+    waiters = [submit(flight.do, key, function) for _ in range(callers-1)]
+    # Waiters are registered once counted as shared
+    while flight.counts['shared'] < callers-1:
+        threading.Event().wait(0.01)
+    release.set()
+    return [leader] + waiters
+
+def test_identical_calls_share_one_call():
+    flight = SingleFlight()
+    calls = []
+    futures = concurrent_calls(flight, 'key', lambda: calls.append(1) or {'qid': ['Q1']})
+    assert gather(futures) == [{'qid': ['Q1']}] * 4
+    assert len(calls) == 1 and flight.counts == {'calls': 1, 'shared': 3}
+    # Finished calls are not shared
+    assert flight.do('key', lambda: 'again') == 'again' and flight.calls == {}
+
+def test_waiters_get_copies():
+    flight = SingleFlight()
+    results = gather(concurrent_calls(flight, 'key', lambda: {'qid': ['Q1']}, 3))
+    results[1]['qid'].append('Q2')
+    assert results[0] == results[2] == {'qid': ['Q1']}
+
+def test_errors_are_raised_for_all_callers():
+    flight = SingleFlight()
+    def fail():
+        raise ConnectionError('refused')
+    futures = concurrent_calls(flight, 'key', fail)
+    for future in futures:
+        with pytest.raises(ConnectionError):
+            future.result()
+    assert flight.counts['calls'] == 1 and flight.calls == {}
+
+def test_different_keys_are_not_shared():
+    flight = SingleFlight()
+    assert [flight.do(key, lambda key=key: key) for key in ('a', 'b')] == ['a', 'b']
+    assert flight.counts == {'calls': 2, 'shared': 0}
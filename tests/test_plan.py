@@ -0,0 +1,28 @@
+from MaRDMO.plan import WritePlan
+
+class Item:
+    '''Stand in for the Item datatype of WikibaseIntegrator'''
+
+def test_workflow_without_publication():
+    # Without DOI the cited work of the workflow is an empty list
+    plan = WritePlan()
+    facts = [(Item, 'Q2', 4), (Item, [], 3)]
+    workflow = plan.add('Workflow', 'Research objective', facts)
+    assert plan.add('Workflow', 'Research objective', list(facts)) == workflow
+
+    written = []
+    plan.write(lambda label, description, facts: written.append((label, facts)) or 'Q100')
+    assert written == [('Workflow', facts)]
+    assert plan.resolve(workflow) == 'Q100'
+
+def test_dependent_items_are_written_in_later_waves():
+    plan = WritePlan()
+    author = plan.add('Author', 'researcher', [(Item, 'Q7', 4)])
+    paper = plan.add('Paper', 'publication', [(Item, author, 8), (Item, [], 10)])
+    assert [[item['label'] for item in wave] for wave in plan.waves()] == [['Author'], ['Paper']]
+
+    qids = iter(['Q1', 'Q2'])
+    written = {}
+    plan.write(lambda label, description, facts: written.setdefault(label, (next(qids), facts))[0])
+    assert written['Paper'][1][0] == (Item, 'Q1', 8)
+    assert plan.resolve(paper) == 'Q2'
@@ -0,0 +1,123 @@
+import pytest
+
+from MaRDMO import portal
+
+class Response:
+    def __init__(self, data):
+        self.data = data
+    def json(self):
+        return self.data
+
+class Login:
+    '''Logged in session answering the revision query and the edit request'''
+
+    def __init__(self, edit):
+        self.edit = edit
+        self.edits = []
+
+    def session(self, renew=False):
+        return self
+
+    def edit_token(self, renew=False):
+        return 'token'
+
+    def get(self, url, params):
+        return Response({'query': {'pages': [{'title': params['titles'], 'missing': True}]}})
+
+    def post(self, url, data):
+        self.edits.append(data)
+        return Response({'edit': self.edit})
+
+def test_successful_edit_is_returned(monkeypatch):
+    login = Login({'result': 'Success', 'title': 'Workflow', 'newrevid': 7})
+    monkeypatch.setattr(portal, 'portal_login', login)
+    assert portal.publish_page('Workflow', 'text')['newrevid'] == 7
+    assert login.edits[0]['createonly'] == 1
+
+@pytest.mark.parametrize('edit, code', [({'result': 'Failure', 'captcha': {'type': 'image', 'id': '1'}}, 'captcha'),
+                                        ({'result': 'Failure', 'code': 'abusefilter-disallowed', 'info': 'Refused by filter'}, 'abusefilter-disallowed'),
+                                        ({'result': 'Failure'}, 'failure')])
+def test_refused_edit_raises_page_error(monkeypatch, edit, code):
+    monkeypatch.setattr(portal, 'portal_login', Login(edit))
+    with pytest.raises(portal.PageError) as error:
+        portal.publish_page('Workflow', 'text')
+    assert error.value.code == code
+
+class WikibaseLogin:
+    '''Stand-in for wbi_login.Login, counts the logins'''
+    count = 0
+
+    def __init__(self, user, password, mediawiki_api_url):
+        WikibaseLogin.count += 1
+        self.session = portal.Session()
+
+class Integrator:
+    def __init__(self, login):
+        self.login = login
+
+@pytest.fixture
+def logins(monkeypatch):
+    import wikibaseintegrator
+    from wikibaseintegrator import wbi_login
+    monkeypatch.setattr(wbi_login, 'Login', WikibaseLogin)
+    monkeypatch.setattr(wikibaseintegrator, 'WikibaseIntegrator', Integrator)
+    WikibaseLogin.count = 0
+    now = [1000.0]
+    monkeypatch.setattr(portal.time, 'monotonic', lambda: now[0])
+    return now
+
+def test_login_is_shared_and_renewed(logins):
+    login = portal.PortalLogin()
+    wbi = login.get()
+    assert login.get() is wbi and WikibaseLogin.count == 1
+    # The logged in session continues with the shared HTTP client
+    assert wbi.login.session.__class__ is portal.Session
+    assert login.get(renew=True) is not wbi and WikibaseLogin.count == 2
+    logins[0] += portal.login_expiry + 1
+    login.get()
+    assert WikibaseLogin.count == 3
+
+@pytest.mark.parametrize('code, writes', [('badtoken', 2), ('assertuserfailed', 2), ('permissiondenied', 1)])
+def test_write_entry_renews_expired_login(monkeypatch, code, writes):
+    from wikibaseintegrator.wbi_exceptions import MWApiError
+    from MaRDMO import export
+    from MaRDMO.cache import Cache
+    from MaRDMO.plan import WritePlan
+
+    monkeypatch.setattr(export, 'item_cache', Cache('items', 10, {}, 60))
+    monkeypatch.setattr(export, 'sparql_cache', Cache('sparql', 10, {}, 60))
+    monkeypatch.setattr(export, 'entity_index', None)
+    renewals = []
+    calls = []
+    def entry_write(wbi, label, description, facts):
+        calls.append(wbi)
+        if len(calls) == 1:
+            raise MWApiError({'code': code, 'info': 'Login failed'})
+        return 'Q1'
+    mardi_export = export.MaRDIExport('mardmo', 'MaRDMO', 'MaRDMO.export.MaRDIExport')
+    mardi_export.plan = WritePlan()
+    mardi_export.entry_write = entry_write
+    mardi_export.wikibase_login = lambda renew=False: renewals.append(renew) or renew
+
+    if writes == 1:
+        with pytest.raises(MWApiError):
+            mardi_export.write_entry('heat model', 'model of heat', [])
+    else:
+        assert mardi_export.write_entry('heat model', 'model of heat', []) == 'Q1'
+    assert renewals == [False, True][:writes] and calls == [False, True][:writes]
+
+def test_page_edit_renews_expired_token(monkeypatch):
+    class ExpiringLogin(Login):
+        renewals = []
+        def session(self, renew=False):
+            self.renewals.append(renew)
+            return self
+        def post(self, url, data):
+            self.edits.append(data)
+            if len(self.edits) == 1:
+                return Response({'error': {'code': 'badtoken', 'info': 'Invalid CSRF token.'}})
+            return Response({'edit': self.edit})
+    login = ExpiringLogin({'result': 'Success', 'title': 'Workflow', 'newrevid': 7})
+    monkeypatch.setattr(portal, 'portal_login', login)
+    assert portal.publish_page('Workflow', 'text')['newrevid'] == 7
+    assert login.renewals == [False, True]
@@ -0,0 +1,96 @@
+import threading
+
+from MaRDMO import parallel, providers
+from MaRDMO.answers import Answers
+from MaRDMO.display import err28, partial_text
+from MaRDMO.export import MaRDIExport
+from MaRDMO.para import dec
+
+api = 'https://example.org/w/api.php'
+
+def test_search_not_held_up_by_busy_exports(monkeypatch):
+    # Exports occupy every thread of the shared pool
+    release = threading.Event()
+    busy = [parallel.submit(release.wait) for _ in range(parallel.executor._max_workers)]
+    monkeypatch.setattr(providers, 'search_entities', lambda api, search: [{'id': 'Q1', 'api': api}])
+    try:
+        results, skipped = providers.search_sources([api], 'finite elements busy')
+    finally:
+        release.set()
+        parallel.gather(busy)
+    assert results == {api: [{'id': 'Q1', 'api': api}]} and skipped == []
+
+def result(qid):
+    return {'id': qid, 'display': {'label': {'value': 'heat'}, 'description': {'value': 'heat equation'}}}
+
+def test_sources_missing_their_deadline_are_flagged(monkeypatch):
+    release = threading.Event()
+    def search_entities(api, search):
+        if api == providers.wikidata_api:
+            release.wait(5)
+        return [result('Q1')]
+    monkeypatch.setattr(providers, 'search_entities', search_entities)
+    monkeypatch.setattr(providers, 'search_deadline', {providers.wikidata_api: 0.05})
+    try:
+        results, skipped = providers.search_sources([providers.wikidata_api, providers.mardi_api], 'heat deadline')
+        assert results == {providers.wikidata_api: None, providers.mardi_api: [result('Q1')]}
+        assert skipped == [providers.wikidata_api]
+
+        options = providers.WikidataSearch('wikidata', 'Wikidata', 'MaRDMO.providers.WikidataSearch').get_options(None, 'heat deadline option')
+    finally:
+        release.set()
+    assert [option['id'] for option in options] == ['M0', 'partial']
+    assert options[-1]['text'] == partial_text + 'Wikidata did not answer, search again for all results'
+
+def test_failing_sources_are_flagged(monkeypatch):
+    def search_entities(api, search):
+        raise ConnectionError('refused')
+    monkeypatch.setattr(providers, 'search_entities', search_entities)
+    monkeypatch.setattr(providers, 'entity_index', None)
+    options = providers.ComponentSearch('component', 'Component', 'MaRDMO.providers.ComponentSearch').get_options(None, 'heat failure')
+    assert options == [providers.partial_option([providers.mardi_api])]
+
+def test_export_refuses_the_partial_note_as_answer():
+    export = MaRDIExport('mardmo', 'MaRDMO', 'MaRDMO.export.MaRDIExport')
+    data = Answers({dec[2][0]: '', dec[3][0]: '', 'https://rdmo.mardi4nfdi.de/terms/domain/MaRDI/Section_3/Set_1/Question_01_0':
+                    'wikidata:Q11 <|> physics <|> natural science; ' + partial_text + 'Wikidata did not answer, search again for all results'})
+    assert err28 in export.workflow_documentation(data).content.decode()
+
+def labelled(qid, label, aliases=()):
+    return {'id': qid, 'label': label, 'aliases': list(aliases), 'match': {'type': 'label', 'text': label}}
+
+def test_short_prefix_results_are_filtered_locally(monkeypatch):
+    from MaRDMO.cache import Cache
+    monkeypatch.setattr(providers, 'search_cache', Cache('search', 10, {}, 60))
+    fetched = []
+    class Response:
+        def json(self):
+            return {'search': [labelled('Q1', 'Heat equation'), labelled('Q2', 'Heat flux', ['Heat transfer']), labelled('Q3', 'Heating')]}
+    monkeypatch.setattr(providers.session, 'get', lambda api, params: fetched.append(params['search']) or Response())
+
+    assert providers.cached_search(api, 'heat') is None
+    providers.search_entities(api, 'Heat')
+    assert [result['id'] for result in providers.cached_search(api, ' HEAT  ')] == ['Q1', 'Q2', 'Q3']
+    assert [result['id'] for result in providers.cached_search(api, 'heat e')] == ['Q1']
+    assert [result['id'] for result in providers.cached_search(api, 'heat t')] == ['Q2']
+    assert providers.cached_search(api, 'heat e', 'de') is None
+    assert fetched == ['Heat']
+
+def test_full_prefix_results_are_not_reused(monkeypatch):
+    from MaRDMO.cache import Cache
+    monkeypatch.setattr(providers, 'search_cache', Cache('search', 10, {}, 60))
+    # A search with search_limit results may miss entries of longer searches
+    providers.search_cache.set(api+'|en', 'heat', [labelled('Q'+str(n), 'Heat') for n in range(providers.search_limit)])
+    assert providers.cached_search(api, 'heat equation') is None
+
+def test_matches():
+    result = labelled('Q1', 'Finite element method', ['FEM'])
+    assert providers.matches(result, 'finite el') and providers.matches(result, 'fem')
+    assert not providers.matches(result, 'element')
+    assert providers.matches({'id': 'Q2', 'match': {'text': 'Navier Stokes'}}, 'navier stokes')
+
+def test_format_option():
+    assert providers.format_option('wikidata', 3, result('Q1')) == {'id': 'W3', 'text': 'wikidata:Q1 <|> heat <|> heat equation'}
+    missing = {'id': 'Q2', 'display': {'label': {'value': 'heat'}}}
+    assert providers.format_option('wikidata', 0, missing) == {'id': 'W0', 'text': 'wikidata:Q2 <|> heat <|> No Description Provided!'}
+    assert providers.format_option('mardi', 1, {'id': 'Q3', 'display': {'label': {'value': ' heat'}}}) == {'id': 'M1', 'text': 'mardi:Q3 <|> heat <|> No Description Provided!'}
@@ -0,0 +1,123 @@
+import pytest
+import requests
+
+from django.core.cache import caches
+from django.core.exceptions import ImproperlyConfigured
+
+from MaRDMO import client, ratelimit
+
+class Clock:
+    '''Fake time.time, time.monotonic and time.sleep, sleeping advances the clock'''
+
+    def __init__(self, monkeypatch, now=1000.0):
+        self.now = now
+        self.sleeps = []
+        monkeypatch.setattr(ratelimit.time, 'time', lambda: self.now)
+        monkeypatch.setattr(ratelimit.time, 'monotonic', lambda: self.now)
+        monkeypatch.setattr(ratelimit.time, 'sleep', self.sleep)
+
+    def sleep(self, seconds):
+        self.sleeps.append(round(seconds, 6))
+        self.now += seconds
+
+@pytest.fixture
+def clock(monkeypatch):
+    return Clock(monkeypatch)
+
+def test_token_bucket_allows_burst_then_rate(clock):
+    bucket = ratelimit.TokenBucket(2, 3)
+    assert [bucket.reserve() for n in range(5)] == [0, 0, 0, 0.5, 1.0]
+    clock.now += 1
+    # Tokens taken ahead of time are paid back first
+    assert bucket.reserve() == 0.5
+
+@pytest.mark.parametrize('limit', [(0, 1), (-1, 5), (1, 0), (1,), 'fast'])
+def test_invalid_rate_limits_are_refused(limit):
+    with pytest.raises(ImproperlyConfigured):
+        ratelimit.check_limit('MARDMO_RATE_LIMIT_DEFAULT', limit)
+
+def test_fractional_rate_limits_are_accepted():
+    ratelimit.check_limit('MARDMO_RATE_LIMIT_DEFAULT', (0.2, 1))
+    ratelimit.check_limit('MARDMO_RATE_LIMIT_DEFAULT', None)
+
+def test_retry_after():
+    class Response:
+        def __init__(self, value):
+            self.headers = {'Retry-After': value} if value is not None else {}
+    assert ratelimit.retry_after(Response('7')) == 7
+    assert ratelimit.retry_after(Response(None)) is None
+    assert ratelimit.retry_after(Response('soon')) is None
+    assert ratelimit.retry_after(Response('Wed, 21 Oct 2015 07:28:00 GMT')) == 0
+
+def test_pause_holds_back_requests_to_host(clock, monkeypatch):
+    monkeypatch.setattr(ratelimit, 'rate_limits', {})
+    monkeypatch.setattr(ratelimit, 'rate_limit_shared', False)
+    monkeypatch.setattr(ratelimit, 'rate_limit_max_pause', 60)
+    limiter = ratelimit.RateLimiter()
+    limiter.pause('query.wikidata.org', 120)
+    limiter.acquire('pub.orcid.org')
+    limiter.acquire('query.wikidata.org')
+    # The pause is capped by rate_limit_max_pause
+    assert clock.sleeps == [60]
+
+@pytest.mark.parametrize('rate, sleeps', [(2, [0, 0, 1.0, 0, 1.0]), (0.25, [0, 4.0, 4.0, 4.0, 4.0])])
+def test_shared_limit_counts_requests_per_window(clock, monkeypatch, rate, sleeps):
+    monkeypatch.setattr(ratelimit, 'cache_backend', 'default')
+    caches['default'].clear()
+    limiter = ratelimit.RateLimiter()
+    waited = []
+    for n in range(5):
+        assert limiter.shared_acquire('query.wikidata.org', rate)
+        waited.append(sum(clock.sleeps))
+        clock.sleeps.clear()
+    assert waited == sleeps
+
+class Response:
+    def __init__(self, status, headers):
+        self.status_code = status
+        self.headers = headers
+        self.content = b'{}'
+
+def test_writes_are_retried_while_database_lags(monkeypatch):
+    responses = [Response(200, {'X-Database-Lag': '7', 'Retry-After': '7'}), Response(200, {'X-Database-Lag': '2'}), Response(200, {})]
+    sent, pauses = [], []
+    monkeypatch.setattr(requests.Session, 'request', lambda self, method, url, **kwargs: sent.append(kwargs['data']) or responses.pop(0))
+    monkeypatch.setattr(client.limiter, 'acquire', lambda host: None)
+    monkeypatch.setattr(client.limiter, 'pause', lambda host, seconds: pauses.append((host, seconds)))
+    monkeypatch.setattr(client, 'maxlag', 5)
+    monkeypatch.setattr(client, 'maxlag_retries', 3)
+    response = client.Session().post('https://portal.mardi4nfdi.de/w/api.php', data={'action': 'edit', 'token': 'x'})
+    assert response.status_code == 200 and not responses
+    assert [data['maxlag'] for data in sent] == [5, 5, 5]
+    assert pauses == [('portal.mardi4nfdi.de', 7), ('portal.mardi4nfdi.de', 5)]
+
+def test_lagging_writes_give_up_after_retries(monkeypatch):
+    sent = []
+    monkeypatch.setattr(requests.Session, 'request', lambda self, method, url, **kwargs: sent.append(url) or Response(200, {'X-Database-Lag': '9'}))
+    monkeypatch.setattr(client.limiter, 'acquire', lambda host: None)
+    monkeypatch.setattr(client.limiter, 'pause', lambda host, seconds: None)
+    monkeypatch.setattr(client, 'maxlag_retries', 2)
+    response = client.Session().post('https://portal.mardi4nfdi.de/w/api.php', data={'action': 'edit', 'token': 'x'})
+    assert 'X-Database-Lag' in response.headers and len(sent) == 3
+
+def test_redirected_requests_keep_the_original_host(monkeypatch):
+    sent, limited, spans = [], [], []
+    class Span:
+        def __init__(self, name, **attributes):
+            spans.append((name, attributes['host']))
+        def __enter__(self):
+            return None
+        def __exit__(self, *args):
+            return False
+    class Limit(Span):
+        def __init__(self, url):
+            limited.append(url)
+    monkeypatch.setattr(requests.Session, 'request', lambda self, method, url, **kwargs: sent.append(url) or Response(200, {}))
+    monkeypatch.setattr(client.limiter, 'acquire', lambda host: None)
+    monkeypatch.setattr(client, 'http_hosts', {'query.wikidata.org': 'http://localhost:9999/wdqs'})
+    monkeypatch.setattr(client, 'limit', Limit)
+    monkeypatch.setattr(client, 'span', Span)
+    client.Session().get('https://query.wikidata.org/sparql?query=ASK')
+    assert sent == ['http://localhost:9999/wdqs/sparql?query=ASK']
+    assert limited == ['https://query.wikidata.org/sparql?query=ASK']
+    assert spans == [('https://query.wikidata.org/sparql', 'query.wikidata.org')]
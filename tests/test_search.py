@@ -0,0 +1,49 @@
+import pytest
+
+from MaRDMO import export, index
+from MaRDMO.config import wd, wdt
+from MaRDMO.id import P4, Q2
+from MaRDMO.sparql import contains_match, fulltext_match, search_query
+
+def test_text_matches_default_to_string_filters(monkeypatch):
+    monkeypatch.setattr(export, 'entity_index', None)
+    mardi_export = export.MaRDIExport('mardmo', 'MaRDMO', 'MaRDMO.export.MaRDIExport')
+    assert export.search_text == 'contains'
+    assert mardi_export.text_matches(['heat "equation"']) == [contains_match.format('heat \\"equation\\"')]
+
+def test_text_matches_fulltext(monkeypatch):
+    monkeypatch.setattr(export, 'entity_index', None)
+    monkeypatch.setattr(export, 'search_text', 'fulltext')
+    mardi_export = export.MaRDIExport('mardmo', 'MaRDMO', 'MaRDMO.export.MaRDIExport')
+    assert mardi_export.text_matches(['heat']) == [fulltext_match.format('heat')]
+
+workflows = {'Q101': ('Heat flow', 'heat equation solved on a finite element mesh'),
+             'Q102': ('Heat transfer', 'measured heat transfer'),
+             'Q103': ('Waves', 'wave equation'),
+             'Q104': ('Finite elements', 'finite element mesh refinement')}
+
+def ranking(texts, mardi_export):
+    '''QIDs and scores of the workflows found by the search query for key words texts'''
+    rdflib = pytest.importorskip('rdflib')
+    entity = lambda qid: rdflib.URIRef(wd[1:-1]+qid)
+    graph = rdflib.Graph()
+    for qid, (label, description) in workflows.items():
+        graph.add((entity(qid), rdflib.URIRef(wdt[1:-1]+'P'+P4), entity(Q2)))
+        graph.add((entity(qid), rdflib.RDFS.label, rdflib.Literal(label, lang='en')))
+        graph.add((entity(qid), rdflib.URIRef('http://schema.org/description'), rdflib.Literal(description, lang='en')))
+    query = search_query.format(P4, Q2, '\nUNION\n'.join(mardi_export.text_matches(texts)), 10, 0)
+    return [(str(row.qid), int(row.score)) for row in graph.query(query, initNs={'schema': 'http://schema.org/', 'rdfs': rdflib.RDFS})]
+
+def test_workflows_matching_all_key_words_rank_first(monkeypatch):
+    monkeypatch.setattr(export, 'entity_index', None)
+    mardi_export = export.MaRDIExport('mardmo', 'MaRDMO', 'MaRDMO.export.MaRDIExport')
+    assert ranking(['heat', 'finite element', 'mesh'], mardi_export) == [('Q101', 3), ('Q104', 2), ('Q102', 1)]
+
+def test_workflows_matching_all_key_words_rank_first_with_index(monkeypatch, tmp_path):
+    entity_index = index.EntityIndex(str(tmp_path / 'index.sqlite3'))
+    for qid, (label, description) in workflows.items():
+        entity_index.add(qid, label, description, Q2)
+    monkeypatch.setattr(export, 'entity_index', entity_index)
+    monkeypatch.setattr(export, 'index_authoritative', True)
+    mardi_export = export.MaRDIExport('mardmo', 'MaRDMO', 'MaRDMO.export.MaRDIExport')
+    assert ranking(['heat', 'finite element', 'mesh'], mardi_export) == [('Q101', 3), ('Q104', 2), ('Q102', 1)]
@@ -0,0 +1,71 @@
+'''Filling of the workflow templates: tests/data/template/NAME.md is the page of the
+answers of answers(NAME) as filled by MaRDIExport.fill_template.'''
+
+import os
+import re
+
+import pytest
+
+from MaRDMO.answers import Answers
+from MaRDMO.export import MaRDIExport
+from MaRDMO.para import BASE_URI, dec, exp_ids, exp_temp, math_ids, math_temp, placeholder, ws
+
+expected = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'template')
+
+texts = ['mardi:Q123 <|> Heat equation <|> PDE model', 'Yes: Intel Xeon, 64 GB', "Solve $\\frac{\\partial T}{\\partial t} = \\Delta T$",
+         'doi:10.1000/xyz123', 'wikidata:Q11 <|> Analysis <|> branch; mardi:Q2 <|> Numerics <|> No Description Provided!',
+         'a "quoted" and \'single\' answer', 'Backslash \\1 and \\n escapes', 'Temperature | in K']
+
+def answers(name):
+    '''Answers of all static placeholders (some left out) and of sets up to index 10'''
+    workflow, temp, ids = {'theoretical': (dec[1][1], math_temp, math_ids), 'experimental': (dec[1][3], exp_temp, exp_ids)}[name]
+    data = Answers({dec[1][0]: workflow})
+    for n, key in enumerate(sorted(set(re.findall(placeholder, temp)))):
+        if n % 5 != 4:
+            data[key] = texts[n % len(texts)]
+    data[ws['dis'][0]+'_0'] = 'wikidata:Q413 <|> physics <|> natural science'
+    data[ws['fie'][0]+'_1'] = 'mardi:Q7 <|> numerics <|> field of mathematics'
+    for n, question in enumerate(ids[0]):
+        for index in range(11):
+            data[question+'_'+str(index)] = 'row {0} column {1}'.format(index, n)
+    for n, question in enumerate(ids[2]):
+        for index in range(3):
+            data[question+'_'+str(index)] = texts[(n+index) % len(texts)]
+    return data
+
+def fill(data):
+    export = MaRDIExport('mardmo', 'MaRDMO', 'MaRDMO.export.MaRDIExport')
+    return export.fill_template(export.dyn_template(data), data)
+
+@pytest.mark.parametrize('name', ['theoretical', 'experimental'])
+def test_filled_template_matches_expected_page(name):
+    page = fill(answers(name))
+    with open(os.path.join(expected, name+'.md'), encoding='utf-8') as file:
+        assert page == file.read()
+    assert BASE_URI not in page
+
+@pytest.mark.parametrize('name', ['theoretical', 'experimental'])
+def test_set_index_10_gets_its_own_answer(name):
+    data = answers(name)
+    page = fill(data)
+    assert '| row 1 column 0 | row 1 column 1 | row 1 column 2 |' in page
+    assert '| row 10 column 0 | row 10 column 1 | row 10 column 2 |' in page
+    # The former loop replaced the key of index 1 within the placeholders of index 10
+    export = MaRDIExport('mardmo', 'MaRDMO', 'MaRDMO.export.MaRDIExport')
+    assert 'row 1 column 00' in replace_loop(export.dyn_template(data), data)
+
+def replace_loop(temp, data):
+    '''Former filling: per answer re.sub of the key, then removal of unanswered placeholders'''
+    for key, value in data.items():
+        temp = re.sub('"', '', re.sub(';', '<br/>', re.sub("Yes: |'", '', re.sub(key, repr(value), temp))))
+    for pattern in [BASE_URI+r'Section_\d{1}/Set_\d{1}/Question_\d{2}_\d', BASE_URI+r'Section_\d{1}/Set_\d{1}/Question_\d{2}',
+                    BASE_URI+r'Section_\d{1}/Set_\d{1}/Wiki_\d{2}_\d', BASE_URI+r'Section_\d{1}/Set_\d{1}/Wiki_\d{2}']:
+        temp = re.sub(pattern, '', temp)
+    return temp
+
+@pytest.mark.parametrize('name', ['theoretical', 'experimental'])
+def test_single_pass_matches_replace_loop_below_index_10(name):
+    data = Answers((key, value) for key, value in answers(name).items() if not key.endswith('_10'))
+    export = MaRDIExport('mardmo', 'MaRDMO', 'MaRDMO.export.MaRDIExport')
+    temp = export.dyn_template(data)
+    assert export.fill_template(temp, data) == replace_loop(temp, data)
@@ -0,0 +1,63 @@
+import logging
+
+import pytest
+
+from django.contrib.auth.models import AnonymousUser, User
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory
+
+from MaRDMO import timing, views
+
+def metrics_request(user=None, **headers):
+    request = RequestFactory().get('/mardmo/metrics/', headers=headers)
+    request.user = user or AnonymousUser()
+    return request
+
+def test_metrics_need_staff_or_token(monkeypatch):
+    monkeypatch.setattr(views, 'export_metrics', True)
+    monkeypatch.setattr(views, 'metrics_token', 'secret')
+    with pytest.raises(PermissionDenied):
+        views.metrics(metrics_request())
+    with pytest.raises(PermissionDenied):
+        views.metrics(metrics_request(Authorization='Bearer wrong'))
+    assert views.metrics(metrics_request(Authorization='Bearer secret')).status_code == 200
+    assert views.metrics(metrics_request(User(is_staff=True))).status_code == 200
+
+def test_metrics_without_token_need_staff(monkeypatch):
+    monkeypatch.setattr(views, 'export_metrics', True)
+    monkeypatch.setattr(views, 'metrics_token', None)
+    with pytest.raises(PermissionDenied):
+        views.metrics(metrics_request(User(), Authorization='Bearer '))
+
+class Export:
+    @timing.traced
+    def page(self):
+        with timing.span('render'):
+            return HttpResponse('page')
+
+    @timing.traced
+    def stream(self):
+        def pages():
+            for n in range(2):
+                with timing.span('page'):
+                    yield 'page {0}'.format(n)
+        return StreamingHttpResponse(pages())
+
+def test_traced_response(monkeypatch, caplog):
+    monkeypatch.setattr(timing, 'export_timing', True)
+    with caplog.at_level(logging.INFO, logger='MaRDMO.timing'):
+        response = Export().page()
+    assert response['Server-Timing'].startswith('render;dur=')
+    assert len(caplog.records) == 1
+
+def test_traced_streaming_response_until_closed(monkeypatch, caplog):
+    monkeypatch.setattr(timing, 'export_timing', True)
+    with caplog.at_level(logging.INFO, logger='MaRDMO.timing'):
+        response = Export().stream()
+        assert not response.has_header('Server-Timing') and not caplog.records
+        assert b''.join(response) == b'page 0page 1'
+        response.close()
+    assert len(caplog.records) == 1
+    assert '"name": "page"' in caplog.records[0].getMessage()
+    assert timing.current.get() is None